@@ -0,0 +1,57 @@
+"""Cost of resizing a mesh file after a texture-name edit, with the cached
+sizes against a full traversal of the node tree.
+
+    python benchmarks/cached_size.py path/to/unit.drs
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+# pylint: disable=wrong-import-position
+from drs_editor.data_structures.drs_definitions import DRS  # noqa: E402
+from drs_editor.data_structures.cached_size import CachedSize  # noqa: E402
+
+
+def clear(node) -> None:
+    """Drops every cached size below `node`"""
+    stack = [node]
+    seen = set()
+    while stack:
+        record = stack.pop()
+        if not isinstance(record, CachedSize) or id(record) in seen:
+            continue
+        seen.add(id(record))
+        object.__setattr__(record, "_size", None)
+        for name, value in vars(record).items():
+            if name.startswith("_"):
+                continue
+            if isinstance(value, list):
+                stack.extend(value)
+            else:
+                stack.append(value)
+
+
+def main(file_name: str, number: int = 1000) -> None:
+    mesh_file = DRS().read(file_name).cdsp_mesh_file
+    texture = mesh_file.meshes[0].textures.textures[0]
+    mesh_file.size()
+
+    def edit():
+        texture.name = texture.name
+        return mesh_file.size()
+
+    def traverse():
+        clear(mesh_file)
+        return mesh_file.size()
+
+    for name, case in [("cached", edit), ("full traversal", traverse)]:
+        seconds = min(timeit.repeat(case, number=number, repeat=3)) / number
+        print(f"{name:<20}{seconds * 1e6:>10.2f} us")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        sys.exit(__doc__)
+    main(sys.argv[1])
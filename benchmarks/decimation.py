@@ -0,0 +1,36 @@
+"""Time to decimate the meshes of a unit into LevelOfDetail variants, with the
+triangle counts reached. Files are left untouched.
+
+    python benchmarks/decimation.py path/to/unit.drs [ratio ...]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+# pylint: disable=wrong-import-position
+from drs_editor.data_structures.drs_definitions import DRS  # noqa: E402
+from drs_editor.geometry.decimation import decimate_mesh, mesh_skin  # noqa: E402
+
+
+def main(file_name: str, ratios) -> None:
+    drs = DRS().read(file_name)
+    if drs.cdsp_mesh_file is None:
+        return
+    print(f"{'mesh':<10}{'triangles':>12}{'reduced':>24}{'ms':>10}")
+    offset = 0
+    for index, mesh in enumerate(drs.cdsp_mesh_file.meshes):
+        skin = mesh_skin(mesh, drs.csk_skin_info, offset)
+        offset += mesh.vertex_count
+        start = time.perf_counter()
+        results = decimate_mesh(mesh, ratios, skin)
+        elapsed = (time.perf_counter() - start) * 1000
+        reduced = "/".join(str(result.mesh.face_count) for result in results)
+        print(f"{index:<10}{mesh.face_count:>12}{reduced:>24}{elapsed:>10.1f}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        sys.exit(__doc__)
+    main(sys.argv[1], [float(ratio) for ratio in sys.argv[2:]] or (0.5, 0.25))
@@ -0,0 +1,62 @@
+"""Save time of the single-buffer serializer against re-encoding every
+record straight to a FileWriter, as DRS.save did before.
+
+    python benchmarks/drs_save.py path/to/unit.drs
+"""
+import os
+import sys
+import tempfile
+import timeit
+from struct import pack
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+# pylint: disable=wrong-import-position
+from drs_editor.data_structures.drs_definitions import DRS  # noqa: E402
+from drs_editor.data_structures.file_io import FileWriter  # noqa: E402
+
+
+def legacy_save(drs: DRS, file_name: str) -> None:
+    drs.layout()
+    writer = FileWriter(file_name)
+    writer.write(
+        pack(
+            "iiiiI",
+            drs.magic,
+            drs.number_of_models,
+            drs.node_information_offset,
+            drs.node_hierarchy_offset,
+            drs.node_count,
+        )
+    )
+    for node_name in drs.write_order:
+        if node_name != "CGeoPrimitiveContainer":
+            drs.payload(node_name).write(writer)
+    for node_info in drs.node_informations:
+        node_info.write(writer)
+    for node in drs.nodes:
+        node.write(writer)
+    writer.close()
+
+
+def main(file_name: str, number: int = 20) -> None:
+    drs = DRS().read(file_name)
+    with tempfile.TemporaryDirectory() as directory:
+        target = os.path.join(directory, "out.drs")
+        cases = [
+            ("FileWriter", lambda: legacy_save(drs, target)),
+            ("buffer", lambda: drs.save(target)),
+            ("buffer + mmap", lambda: drs.save(target, use_mmap=True)),
+        ]
+        print(f"{'writer':<20}{'ms':>10}")
+        for name, case in cases:
+            seconds = min(timeit.repeat(case, number=number, repeat=3)) / number
+            print(f"{name:<20}{seconds * 1000:>10.2f}")
+        with open(file_name, "rb") as source, open(target, "rb") as result:
+            print("identical:", source.read() == result.read())
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        sys.exit(__doc__)
+    main(sys.argv[1])
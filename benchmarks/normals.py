@@ -0,0 +1,41 @@
+"""Time to recompute the normals of the meshes of one or more units, as a
+cleanup pass over many assets would. Files are left untouched.
+
+    python benchmarks/normals.py [--crease DEGREES] path/to/unit.drs [more.drs ...]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+# pylint: disable=wrong-import-position
+from drs_editor.data_structures.drs_definitions import DRS  # noqa: E402
+from drs_editor.geometry.normals import recompute_drs_normals  # noqa: E402
+
+
+def main(file_names, crease_angle=None) -> None:
+    print(f"{'file':<40}{'vertices':>10}{'ms':>10}")
+    total = 0.0
+    for file_name in file_names:
+        drs = DRS().read(file_name)
+        if drs.cdsp_mesh_file is None:
+            continue
+        vertices = sum(mesh.vertex_count for mesh in drs.cdsp_mesh_file.meshes)
+        start = time.perf_counter()
+        recompute_drs_normals(drs, crease_angle=crease_angle)
+        elapsed = (time.perf_counter() - start) * 1000
+        total += elapsed
+        print(f"{os.path.basename(file_name):<40}{vertices:>10}{elapsed:>10.1f}")
+    print(f"{'total':<50}{total:>10.1f}")
+
+
+if __name__ == "__main__":
+    arguments = sys.argv[1:]
+    crease = None
+    if arguments[:1] == ["--crease"]:
+        crease = float(arguments[1])
+        arguments = arguments[2:]
+    if not arguments:
+        sys.exit(__doc__)
+    main(arguments, crease)
@@ -0,0 +1,27 @@
+"""Time to rebuild the CGeoOBBTree of a unit from its collision mesh.
+
+    python benchmarks/obb_build.py path/to/unit.drs
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+# pylint: disable=wrong-import-position
+from drs_editor.data_structures.drs_definitions import DRS  # noqa: E402
+from drs_editor.geometry.obb_builder import build_obb_tree  # noqa: E402
+
+
+def main(file_name: str, number: int = 5) -> None:
+    mesh = DRS().read(file_name).cgeo_mesh
+    tree = build_obb_tree(mesh)
+    seconds = min(timeit.repeat(lambda: build_obb_tree(mesh), number=number, repeat=3))
+    print(f"{len(mesh.faces)} triangles, {len(tree.obb_nodes)} nodes")
+    print(f"{'build':<20}{seconds / number * 1000:>10.2f} ms")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        sys.exit(__doc__)
+    main(sys.argv[1])
@@ -0,0 +1,47 @@
+"""Ray casts and closest-point queries against the collision mesh of a unit,
+descending its CGeoOBBTree against testing every triangle of the CGeoMesh.
+
+    python benchmarks/obb_query.py path/to/unit.drs
+"""
+import os
+import sys
+import timeit
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+# pylint: disable=wrong-import-position
+from drs_editor.data_structures.drs_definitions import DRS, CGeoOBBTree  # noqa: E402
+from drs_editor.geometry.obb_query import OBBTreeQuery  # noqa: E402
+
+
+def main(file_name: str, count: int = 1000) -> None:
+    drs = DRS().read(file_name)
+    mesh = drs.cgeo_mesh
+    tree = OBBTreeQuery.from_drs(drs)
+    brute = OBBTreeQuery(CGeoOBBTree(faces=drs.cgeo_obb_tree.faces), mesh)
+
+    rng = np.random.default_rng(0)
+    lower = mesh.vertices[:, :3].min(axis=0)
+    upper = mesh.vertices[:, :3].max(axis=0)
+    origins = rng.uniform(lower, upper, (count, 3))
+    directions = rng.normal(size=(count, 3))
+
+    print(f"{len(tree.faces)} triangles, {count} queries")
+    print(f"{'query':<20}{'tree us':>10}{'brute us':>10}")
+    for name, case in [
+        ("ray cast", lambda query: query.ray_cast(origins, directions)),
+        ("closest point", lambda query: query.closest_point(origins)),
+    ]:
+        timings = [
+            timeit.timeit(lambda: case(query), number=1) / count
+            for query in (tree, brute)
+        ]
+        print(f"{name:<20}{timings[0] * 1e6:>10.2f}{timings[1] * 1e6:>10.2f}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        sys.exit(__doc__)
+    main(sys.argv[1])
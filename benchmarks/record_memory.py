@@ -0,0 +1,88 @@
+"""Bytes per instance of the small fixed-layout records, slotted as they are
+now against dict-based copies of the same dataclasses (with the eagerly
+built `xyz` Vector for Vector3 and Vector4), as they were before.
+
+    python benchmarks/record_memory.py
+"""
+import os
+import sys
+import tracemalloc
+from dataclasses import fields, make_dataclass
+from functools import lru_cache
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+# pylint: disable=wrong-import-position
+from drs_editor.data_structures.drs_definitions import (  # noqa: E402
+    BoneVertex,
+    CMatCoordinateSystem,
+    Face,
+    Material,
+    Matrix3x3,
+    OBBNode,
+    Timing,
+    Vector,
+    Vector3,
+    Vector4,
+    VertexData,
+)
+
+COUNT = 20000
+
+
+@lru_cache(maxsize=None)
+def legacy_class(cls: type) -> type:
+    """Dict-based copy of a dataclass, with an eager xyz for the vectors"""
+    names = [record_field.name for record_field in fields(cls)]
+    if cls in (Vector3, Vector4):
+        names.append("xyz")
+    return make_dataclass(f"Legacy{cls.__name__}", names, eq=False, repr=False)
+
+
+def make(cls: type, legacy: bool):
+    """One record holding the values read from a file, nested records included"""
+    record_class = legacy_class(cls) if legacy else cls
+    xyz = [Vector((1.0, 2.0, 3.0))] if legacy else []
+    if cls is Vector3:
+        return record_class(1.0, 2.0, 3.0, *xyz)
+    if cls is Vector4:
+        return record_class(1.0, 2.0, 3.0, 1.0, *xyz)
+    if cls is Face:
+        return record_class([1, 2, 3])
+    if cls is VertexData:
+        return record_class([1.0, 0.0, 0.0, 0.0], [1, 0, 0, 0])
+    if cls is Timing:
+        return record_class(100, 200, 1.0, 2.0, 3.0, 4)
+    if cls is Material:
+        if not legacy:
+            return record_class(7)
+        return record_class(1668510775, *([0.0] * 7), 1.5, *([0.0] * 5))
+    if cls is BoneVertex:
+        return record_class(make(Vector3, legacy), 0)
+    if cls is OBBNode:
+        rotation = Matrix3x3((1, 0, 0, 0, 1, 0, 0, 0, 1))
+        box = CMatCoordinateSystem(rotation, make(Vector3, legacy))
+        return record_class(box, 1, 2, 0, 0, 0, 10)
+    raise TypeError(f"No sample for {cls.__name__}")
+
+
+def bytes_per_record(cls, legacy: bool) -> float:
+    tracemalloc.start()
+    start = tracemalloc.get_traced_memory()[0]
+    records = [make(cls, legacy) for _ in range(COUNT)]
+    used = tracemalloc.get_traced_memory()[0] - start
+    tracemalloc.stop()
+    del records
+    return used / COUNT
+
+
+def main() -> None:
+    print(f"{'record':<16}{'before':>10}{'after':>10}")
+    for cls in (Face, Vector3, Vector4, VertexData, Timing, Material, OBBNode, BoneVertex):
+        before = bytes_per_record(cls, True)
+        after = bytes_per_record(cls, False)
+        print(f"{cls.__name__:<16}{before:>10.0f}{after:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
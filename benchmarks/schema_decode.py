@@ -0,0 +1,234 @@
+"""Decode time of the schema generated readers against the former
+hand-written ones, which are kept below as reference implementations.
+
+    python benchmarks/schema_decode.py
+"""
+import os
+import sys
+import tempfile
+import timeit
+from struct import calcsize, unpack
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+# pylint: disable=wrong-import-position
+from drs_editor.data_structures.drs_definitions import (  # noqa: E402
+    AnimationSetVariant,
+    Bone,
+    Keyframe,
+    Material,
+    MaterialParameters,
+    ModeAnimationKey,
+    Texture,
+    Timing,
+    Variant,
+)
+from drs_editor.data_structures.file_io import FileReader  # noqa: E402
+
+
+class LegacyTiming(Timing):
+    def read(self, file):
+        self.cast_ms = unpack("i", file.read(4))[0]
+        self.resolve_ms = unpack("i", file.read(4))[0]
+        self.uk_1 = unpack("f", file.read(4))[0]
+        self.uk_2 = unpack("f", file.read(4))[0]
+        self.uk_3 = unpack("f", file.read(4))[0]
+        self.animation_marker_id = unpack("i", file.read(4))[0]
+        return self
+
+
+class LegacyTexture(Texture):
+    def read(self, file):
+        self.identifier, self.length = unpack("ii", file.read(8))
+        self.name = file.read(self.length).decode("utf-8").strip("\x00")
+        self.spacer = unpack("i", file.read(4))[0]
+        return self
+
+
+class LegacyMaterial(Material):
+    def read(self, file):
+        # The former reader tested the identifiers in an if/elif chain
+        self.identifier = unpack("i", file.read(4))[0]
+        for identifier, attribute in MaterialParameters.items():
+            if self.identifier == identifier:
+                setattr(self, attribute, unpack("f", file.read(4))[0])
+                break
+        else:
+            self.unknown = unpack("f", file.read(4))[0]
+            raise TypeError(f"Unknown Material {self.unknown}")
+        return self
+
+
+class LegacyBone(Bone):
+    def read(self, file):
+        self.version = unpack("I", file.read(4))[0]
+        self.identifier = unpack("i", file.read(4))[0]
+        self.name_length = unpack("i", file.read(4))[0]
+        self.name = (
+            unpack(f"{self.name_length}s", file.read(calcsize(f"{self.name_length}s")))[0]
+            .decode("utf-8")
+            .strip("\x00")
+        )
+        self.after_read()
+        self.child_count = unpack("i", file.read(4))[0]
+        self.children = list(
+            unpack(f"{self.child_count}i", file.read(calcsize(f"{self.child_count}i")))
+        )
+        return self
+
+
+class LegacyAnimationSetVariant(AnimationSetVariant):
+    def read(self, file):
+        self.version = unpack("i", file.read(4))[0]
+        self.weight = unpack("i", file.read(4))[0]
+        self.length = unpack("i", file.read(4))[0]
+        self.file = (
+            unpack(f"{self.length}s", file.read(calcsize(f"{self.length}s")))[0]
+            .decode("utf-8")
+            .strip("\x00")
+        )
+        if self.version >= 4:
+            self.start = unpack("f", file.read(4))[0]
+            self.end = unpack("f", file.read(4))[0]
+        if self.version >= 5:
+            self.allows_ik = unpack("B", file.read(1))[0]
+        if self.version >= 7:
+            self.forceNoBlend = unpack("B", file.read(1))[0]
+        return self
+
+
+class LegacyModeAnimationKey(ModeAnimationKey):
+    def read(self, file, uk):
+        if uk != 2:
+            self.type = unpack("i", file.read(4))[0]
+        else:
+            self.type = 2
+        self.length = unpack("i", file.read(4))[0]
+        self.file = (
+            unpack(f"{self.length}s", file.read(calcsize(f"{self.length}s")))[0]
+            .decode("utf-8")
+            .strip("\x00")
+        )
+        self.unknown = unpack("i", file.read(4))[0]
+        if self.type == 1:
+            self.unknown2 = list(unpack("24B", file.read(24)))
+        elif self.type <= 5:
+            self.unknown2 = unpack("i", file.read(4))[0]
+            self.unknown4 = unpack("h", file.read(2))[0]
+        elif self.type == 6:
+            self.unknown2 = unpack("i", file.read(4))[0]
+            self.vis_job = unpack("h", file.read(2))[0]
+            self.unknown3 = unpack("i", file.read(4))[0]
+            self.unknown4 = unpack("h", file.read(2))[0]
+        self.variant_count = unpack("i", file.read(4))[0]
+        self.animation_set_variants = [
+            LegacyAnimationSetVariant().read(file) for _ in range(self.variant_count)
+        ]
+        return self
+
+
+class LegacyVariant(Variant):
+    def read(self, file):
+        self.weight = unpack("B", file.read(1))[0]
+        self.length = unpack("i", file.read(4))[0]
+        self.name = file.read(self.length).decode("utf-8").strip("\x00")
+        return self
+
+
+class LegacyKeyframe(Keyframe):
+    def read(self, file, _type):
+        (
+            self.time,
+            self.keyframe_type,
+            self.min_falloff,
+            self.max_falloff,
+            self.volume,
+            self.pitch_shift_min,
+            self.pitch_shift_max,
+        ) = unpack("fifffff", file.read(28))
+        self.offset = list(unpack("3f", file.read(12)))
+        self.interruptable = unpack("B", file.read(1))[0]
+        if _type not in [10, 11]:
+            self.uk = unpack("B", file.read(1))[0]
+        self.variant_count = unpack("i", file.read(4))[0]
+        self.variants = [LegacyVariant().read(file) for _ in range(self.variant_count)]
+        return self
+
+
+def variants():
+    return [
+        AnimationSetVariant(length=13, file="unit_idle.ska"),
+        AnimationSetVariant(length=13, file="unit_walk.ska"),
+    ]
+
+
+CASES = [
+    # name, record to encode, legacy reader, schema reader
+    ("Timing", Timing(100, 200, 1.0, 2.0, 3.0, 4), LegacyTiming, Timing, ()),
+    ("Texture", Texture(1684432499, "unit_texture_col"), LegacyTexture, Texture, ()),
+    ("Material", Material(7), LegacyMaterial, Material, ()),
+    (
+        "Bone",
+        Bone(0, 3, "Bip01_Spine1", child_count=2, children=[4, 5]),
+        LegacyBone,
+        Bone,
+        (),
+    ),
+    (
+        "AnimationSetVariant",
+        AnimationSetVariant(length=13, file="unit_idle.ska"),
+        LegacyAnimationSetVariant,
+        AnimationSetVariant,
+        (),
+    ),
+    (
+        "ModeAnimationKey",
+        ModeAnimationKey(variant_count=2, animation_set_variants=variants()),
+        LegacyModeAnimationKey,
+        ModeAnimationKey,
+        (0,),
+    ),
+    (
+        "Keyframe",
+        Keyframe(0.5, 0, 1, 2, 3, 4, 5, [1, 2, 3], 1, 0, 1, [Variant(1, 9, "sound.snr")]),
+        LegacyKeyframe,
+        Keyframe,
+        (0,),
+    ),
+]
+
+
+def main(records: int = 2000, repeat: int = 25) -> None:
+    print(f"{'record':22s}{'legacy us':>12s}{'schema us':>12s}{'speedup':>10s}")
+    with tempfile.TemporaryDirectory() as directory:
+        for name, record, legacy, generated, args in CASES:
+            path = os.path.join(directory, name)
+            with open(path, "wb") as file:
+                for _ in range(records):
+                    record.write(file)
+
+            reader = FileReader(path)
+
+            def decode(record_class):
+                reader.seek(0)
+                for _ in range(records):
+                    record_class().read(reader, *args)
+
+            # Alternated, so both see the same state of a busy machine
+            legacy_time = schema_time = float("inf")
+            for _ in range(repeat):
+                legacy_time = min(
+                    legacy_time, timeit.timeit(lambda: decode(legacy), number=1)
+                )
+                schema_time = min(
+                    schema_time, timeit.timeit(lambda: decode(generated), number=1)
+                )
+            reader.close()
+            print(
+                f"{name:22s}{legacy_time / records * 1e6:12.2f}"
+                f"{schema_time / records * 1e6:12.2f}{legacy_time / schema_time:9.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+"""Time to load every SKA below a directory, first through an empty cache
+and then again from the cache, as browsing an AnimationSet twice does.
+
+    python benchmarks/ska_cache.py path/to/animations [max_megabytes]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+# pylint: disable=wrong-import-position
+from drs_editor.file_handlers.ska_cache import SKACache  # noqa: E402
+
+
+def main(directory: str, max_megabytes: int = 256) -> None:
+    paths = [
+        os.path.join(root, file_name)
+        for root, _, file_names in os.walk(directory)
+        for file_name in file_names
+        if file_name.lower().endswith(".ska")
+    ]
+    cache = SKACache(max_megabytes * 1024 * 1024)
+    for label in ("cold", "warm"):
+        start = time.perf_counter()
+        for path in paths:
+            cache.get(path)
+        print(f"{label:<20}{(time.perf_counter() - start) * 1000:>10.3f} ms")
+    stats = cache.stats()
+    print(f"{len(paths)} files, {stats['bytes'] / 1024 / 1024:.1f} MB cached")
+    print(f"hits {stats['hits']}, misses {stats['misses']}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        sys.exit(__doc__)
+    main(sys.argv[1], *(int(argument) for argument in sys.argv[2:3]))
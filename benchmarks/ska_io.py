@@ -0,0 +1,41 @@
+"""Read and write time of SKA files, e.g. all animations of a unit.
+
+    python benchmarks/ska_io.py path/to/animation.ska [more.ska ...]
+"""
+import os
+import sys
+import tempfile
+import timeit
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+# pylint: disable=wrong-import-position
+from drs_editor.data_structures.ska_definitions import SKA  # noqa: E402
+
+
+def main(file_names, number: int = 5) -> None:
+    skas = [SKA().read(file_name) for file_name in file_names]
+    keyframes = sum(len(ska.keyframes) for ska in skas)
+
+    def read():
+        for file_name in file_names:
+            SKA().read(file_name)
+
+    with tempfile.TemporaryDirectory() as directory:
+        target = os.path.join(directory, "out.ska")
+
+        def write():
+            for ska in skas:
+                ska.write(target)
+
+        read_seconds = min(timeit.repeat(read, number=number, repeat=3))
+        write_seconds = min(timeit.repeat(write, number=number, repeat=3))
+    print(f"{len(skas)} files, {keyframes} keyframes")
+    print(f"{'read':<20}{read_seconds / number * 1000:>10.2f} ms")
+    print(f"{'write':<20}{write_seconds / number * 1000:>10.2f} ms")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        sys.exit(__doc__)
+    main(sys.argv[1:])
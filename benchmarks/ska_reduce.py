@@ -0,0 +1,34 @@
+"""Time to reduce the keyframes of an SKA and the keys it keeps.
+
+    python benchmarks/ska_reduce.py path/to/animation.ska [tolerance]
+"""
+import copy
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+# pylint: disable=wrong-import-position
+from drs_editor.animation.reduction import reduce_ska  # noqa: E402
+from drs_editor.data_structures.ska_definitions import SKA  # noqa: E402
+
+
+def main(file_name: str, tolerance: float = 1e-3) -> None:
+    ska = SKA().read(file_name)
+    timings = []
+    for _ in range(3):
+        reduced = copy.deepcopy(ska)
+        start = time.perf_counter()
+        report = reduce_ska(reduced, tolerance, tolerance)
+        timings.append(time.perf_counter() - start)
+    print(f"{len(ska.headers)} curves")
+    print(f"{'keys before':<20}{report.keys_before:>10}")
+    print(f"{'keys after':<20}{report.keys_after:>10}")
+    print(f"{'reduce':<20}{min(timings) * 1000:>10.3f} ms")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        sys.exit(__doc__)
+    main(sys.argv[1], *(float(argument) for argument in sys.argv[2:3]))
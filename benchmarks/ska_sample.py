@@ -0,0 +1,35 @@
+"""Time to sample an SKA at one time, as a preview frame does, and at a
+batch of times.
+
+    python benchmarks/ska_sample.py path/to/animation.ska [frames]
+"""
+import os
+import sys
+import timeit
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+# pylint: disable=wrong-import-position
+from drs_editor.animation.sampler import SKASampler  # noqa: E402
+from drs_editor.data_structures.ska_definitions import SKA  # noqa: E402
+
+
+def main(file_name: str, frames: int = 60, number: int = 20) -> None:
+    ska = SKA().read(file_name)
+    prepare = min(timeit.repeat(lambda: SKASampler(ska), number=number, repeat=3))
+    sampler = SKASampler(ska)
+    batch = np.linspace(0, 1, frames)
+    single = min(timeit.repeat(lambda: sampler.sample([0.5]), number=number, repeat=3))
+    many = min(timeit.repeat(lambda: sampler.sample(batch), number=number, repeat=3))
+    print(f"{len(ska.headers)} curves, {len(sampler.bone_ids)} bones")
+    print(f"{'prepare':<20}{prepare / number * 1000:>10.3f} ms")
+    print(f"{'one frame':<20}{single / number * 1000:>10.3f} ms")
+    print(f"{f'{frames} frames':<20}{many / number * 1000:>10.3f} ms")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        sys.exit(__doc__)
+    main(sys.argv[1], *(int(argument) for argument in sys.argv[2:3]))
@@ -0,0 +1,34 @@
+"""Time to regenerate the tangent streams of the meshes of a unit. Files are
+left untouched.
+
+    python benchmarks/tangents.py path/to/unit.drs [--split-seams]
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+# pylint: disable=wrong-import-position
+from drs_editor.data_structures.drs_definitions import DRS  # noqa: E402
+from drs_editor.geometry.tangents import generate_drs_tangents  # noqa: E402
+
+
+def main(file_name: str, split_seams: bool, number: int = 5) -> None:
+    drs = DRS().read(file_name)
+    meshes = drs.cdsp_mesh_file.meshes
+    vertices = sum(mesh.vertex_count for mesh in meshes)
+    seconds = min(
+        timeit.repeat(
+            lambda: generate_drs_tangents(drs, split_seams), number=number, repeat=3
+        )
+    )
+    vertices_after = sum(mesh.vertex_count for mesh in meshes)
+    print(f"{len(meshes)} meshes, {vertices} vertices, {vertices_after} after")
+    print(f"{'tangents':<20}{seconds / number * 1000:>10.2f} ms")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        sys.exit(__doc__)
+    main(sys.argv[1], "--split-seams" in sys.argv[2:])
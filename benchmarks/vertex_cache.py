@@ -0,0 +1,35 @@
+"""Vertex cache efficiency of the meshes of one or more units before and after
+reordering their index buffers, and the time the reordering took. Files are
+left untouched.
+
+    python benchmarks/vertex_cache.py path/to/unit.drs [more.drs ...]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+# pylint: disable=wrong-import-position
+from drs_editor.data_structures.drs_definitions import DRS  # noqa: E402
+from drs_editor.geometry.vertex_cache import optimize_drs  # noqa: E402
+
+
+def main(file_names) -> None:
+    print(f"{'mesh':<40}{'ACMR':>14}{'ATVR':>14}{'ms':>10}")
+    for file_name in file_names:
+        drs = DRS().read(file_name)
+        start = time.perf_counter()
+        reports = optimize_drs(drs)
+        elapsed = (time.perf_counter() - start) * 1000 / max(len(reports), 1)
+        for index, report in enumerate(reports):
+            name = f"{os.path.basename(file_name)}[{index}]"
+            acmr = f"{report.acmr_before:.3f}>{report.acmr_after:.3f}"
+            atvr = f"{report.atvr_before:.3f}>{report.atvr_after:.3f}"
+            print(f"{name:<40}{acmr:>14}{atvr:>14}{elapsed:>10.1f}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        sys.exit(__doc__)
+    main(sys.argv[1:])
@@ -0,0 +1,267 @@
+"""Keyframe reduction for SKA curves.
+
+Each curve keeps its first and last key. A kept key whose neighbors on the
+curve all remain keeps its authored tangent, the others get Catmull-Rom
+tangents through their kept neighbors. The rebuilt curve is compared with
+the original one at every original key and at SPAN_SAMPLES of the way
+between them: translations by distance, rotations by the angle between the
+quaternions. Wherever a span between kept keys misses the tolerance, the
+original key nearest to its worst sample is kept as well, for all spans of
+all curves at once, until the whole curve is met. Linear runs, as exported
+by sampling, collapse to their ends.
+
+Run over a directory as a batch job, writing next to or over the sources:
+
+    python -m drs_editor.animation.reduction SOURCE_DIRECTORY TARGET_DIRECTORY
+    python -m drs_editor.animation.reduction --in-place SOURCE_DIRECTORY
+"""
+import argparse
+import os
+from dataclasses import dataclass
+from typing import List
+
+import numpy as np
+
+from ..data_structures.ska_definitions import SKA
+from .sampler import ROTATION, hermite, slerp
+
+# Fractions of every span between two original keys at which the rebuilt
+# curve is compared with the original, besides the keys themselves
+SPAN_SAMPLES = (0.25, 0.5, 0.75)
+
+
+@dataclass(eq=False)
+class ReductionReport:
+    """Keys of an SKA before and after reducing it"""
+
+    file_name: str = ""
+    keys_before: int = 0
+    keys_after: int = 0
+
+
+def catmull_rom(values, times, kept, curves, rotations) -> np.ndarray:
+    """Tangents (K, 4) of the kept keys from their kept neighbors on the same
+    curve, one sided at the curve ends. Rotation neighbors are taken on the
+    hemisphere of the key."""
+    previous = np.concatenate([kept[:1], kept[:-1]])
+    following = np.concatenate([kept[1:], kept[-1:]])
+    previous = np.where(curves[previous] == curves[kept], previous, kept)
+    following = np.where(curves[following] == curves[kept], following, kept)
+    before, after = values[previous], values[following]
+    turned = rotations[kept]
+    if turned.any():
+        center = values[kept]
+        for neighbors in (before, after):
+            opposite = turned & (np.einsum("ij,ij->i", neighbors, center) < 0)
+            neighbors[opposite] *= -1
+    spans = times[following] - times[previous]
+    safe = np.where(spans > 0, spans, 1.0)
+    return np.where((spans > 0)[:, None], (after - before) / safe[:, None], 0)
+
+
+def kept_tangents(values, authored, times, kept, curves, rotations) -> np.ndarray:
+    """Tangents (N, 4) of the kept keys. A key whose neighbors on its curve
+    all remain keeps its authored tangent, the others get Catmull-Rom
+    tangents through their kept neighbors."""
+    is_kept = np.zeros(len(values), dtype=bool)
+    is_kept[kept] = True
+    boundaries = curves[1:] != curves[:-1]
+    previous_kept = np.r_[True, is_kept[:-1] | boundaries]
+    next_kept = np.r_[is_kept[1:] | boundaries, True]
+    tangents = np.zeros_like(authored)
+    tangents[kept] = catmull_rom(values, times, kept, curves, rotations)
+    unchanged = is_kept & previous_kept & next_kept
+    tangents[unchanged] = authored[unchanged]
+    return tangents
+
+
+def interpolate(values, tangents, times, first, second, fractions, rotations):
+    """Values (S, 4) at `fractions` of the way from the keys `first` to the
+    keys `second`: Hermite for translations, slerp for rotations"""
+    spans = times[second] - times[first]
+    result = hermite(
+        values[first],
+        tangents[first],
+        values[second],
+        tangents[second],
+        fractions,
+        spans,
+    )
+    if rotations.any():
+        turned = slerp(values[first], values[second], fractions)
+        result[rotations] = turned[rotations]
+    return result
+
+
+def sample_errors(expected, actual, rotations) -> np.ndarray:
+    """Distance, or rotation angle for rotation samples, of actual values"""
+    errors = np.linalg.norm(actual[:, :3] - expected[:, :3], axis=1)
+    if rotations.any():
+        cosines = np.abs(np.einsum("ij,ij->i", actual, expected))
+        norms = np.linalg.norm(actual, axis=1) * np.linalg.norm(expected, axis=1)
+        cosines = np.minimum(cosines / np.maximum(norms, 1e-30), 1.0)
+        errors[rotations] = 2 * np.arccos(cosines[rotations])
+    return errors
+
+
+def reduce_ska(
+    ska: SKA, position_tolerance: float = 1e-3, rotation_tolerance: float = 1e-3
+) -> ReductionReport:
+    """Drops the keys of `ska` that its curves can do without, in place.
+
+    position_tolerance is a distance, rotation_tolerance an angle in radians.
+    The headers, times, keyframes and time_count are rewritten together.
+    """
+    headers = np.asarray(ska.headers, dtype=np.int64).reshape(-1, 4)
+    report = ReductionReport(keys_before=len(ska.times))
+    if not len(headers):
+        report.keys_after = report.keys_before
+        return report
+    starts, counts = headers[:, 0], headers[:, 1]
+    counts = np.clip(counts, 0, np.maximum(len(ska.times) - starts, 0))
+    # Every curve gets its own copy of its keys
+    curves = np.repeat(np.arange(len(headers)), counts)
+    keys = np.arange(int(counts.sum())) + np.repeat(
+        starts - (np.cumsum(counts) - counts), counts
+    )
+    times = np.asarray(ska.times, dtype=np.float64)[keys]
+    keyframes = np.asarray(ska.keyframes, dtype=np.float64).reshape(-1, 8)[keys]
+    values, authored = keyframes[:, :4], keyframes[:, 4:]
+    rotations = headers[curves, 2] == ROTATION
+
+    # Samples of the original curves: every key, then SPAN_SAMPLES of every
+    # span between two keys of the same curve
+    spans = np.flatnonzero(curves[1:] == curves[:-1])
+    fractions = np.tile(SPAN_SAMPLES, len(spans))
+    spans = np.repeat(spans, len(SPAN_SAMPLES))
+    expected = np.concatenate(
+        [
+            values,
+            interpolate(
+                values, authored, times, spans, spans + 1, fractions, rotations[spans]
+            ),
+        ]
+    )
+    firsts = np.concatenate([np.arange(len(values)), spans])
+    seconds = np.concatenate([np.arange(len(values)), spans + 1])
+    fractions = np.concatenate([np.zeros(len(values)), fractions])
+    sample_times = times[firsts] + fractions * (times[seconds] - times[firsts])
+    sample_rotations = rotations[firsts]
+    tolerances = np.where(sample_rotations, rotation_tolerance, position_tolerance)
+    # The original key nearest to each sample, and the one across its span
+    nearest = np.where(fractions > 0.5, seconds, firsts)
+    across = np.where(fractions > 0.5, firsts, seconds)
+    # Neighbors beyond the span, whose removal changed the tangents in it
+    same_before = np.r_[False, curves[1:] == curves[:-1]]
+    same_after = np.r_[curves[1:] == curves[:-1], False]
+    before = np.where(same_before[firsts], firsts - 1, -1)
+    after = np.where(same_after[seconds], seconds + 1, -1)
+
+    nonempty = counts > 0
+    ends = np.cumsum(counts) - counts
+    kept = np.unique(np.concatenate([ends[nonempty], (ends + counts - 1)[nonempty]]))
+    while True:
+        tangents = kept_tangents(values, authored, times, kept, curves, rotations)
+        # Span between kept keys holding each sample
+        slots = np.searchsorted(kept, firsts, side="right") - 1
+        following = np.minimum(slots + 1, len(kept) - 1)
+        first = kept[slots]
+        second = kept[following]
+        second = np.where(curves[second] == curves[first], second, first)
+        lengths = times[second] - times[first]
+        safe = np.where(lengths > 0, lengths, 1.0)
+        local = np.where(
+            lengths > 0, np.clip((sample_times - times[first]) / safe, 0, 1), 0
+        )
+        actual = interpolate(
+            values, tangents, times, first, second, local, sample_rotations
+        )
+        excess = sample_errors(expected, actual, sample_rotations) - tolerances
+        failing = np.flatnonzero(excess > 0)
+        if not len(failing):
+            break
+        # The worst sample of every span that misses the tolerance
+        order = failing[np.lexsort((-excess[failing], slots[failing]))]
+        leaders = order[np.r_[True, slots[order][1:] != slots[order][:-1]]]
+        is_kept = np.zeros(len(values), dtype=bool)
+        is_kept[kept] = True
+        near, far = nearest[leaders], across[leaders]
+        chosen = np.where(~is_kept[near], near, np.where(~is_kept[far], far, -1))
+        # Both keys of the span remain: restore the neighbors beyond them
+        beyond = np.concatenate(
+            [before[leaders][chosen < 0], after[leaders][chosen < 0]]
+        )
+        additions = np.concatenate([chosen, beyond])
+        additions = additions[additions >= 0]
+        additions = additions[~is_kept[additions]]
+        if not len(additions):
+            break
+        kept = np.union1d(kept, additions)
+
+    new_counts = np.bincount(curves[kept], minlength=len(headers))
+    output = np.empty((len(kept), 8), dtype="<f4")
+    output[:, :4] = values[kept]
+    output[:, 4:] = tangents[kept]
+    new_headers = headers.copy()
+    new_headers[:, 0] = np.cumsum(new_counts) - new_counts
+    new_headers[:, 1] = new_counts
+    ska.headers = new_headers.astype("<u4")
+    ska.header_count = len(new_headers)
+    ska.times = times[kept].astype("<f4")
+    ska.keyframes = output
+    ska.time_count = len(kept)
+    report.keys_after = len(kept)
+    return report
+
+
+def reduce_directory(
+    source: str,
+    target: str,
+    position_tolerance: float = 1e-3,
+    rotation_tolerance: float = 1e-3,
+) -> List[ReductionReport]:
+    """Reduces every type 6 or 7 SKA below `source`, writing it to the same
+    relative path below `target`. Pass `source` as target to overwrite the
+    originals. A target inside `source` is not searched."""
+    reports = []
+    skipped = os.path.realpath(target)
+    if skipped == os.path.realpath(source):
+        skipped = None
+    for directory, directory_names, file_names in os.walk(source):
+        # Pruned in place, os.walk descends into what is left
+        directory_names[:] = [
+            name
+            for name in directory_names
+            if os.path.realpath(os.path.join(directory, name)) != skipped
+        ]
+        for file_name in sorted(file_names):
+            if not file_name.lower().endswith(".ska"):
+                continue
+            path = os.path.join(directory, file_name)
+            ska = SKA().read(path)
+            if ska.type not in (6, 7):
+                continue
+            report = reduce_ska(ska, position_tolerance, rotation_tolerance)
+            report.file_name = os.path.relpath(path, source)
+            output = os.path.join(target, report.file_name)
+            os.makedirs(os.path.dirname(output), exist_ok=True)
+            ska.write(output)
+            reports.append(report)
+    return reports
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Drops the SKA keys the curves can do without."
+    )
+    parser.add_argument("source")
+    parser.add_argument("target", nargs="?")
+    parser.add_argument(
+        "--in-place", action="store_true", help="overwrite the source files"
+    )
+    arguments = parser.parse_args()
+    if arguments.in_place == (arguments.target is not None):
+        parser.error("give either a target directory or --in-place")
+    target = arguments.source if arguments.in_place else arguments.target
+    for result in reduce_directory(arguments.source, target):
+        print(f"{result.file_name:<60}{result.keys_before:>8}{result.keys_after:>8}")
@@ -0,0 +1,211 @@
+"""Evaluates an SKA at arbitrary times, all bones at once.
+
+Every row of SKA.headers is one curve: the keys [tick, tick + interval) of
+SKA.times and SKA.keyframes, animating the translation (type 0) or the
+rotation (type 1) of the bone whose Bone.version is bone_id. Keys hold a
+value in x, y, z, w and its tangent in tan_x to tan_w. Translations are
+interpolated as cubic Hermite splines with the tangents given per unit of
+SKA time, rotations with slerp.
+
+Rotations are stored for row vectors, w, x, y, z = -w, x, y, z gives the
+quaternion of the column vector matrices used by SkeletonIndex. Both are
+relative to the parent bone.
+
+All curves are located with one searchsorted over a key array in which
+every curve is shifted into its own disjoint time window. Times outside a
+curve hold its first or last key.
+"""
+from typing import Optional, Tuple
+
+import numpy as np
+
+from ..data_structures.ska_definitions import SKA
+from .skeleton import SkeletonIndex, matrix_quaternions, quaternion_matrices
+
+# Header types
+TRANSLATION = 0
+ROTATION = 1
+
+
+def slerp(first: np.ndarray, second: np.ndarray, fractions: np.ndarray) -> np.ndarray:
+    """Spherical interpolation of unit quaternions (..., 4) along the shorter
+    arc, fractions (...)"""
+    cosines = np.einsum("...i,...i->...", first, second)
+    second = np.where(cosines[..., None] < 0, -second, second)
+    cosines = np.abs(cosines)
+    angles = np.arccos(np.minimum(cosines, 1.0))
+    sines = np.sin(angles)
+    # Nearly equal rotations fall back to linear interpolation
+    linear = sines < 1e-6
+    safe = np.where(linear, 1.0, sines)
+    a = np.where(linear, 1 - fractions, np.sin((1 - fractions) * angles) / safe)
+    b = np.where(linear, fractions, np.sin(fractions * angles) / safe)
+    result = a[..., None] * first + b[..., None] * second
+    return result / np.linalg.norm(result, axis=-1, keepdims=True)
+
+
+def hermite(p0, m0, p1, m1, fractions, spans) -> np.ndarray:
+    """Cubic Hermite interpolation, tangents per unit time over spans"""
+    s = fractions[..., None]
+    s2, s3 = s * s, s * s * s
+    spans = spans[..., None]
+    return (
+        (2 * s3 - 3 * s2 + 1) * p0
+        + (s3 - 2 * s2 + s) * spans * m0
+        + (-2 * s3 + 3 * s2) * p1
+        + (s3 - s2) * spans * m1
+    )
+
+
+class SKASampler:
+    """Curves of one SKA, prepared once for repeated sampling.
+
+    bone_ids are the SKA bone identifiers animated by any curve, in the
+    order of the arrays returned by sample.
+    """
+
+    def __init__(self, ska: SKA) -> None:
+        headers = np.asarray(ska.headers, dtype=np.int64).reshape(-1, 4)
+        times = np.asarray(ska.times, dtype=np.float64)
+        keyframes = np.asarray(ska.keyframes, dtype=np.float64).reshape(-1, 8)
+        self.duration = float(ska.duration)
+
+        starts, counts, types, bone_ids = headers.T
+        # Curves reaching past the keys are cut, empty and unknown ones dropped
+        counts = np.clip(counts, 0, np.maximum(len(times) - starts, 0))
+        used = (counts > 0) & np.isin(types, (TRANSLATION, ROTATION))
+        starts, counts, types, bone_ids = (
+            column[used] for column in (starts, counts, types, bone_ids)
+        )
+        self.bone_ids, self.curve_bones = np.unique(bone_ids, return_inverse=True)
+        self.curve_bones = self.curve_bones.ravel()
+        self.curve_types = types
+        self.translated = np.zeros(len(self.bone_ids), dtype=bool)
+        self.translated[self.curve_bones[types == TRANSLATION]] = True
+        self.rotated = np.zeros(len(self.bone_ids), dtype=bool)
+        self.rotated[self.curve_bones[types == ROTATION]] = True
+
+        curve_count = len(starts)
+        owners = np.repeat(np.arange(curve_count), counts)
+        keys = np.arange(int(counts.sum())) + np.repeat(
+            starts - (np.cumsum(counts) - counts), counts
+        )
+        self.starts = np.cumsum(counts) - counts
+        self.counts = counts
+        self.key_times = times[keys]
+        values = keyframes[keys]
+        rotation_keys = self.curve_types[owners] == ROTATION
+        # Row vector rotations to column vector quaternions as w, x, y, z
+        values[rotation_keys, :4] = np.column_stack(
+            [-values[rotation_keys, 3], values[rotation_keys, :3]]
+        )
+        norms = np.linalg.norm(values[rotation_keys, :4], axis=1, keepdims=True)
+        values[rotation_keys, :4] /= np.maximum(norms, 1e-30)
+        self.values = values
+
+        # Every curve shifted into a window of its own for one searchsorted
+        self.origin = float(self.key_times.min()) if len(keys) else 0.0
+        self.end = float(self.key_times.max()) if len(keys) else 0.0
+        self.window = 2 * (self.end - self.origin) + 1.0
+        self.shifted = (self.key_times - self.origin) + owners * self.window
+
+    def locate(self, times: np.ndarray):
+        """Key index, fraction to the next key and key spacing of every curve
+        at every time, each (N, C)"""
+        times = np.clip(np.asarray(times, dtype=np.float64), self.origin, self.end)
+        curves = np.arange(len(self.counts))
+        queries = (times[:, None] - self.origin) + curves * self.window
+        found = np.searchsorted(self.shifted, queries, side="right") - 1
+        last = self.starts + np.maximum(self.counts - 2, 0)
+        first = np.clip(found, self.starts, last)
+        second = np.minimum(first + 1, self.starts + self.counts - 1)
+        spans = self.key_times[second] - self.key_times[first]
+        safe = np.where(spans > 0, spans, 1.0)
+        fractions = np.clip((times[:, None] - self.key_times[first]) / safe, 0, 1)
+        fractions = np.where(spans > 0, fractions, 0.0)
+        return first, second, fractions, spans
+
+    def sample(self, times) -> Tuple[np.ndarray, np.ndarray]:
+        """Translations (N, K, 3) and rotations (N, K, 4) as w, x, y, z of the
+        K animated bones at N times in SKA time. Bones without a curve of a
+        kind get zero translation or the identity rotation."""
+        times = np.atleast_1d(np.asarray(times, dtype=np.float64))
+        count = len(self.bone_ids)
+        translations = np.zeros((len(times), count, 3))
+        rotations = np.zeros((len(times), count, 4))
+        rotations[..., 0] = 1
+        if not len(self.counts):
+            return translations, rotations
+        first, second, fractions, spans = self.locate(times)
+
+        moving = np.flatnonzero(self.curve_types == TRANSLATION)
+        if len(moving):
+            a, b = first[:, moving], second[:, moving]
+            translations[:, self.curve_bones[moving]] = hermite(
+                self.values[a, :3],
+                self.values[a, 4:7],
+                self.values[b, :3],
+                self.values[b, 4:7],
+                fractions[:, moving],
+                spans[:, moving],
+            )
+        turning = np.flatnonzero(self.curve_types == ROTATION)
+        if len(turning):
+            a, b = first[:, turning], second[:, turning]
+            rotations[:, self.curve_bones[turning]] = slerp(
+                self.values[a, :4], self.values[b, :4], fractions[:, turning]
+            )
+        return translations, rotations
+
+    def sample_seconds(self, seconds, loop: bool = False):
+        """sample at times in seconds, SKA time being the fraction of the
+        duration. With loop the times wrap around the duration."""
+        seconds = np.asarray(seconds, dtype=np.float64)
+        if self.duration <= 0:
+            return self.sample(np.zeros_like(seconds))
+        times = seconds / self.duration
+        if loop:
+            times = np.mod(times, 1.0)
+        return self.sample(times)
+
+    def local_matrices(self, times, skeleton: SkeletonIndex) -> np.ndarray:
+        """Parent relative matrices (N, B, 4, 4) of all skeleton bones at the
+        given SKA times. Bones or channels without a curve keep their bind
+        pose."""
+        translations, rotations = self.sample(times)
+        bones = skeleton.bones_for(self.bone_ids)
+        matched = bones >= 0
+        local = np.repeat(skeleton.local_bind[None], len(translations), axis=0)
+        moved = matched & self.translated
+        offsets = local[..., :3, 3]
+        offsets[:, bones[moved]] = translations[:, moved]
+        turned = matched & self.rotated
+        local[:, bones[turned], :3, :3] = quaternion_matrices(rotations[:, turned])
+        return local
+
+    def world_matrices(self, times, skeleton: SkeletonIndex) -> np.ndarray:
+        """Model space matrices (N, B, 4, 4) of all skeleton bones"""
+        return skeleton.world(self.local_matrices(times, skeleton))
+
+
+def sample_pose(
+    ska: SKA, times, skeleton: Optional[SkeletonIndex] = None
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Translations and rotations of the bones of `ska` at `times`, see
+    SKASampler.sample. With a skeleton they are given for all of its bones
+    in its order, bones and channels without a curve in their bind pose."""
+    sampler = SKASampler(ska)
+    translations, rotations = sampler.sample(times)
+    if skeleton is None:
+        return translations, rotations
+    bones = skeleton.bones_for(sampler.bone_ids)
+    frames = len(translations)
+    ordered_translations = np.repeat(skeleton.local_bind[None, :, :3, 3], frames, 0)
+    ordered_rotations = np.repeat(
+        matrix_quaternions(skeleton.local_bind[None, :, :3, :3]), frames, 0
+    )
+    moved = (bones >= 0) & sampler.translated
+    ordered_translations[:, bones[moved]] = translations[:, moved]
+    turned = (bones >= 0) & sampler.rotated
+    ordered_rotations[:, bones[turned]] = rotations[:, turned]
+    return ordered_translations, ordered_rotations
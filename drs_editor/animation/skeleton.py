@@ -0,0 +1,229 @@
+"""Array form of a CSkSkeleton: hierarchy, bind pose and bone lookup.
+
+Bones are indexed by their identifier, which is also the index of their
+BoneMatrix. A Bone lists the identifiers of its children; Bone.version is
+the identifier SKA headers use for the bone.
+
+The four BoneVertex positions of a BoneMatrix are the rows of the inverse
+bind matrix of the bone in row vector form, the last row being the
+translation: a model space point p lands in bone space at p @ R + t. Here
+all matrices are (4, 4) in column vector form, so inverse_bind holds R.T
+and t, and bind, its inverse, the bone's frame in model space.
+"""
+from typing import List, Optional
+
+import numpy as np
+
+try:
+    from mathutils import Matrix, Quaternion, Vector
+except ImportError:
+    from ..utils.dummy_mathutils import Matrix, Quaternion, Vector
+
+from ..data_structures.drs_definitions import CSkSkeleton, DRSBone
+
+
+def matrix_quaternions(rotations: np.ndarray) -> np.ndarray:
+    """Unit quaternions (..., 4) as w, x, y, z of rotation matrices (..., 3, 3)"""
+    m = np.asarray(rotations, dtype=np.float64)
+    m00, m11, m22 = m[..., 0, 0], m[..., 1, 1], m[..., 2, 2]
+    # One candidate per largest component, picked per matrix for stability
+    candidates = np.stack(
+        [
+            np.stack(
+                [
+                    1 + m00 + m11 + m22,
+                    m[..., 2, 1] - m[..., 1, 2],
+                    m[..., 0, 2] - m[..., 2, 0],
+                    m[..., 1, 0] - m[..., 0, 1],
+                ],
+                axis=-1,
+            ),
+            np.stack(
+                [
+                    m[..., 2, 1] - m[..., 1, 2],
+                    1 + m00 - m11 - m22,
+                    m[..., 0, 1] + m[..., 1, 0],
+                    m[..., 0, 2] + m[..., 2, 0],
+                ],
+                axis=-1,
+            ),
+            np.stack(
+                [
+                    m[..., 0, 2] - m[..., 2, 0],
+                    m[..., 0, 1] + m[..., 1, 0],
+                    1 - m00 + m11 - m22,
+                    m[..., 1, 2] + m[..., 2, 1],
+                ],
+                axis=-1,
+            ),
+            np.stack(
+                [
+                    m[..., 1, 0] - m[..., 0, 1],
+                    m[..., 0, 2] + m[..., 2, 0],
+                    m[..., 1, 2] + m[..., 2, 1],
+                    1 - m00 - m11 + m22,
+                ],
+                axis=-1,
+            ),
+        ],
+        axis=-2,
+    )
+    trace = np.stack(
+        [m00 + m11 + m22, m00 - m11 - m22, m11 - m00 - m22, m22 - m00 - m11], axis=-1
+    )
+    best = np.take_along_axis(
+        candidates, trace.argmax(axis=-1)[..., None, None], axis=-2
+    )[..., 0, :]
+    best /= np.linalg.norm(best, axis=-1, keepdims=True)
+    # Keep w non-negative so equal rotations give equal quaternions
+    return np.where(best[..., :1] < 0, -best, best)
+
+
+def quaternion_matrices(quaternions: np.ndarray) -> np.ndarray:
+    """Rotation matrices (..., 3, 3) of unit quaternions (..., 4) as w, x, y, z"""
+    w, x, y, z = np.moveaxis(np.asarray(quaternions, dtype=np.float64), -1, 0)
+    rows = [
+        [1 - 2 * (y * y + z * z), 2 * (x * y - z * w), 2 * (x * z + y * w)],
+        [2 * (x * y + z * w), 1 - 2 * (x * x + z * z), 2 * (y * z - x * w)],
+        [2 * (x * z - y * w), 2 * (y * z + x * w), 1 - 2 * (x * x + y * y)],
+    ]
+    return np.stack([np.stack(row, axis=-1) for row in rows], axis=-2)
+
+
+def compose_hierarchy(
+    local: np.ndarray, parents: np.ndarray, levels: List[np.ndarray]
+) -> np.ndarray:
+    """World matrices (..., B, 4, 4) from matrices relative to the parent,
+    one batched product per hierarchy level"""
+    world = np.array(local, dtype=np.float64)
+    for nodes in levels[1:]:
+        parent_world = world[..., parents[nodes], :, :]
+        world[..., nodes, :, :] = parent_world @ world[..., nodes, :, :]
+    return world
+
+
+class SkeletonIndex:
+    """Hierarchy and bind pose of a skeleton, computed once.
+
+    parents holds the parent index of every bone, -1 for roots, depths the
+    distance to its root, order all bones parents first and levels the bones
+    of every depth. bind, inverse_bind and local_bind are (B, 4, 4) arrays,
+    local_bind relative to the parent's bind frame.
+    """
+
+    def __init__(self, skeleton: CSkSkeleton) -> None:
+        count = len(skeleton.bones)
+        identifiers = np.array(
+            [bone.identifier for bone in skeleton.bones], dtype=np.intp
+        )
+        if not np.array_equal(np.sort(identifiers), np.arange(count)):
+            raise TypeError("Bone identifiers are not the numbers 0 to bone_count - 1")
+        if len(skeleton.bone_matrices) < count:
+            raise TypeError(
+                f"{count} bones, but only {len(skeleton.bone_matrices)} bone matrices"
+            )
+        bones = [None] * count
+        for bone in skeleton.bones:
+            bones[bone.identifier] = bone
+        self.bones = bones
+        self.names = [bone.name for bone in bones]
+        self.ska_identifiers = np.array(
+            [bone.version for bone in bones], dtype=np.int64
+        )
+
+        self.parents = np.full(count, -1, dtype=np.intp)
+        for bone in bones:
+            children = np.asarray(bone.children, dtype=np.intp)
+            if len(children) and (children.min() < 0 or children.max() >= count):
+                raise TypeError(f"Bone {bone.name} has a child outside the skeleton")
+            if (self.parents[children] >= 0).any():
+                raise TypeError(f"A child of bone {bone.name} has two parents")
+            self.parents[children] = bone.identifier
+
+        # Climb all bones towards their roots together
+        self.depths = np.zeros(count, dtype=np.intp)
+        ancestors = self.parents.copy()
+        for _ in range(count):
+            climbing = ancestors >= 0
+            if not climbing.any():
+                break
+            self.depths += climbing
+            ancestors[climbing] = self.parents[ancestors[climbing]]
+        else:
+            if count and (ancestors >= 0).any():
+                raise TypeError("The bone hierarchy contains a cycle")
+        self.order = np.argsort(self.depths, kind="stable")
+        self.levels = [
+            np.flatnonzero(self.depths == depth)
+            for depth in range(int(self.depths.max()) + 1 if count else 0)
+        ]
+
+        rows = np.array(
+            [
+                [
+                    (vertex.position.x, vertex.position.y, vertex.position.z)
+                    for vertex in skeleton.bone_matrices[index].bone_vertices
+                ]
+                for index in range(count)
+            ],
+            dtype=np.float64,
+        ).reshape(count, 4, 3)
+        self.inverse_bind = np.zeros((count, 4, 4))
+        self.inverse_bind[:, :3, :3] = rows[:, :3].transpose(0, 2, 1)
+        self.inverse_bind[:, :3, 3] = rows[:, 3]
+        self.inverse_bind[:, 3, 3] = 1
+        self.bind = np.linalg.inv(self.inverse_bind)
+        self.local_bind = self.bind.copy()
+        children = self.parents >= 0
+        self.local_bind[children] = (
+            self.inverse_bind[self.parents[children]] @ self.bind[children]
+        )
+
+    @classmethod
+    def from_drs(cls, drs) -> Optional["SkeletonIndex"]:
+        """Index of the skeleton of a DRS, None without one"""
+        if drs.csk_skeleton is None:
+            return None
+        return cls(drs.csk_skeleton)
+
+    def __len__(self) -> int:
+        return len(self.parents)
+
+    def bones_for(self, ska_identifiers) -> np.ndarray:
+        """Bone index of every SKA bone identifier, -1 where none matches"""
+        ska_identifiers = np.asarray(ska_identifiers, dtype=np.int64)
+        if not len(self):
+            return np.full(ska_identifiers.shape, -1, dtype=np.intp)
+        order = np.argsort(self.ska_identifiers, kind="stable")
+        known = self.ska_identifiers[order]
+        found = np.minimum(np.searchsorted(known, ska_identifiers), len(known) - 1)
+        return np.where(known[found] == ska_identifiers, order[found], -1)
+
+    def world(self, local: np.ndarray) -> np.ndarray:
+        """World matrices (..., B, 4, 4) of a pose given relative to the parents"""
+        return compose_hierarchy(local, self.parents, self.levels)
+
+    def skinning(self, world: np.ndarray) -> np.ndarray:
+        """Matrices (..., B, 4, 4) moving bind pose vertices into a posed
+        skeleton given by its world matrices"""
+        return world @ self.inverse_bind
+
+    def drs_bones(self) -> List[DRSBone]:
+        """DRSBone records of all bones, their bind pose in model space"""
+        rotations = matrix_quaternions(self.bind[:, :3, :3]).tolist()
+        locations = self.bind[:, :3, 3].tolist()
+        matrices = self.bind.tolist()
+        parents = self.parents.tolist()
+        result = []
+        for index, bone in enumerate(self.bones):
+            drs_bone = DRSBone()
+            drs_bone.ska_identifier = bone.version
+            drs_bone.identifier = bone.identifier
+            drs_bone.name = bone.name
+            drs_bone.parent = parents[index]
+            drs_bone.children = list(bone.children)
+            drs_bone.bone_matrix = Matrix(matrices[index])
+            drs_bone.bind_loc = Vector(locations[index])
+            drs_bone.bind_rot = Quaternion(rotations[index])
+            result.append(drs_bone)
+        return result
@@ -0,0 +1,484 @@
+"""Declarative binary layouts for the DRS data structures.
+
+A class lists its fields in file order with `binary_schema` and gets generated
+`read`, `write` and `size` methods:
+
+    @binary_schema(
+        Value("identifier", "i"),
+        Value("length", "i"),
+        String("name", "length"),
+        Value("spacer", "i"),
+    )
+    @dataclass(eq=False, repr=False)
+    class Texture:
+        ...
+
+Adjacent fixed-size values are coalesced into one precompiled struct.Struct,
+so Timing is decoded by a single unpack. When the file is a FileReader the
+generated reader unpacks straight from its memory map.
+
+Conditions are Python expressions over `self` and the extra read arguments
+named in `args`. If a class defines `after_read(self)`, the reader calls it
+last.
+
+Strings cut short by the end of the file raise a TypeError.
+
+With `direct_init=True` a CachedSize dataclass also gets a generated
+`__init__` in place of the dataclass one, which fills the instance dict
+directly. A new record has no cached size or parent to invalidate, so only
+the values of fields not annotated as int, float, str, bool or bytes are
+checked for lists and records to link. Classes that convert assigned
+values or override `__setattr__` cannot opt in.
+"""
+import dataclasses
+from functools import lru_cache
+from struct import Struct, calcsize
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from .cached_size import SCALARS, CachedSize, NodeList, adopt_value, memoize_size
+from .file_io import FileReader
+
+
+@lru_cache(maxsize=None)
+def array_struct(count: int, code: str) -> Struct:
+    """Returns the cached Struct for `count` repetitions of `code`"""
+    return Struct(f"<{count}{code}")
+
+
+class Value:
+    """Fixed-size value. A repeat count ("3f", "24B") makes it a list."""
+
+    def __init__(self, name: str, code: str) -> None:
+        self.name = name
+        self.code = code
+        self.repeat = int(code[:-1]) if len(code) > 1 else 0
+
+
+class Array:
+    """List of `code` values whose length is stored in the field `count`"""
+
+    def __init__(self, name: str, code: str, count: str) -> None:
+        self.name = name
+        self.code = code
+        self.count = count
+        self.item_size = calcsize(f"<{code}")
+
+
+class String:
+    """UTF-8 string whose byte length is stored in the field `length`"""
+
+    def __init__(self, name: str, length: str) -> None:
+        self.name = name
+        self.length = length
+
+
+class Records:
+    """List of `record_class` objects whose length is stored in the field `count`"""
+
+    def __init__(self, name: str, record_class: type, count: str) -> None:
+        self.name = name
+        self.record_class = record_class
+        self.count = count
+
+
+class Set:
+    """Assigns `expression` while reading. Nothing is written."""
+
+    def __init__(self, name: str, expression: str) -> None:
+        self.name = name
+        self.expression = expression
+
+
+class Tagged:
+    """A tag followed by one value that is stored in the attribute `targets[tag]`.
+
+    Unknown tags keep the value in `fallback` and raise a TypeError.
+    """
+
+    def __init__(
+        self, tag: str, tag_code: str, targets: Dict[int, str], code: str, fallback: str
+    ) -> None:
+        self.tag = tag
+        self.targets = targets
+        self.fallback = fallback
+        self.struct = Struct(f"<{tag_code}{code}")
+
+
+class If:
+    """Fields that are only present when `condition` holds.
+
+    `write` overrides the condition for write and size when the reader decides
+    on something that is not stored on the object (e.g. a read argument).
+    """
+
+    def __init__(
+        self,
+        condition: str,
+        *fields,
+        orelse: Sequence = (),
+        write: Optional[str] = None,
+    ) -> None:
+        self.condition = condition
+        self.fields = fields
+        self.orelse = tuple(orelse)
+        self.write = condition if write is None else write
+
+
+class _Compiler:
+    def __init__(self, class_name: str, cached: bool = False) -> None:
+        self.class_name = class_name
+        # Readers of CachedSize records store into the instance dict directly,
+        # a freshly read record has no cached size to invalidate.
+        self.cached = cached
+        self.namespace = {
+            "FileReader": FileReader,
+            "NodeList": NodeList,
+            "array_struct": array_struct,
+        }
+
+    def target(self, name: str) -> str:
+        return f"state[{name!r}]" if self.cached else f"self.{name}"
+
+    def node_list(self, items: str) -> str:
+        return f"NodeList({items}, self)" if self.cached else f"list({items})"
+
+    def constant(self, value) -> str:
+        name = f"_c{len(self.namespace)}"
+        self.namespace[name] = value
+        return name
+
+    @staticmethod
+    def runs(fields: Iterable) -> Iterable[Tuple[bool, List]]:
+        """Groups adjacent Values so they can share one Struct"""
+        run: List[Value] = []
+        for item in fields:
+            if isinstance(item, Value):
+                run.append(item)
+                continue
+            if run:
+                yield True, run
+                run = []
+            yield False, [item]
+        if run:
+            yield True, run
+
+    # Reading -------------------------------------------------------------
+
+    @staticmethod
+    def source(struct_name: str, size: int, mapped: bool, offset: int) -> str:
+        if not mapped:
+            return f"{struct_name}.unpack(file.read({size}))"
+        if offset:
+            return f"{struct_name}.unpack_from(buffer, position + {offset})"
+        return f"{struct_name}.unpack_from(buffer, position)"
+
+    def read_run(self, run: List[Value], mapped: bool, pad: str, offset: int) -> List[str]:
+        struct = Struct("<" + "".join(value.code for value in run))
+        source = self.source(self.constant(struct), struct.size, mapped, offset)
+        targets = []
+        lists = []
+        for value in run:
+            if value.repeat:
+                items = [f"_{len(targets) + index}" for index in range(value.repeat)]
+                targets += items
+                lists.append(f"{pad}{self.target(value.name)} = [{', '.join(items)}]")
+            else:
+                targets.append(self.target(value.name))
+        return [f"{pad}{', '.join(targets)}, = {source}", *lists]
+
+    def read_tagged(self, item: Tagged, mapped: bool, pad: str, offset: int) -> List[str]:
+        source = self.source(self.constant(item.struct), item.struct.size, mapped, offset)
+        targets = self.constant(item.targets)
+        return [
+            f"{pad}tag, value = {source}",
+            f"{pad}{self.target(item.tag)} = tag",
+            f"{pad}target = {targets}.get(tag)",
+            f"{pad}if target is None:",
+            f"{pad}    {self.target(item.fallback)} = value",
+            f"{pad}    raise TypeError(f'Unknown {self.class_name} {{value}}')",
+            f"{pad}state[target] = value" if self.cached else f"{pad}setattr(self, target, value)",
+        ]
+
+    def read_field(self, item, mapped: bool, pad: str) -> List[str]:
+        if isinstance(item, Array):
+            count = f"self.{item.count}"
+            struct = f"array_struct({count}, {item.code!r})"
+            if mapped:
+                return [
+                    f"{pad}{self.target(item.name)} = {self.node_list(f'{struct}.unpack_from(buffer, position)')}",
+                    f"{pad}position += {count} * {item.item_size}",
+                ]
+            return [
+                f"{pad}{self.target(item.name)} = {self.node_list(f'{struct}.unpack(file.read({count} * {item.item_size}))')}"
+            ]
+        if isinstance(item, String):
+            length = f"self.{item.length}"
+            where = f"{self.class_name}.{item.name}"
+            short = f"raise TypeError('Unexpected end of file in {where}')"
+            if mapped:
+                return [
+                    f"{pad}end = position + {length}",
+                    f"{pad}if end > len(data):",
+                    f"{pad}    {short}",
+                    f"{pad}{self.target(item.name)} = data[position:end].decode('utf-8').strip('\\x00')",
+                    f"{pad}position = end",
+                ]
+            return [
+                f"{pad}text = file.read({length})",
+                f"{pad}if len(text) != {length}:",
+                f"{pad}    {short}",
+                f"{pad}{self.target(item.name)} = text.decode('utf-8').strip('\\x00')",
+            ]
+        if isinstance(item, Records):
+            record_class = self.constant(item.record_class)
+            records = (
+                f"{self.target(item.name)} = "
+                + self.node_list(f"[{record_class}().read(file) for _ in range(self.{item.count})]")
+            )
+            if mapped:
+                return [
+                    f"{pad}file.position = position",
+                    f"{pad}{records}",
+                    f"{pad}position = file.position",
+                ]
+            return [f"{pad}{records}"]
+        if isinstance(item, If):
+            lines = [f"{pad}if {item.condition}:"]
+            lines += self.read_block(item.fields, mapped, pad + "    ")
+            if item.orelse:
+                lines.append(f"{pad}else:")
+                lines += self.read_block(item.orelse, mapped, pad + "    ")
+            return lines
+        raise TypeError(f"Unknown schema field {item!r}")
+
+    def read_block(self, fields: Sequence, mapped: bool, pad: str) -> List[str]:
+        """Reads fields in order. In the mapped reader fixed-size fields are
+        addressed relative to `position`, which only moves before a
+        variable-size field and at the end of the block."""
+        lines = []
+        offset = 0
+        for is_run, items in self.runs(fields):
+            item = items[0]
+            if is_run:
+                lines += self.read_run(items, mapped, pad, offset)
+                offset += calcsize("<" + "".join(value.code for value in items))
+            elif isinstance(item, Tagged):
+                lines += self.read_tagged(item, mapped, pad, offset)
+                offset += item.struct.size
+            elif isinstance(item, Set):
+                lines.append(f"{pad}{self.target(item.name)} = {item.expression}")
+            else:
+                if mapped and offset:
+                    lines.append(f"{pad}position += {offset}")
+                    offset = 0
+                lines += self.read_field(item, mapped, pad)
+        if mapped and offset:
+            lines.append(f"{pad}position += {offset}")
+        return lines or [f"{pad}pass"]
+
+    # Writing -------------------------------------------------------------
+
+    def write_block(self, fields: Sequence, pad: str) -> List[str]:
+        lines = []
+        for is_run, items in self.runs(fields):
+            if is_run:
+                struct = self.constant(
+                    Struct("<" + "".join(value.code for value in items))
+                )
+                arguments = ", ".join(
+                    f"*self.{value.name}" if value.repeat else f"self.{value.name}"
+                    for value in items
+                )
+                lines.append(f"{pad}file.write({struct}.pack({arguments}))")
+                continue
+            item = items[0]
+            if isinstance(item, Array):
+                lines.append(
+                    f"{pad}file.write(array_struct(self.{item.count}, {item.code!r})"
+                    f".pack(*self.{item.name}))"
+                )
+            elif isinstance(item, String):
+                lines.append(
+                    f"{pad}file.write(array_struct(self.{item.length}, 's')"
+                    f".pack(self.{item.name}.encode('utf-8')))"
+                )
+            elif isinstance(item, Records):
+                lines.append(f"{pad}for record in self.{item.name}:")
+                lines.append(f"{pad}    record.write(file)")
+            elif isinstance(item, Tagged):
+                struct = self.constant(item.struct)
+                targets = self.constant(item.targets)
+                lines += [
+                    f"{pad}target = {targets}.get(self.{item.tag})",
+                    f"{pad}if target is None:",
+                    f"{pad}    file.write({struct}.pack(self.{item.tag}, self.{item.fallback}))",
+                    f"{pad}    raise TypeError(f'Unknown {self.class_name} {{self.{item.fallback}}}')",
+                    f"{pad}file.write({struct}.pack(self.{item.tag}, getattr(self, target)))",
+                ]
+            elif isinstance(item, If) and item.write == "True":
+                lines += self.write_block(item.fields, pad)
+            elif isinstance(item, If):
+                lines += self.conditional(
+                    item,
+                    self.write_block(item.fields, pad + "    "),
+                    self.write_block(item.orelse, pad + "    "),
+                    pad,
+                )
+        return lines
+
+    # Size ----------------------------------------------------------------
+
+    def size_block(self, fields: Sequence, pad: str) -> List[str]:
+        static = 0
+        lines = []
+        for is_run, items in self.runs(fields):
+            if is_run:
+                static += calcsize("<" + "".join(value.code for value in items))
+                continue
+            item = items[0]
+            if isinstance(item, Array):
+                lines.append(f"{pad}size += self.{item.count} * {item.item_size}")
+            elif isinstance(item, String):
+                lines.append(f"{pad}size += self.{item.length}")
+            elif isinstance(item, Records):
+                lines.append(
+                    f"{pad}size += sum(record.size() for record in self.{item.name})"
+                )
+            elif isinstance(item, Tagged):
+                static += item.struct.size
+            elif isinstance(item, If) and item.write == "True":
+                lines += self.size_block(item.fields, pad)
+            elif isinstance(item, If):
+                lines += self.conditional(
+                    item,
+                    self.size_block(item.fields, pad + "    "),
+                    self.size_block(item.orelse, pad + "    "),
+                    pad,
+                )
+        if static:
+            lines.insert(0, f"{pad}size += {static}")
+        return lines
+
+    @staticmethod
+    def conditional(item: If, body: List[str], orelse: List[str], pad: str) -> List[str]:
+        lines = [f"{pad}if {item.write}:"] + (body or [f"{pad}    pass"])
+        if orelse:
+            lines += [f"{pad}else:"] + orelse
+        return lines
+
+    def compile(self, fields: Sequence, args: Sequence[str], after_read: bool) -> dict:
+        signature = ", ".join(["self", "file", *args])
+        finish = ["        self.after_read()"] if after_read else []
+        mapped = self.read_block(fields, True, "        ")
+        # Strings slice the mapping itself, which gives bytes without a view
+        strings = []
+        if any("data[" in line for line in mapped):
+            strings.append("        data = buffer.obj")
+        source = [
+            f"def read({signature}):",
+            *(["    state = self.__dict__"] if self.cached else []),
+            "    if file.__class__ is FileReader:",
+            "        buffer = file.buffer",
+            *strings,
+            "        position = file.position",
+            *mapped,
+            "        file.position = position",
+            *finish,
+            "        return self",
+            *self.read_block(fields, False, "    "),
+            *[line[4:] for line in finish],
+            "    return self",
+            "",
+            "def write(self, file):",
+            *(self.write_block(fields, "    ") or ["    pass"]),
+            "    return self",
+            "",
+            "def size(self):",
+            "    size = 0",
+            *self.size_block(fields, "    "),
+            "    return size",
+        ]
+        source = "\n".join(source)
+        exec(compile(source, f"<binary_schema {self.class_name}>", "exec"), self.namespace)
+        return {
+            "read": self.namespace["read"],
+            "write": self.namespace["write"],
+            "size": self.namespace["size"],
+            "schema_source": source,
+        }
+
+
+def dataclass_init(cls) -> dict:
+    """Source and namespace of a direct `__init__` for the CachedSize
+    dataclass `cls`"""
+    if not issubclass(cls, CachedSize) or not dataclasses.is_dataclass(cls):
+        raise TypeError(f"{cls.__name__} is no CachedSize dataclass")
+    if not cls.__dataclass_params__.init:
+        raise TypeError(f"{cls.__name__} defines its own __init__")
+    if cls._converters or cls.__setattr__ is not CachedSize.__setattr__:
+        raise TypeError(f"{cls.__name__} converts assigned values")
+    namespace = {
+        "SCALARS": SCALARS,
+        "adopt_value": adopt_value,
+        "MISSING": dataclasses.MISSING,
+    }
+    parameters = []
+    lines = ["    state = self.__dict__"]
+    for index, item in enumerate(dataclasses.fields(cls)):
+        name = item.name
+        if item.default_factory is not dataclasses.MISSING:
+            namespace[f"_f{index}"] = item.default_factory
+            default = f"_f{index}()"
+        elif item.default is not dataclasses.MISSING:
+            namespace[f"_d{index}"] = item.default
+            default = f"_d{index}"
+        else:
+            default = None
+        if item.init:
+            if item.default_factory is not dataclasses.MISSING:
+                parameters.append(f"{name}=MISSING")
+                lines.append(f"    if {name} is MISSING:")
+                lines.append(f"        {name} = {default}")
+            else:
+                parameters.append(name if default is None else f"{name}={default}")
+        elif default is not None:
+            lines.append(f"    {name} = {default}")
+        else:
+            continue
+        if item.type in SCALARS:
+            lines.append(f"    state[{name!r}] = {name}")
+        else:
+            lines.append(
+                f"    state[{name!r}] = {name} if {name}.__class__ in SCALARS "
+                f"else adopt_value(self, {name})"
+            )
+    if hasattr(cls, "__post_init__"):
+        lines.append("    self.__post_init__()")
+    source = "\n".join([f"def __init__(self, {', '.join(parameters)}):", *lines])
+    return {"source": source, "namespace": namespace}
+
+
+def binary_schema(*fields, args: Sequence[str] = (), direct_init: bool = False):
+    """Class decorator generating read, write and size from `fields`, and
+    `__init__` with direct_init=True"""
+
+    def decorate(cls):
+        compiler = _Compiler(cls.__name__, issubclass(cls, CachedSize))
+        generated = compiler.compile(fields, args, hasattr(cls, "after_read"))
+        for name, function in generated.items():
+            if callable(function):
+                function.__qualname__ = f"{cls.__qualname__}.{name}"
+            setattr(cls, name, function)
+        if issubclass(cls, CachedSize):
+            memoize_size(cls)
+        if direct_init:
+            init = dataclass_init(cls)
+            namespace = init["namespace"]
+            file_name = f"<binary_schema {cls.__name__}>"
+            exec(compile(init["source"], file_name, "exec"), namespace)
+            namespace["__init__"].__qualname__ = f"{cls.__qualname__}.__init__"
+            cls.__init__ = namespace["__init__"]
+        cls.schema = fields
+        return cls
+
+    return decorate
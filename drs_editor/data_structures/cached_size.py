@@ -0,0 +1,149 @@
+"""Memoized `size()` for the variable-size records of the node tree.
+
+A record deriving from `CachedSize` computes its serialized size once and
+keeps it until one of its fields changes. Assigning a record or a list to a
+field links it to its owner, so an edit anywhere below a node clears the
+cached sizes on the way up to it, while the rest of the tree stays cached.
+A class may convert the values assigned to some fields through
+`_converters`, e.g. a list of Face records into a FaceBuffer.
+"""
+from typing import Iterable
+
+# Field values that never need linking to their owner
+SCALARS = frozenset((int, float, str, bool, bytes, type(None)))
+
+
+class CachedSize:
+    """Mixin for dataclasses whose `size()` walks their children"""
+
+    _size = None
+    _parent = None
+    # Conversions of the values assigned to a field, by field name
+    _converters = {}
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        memoize_size(cls)
+
+    def __setattr__(self, name: str, value) -> None:
+        if name[0] != "_":
+            if value.__class__ not in SCALARS:
+                converter = self._converters.get(name)
+                if converter is not None:
+                    value = converter(value)
+                value = adopt_value(self, value)
+            if self._size is not None or self._parent is not None:
+                self.invalidate_size()
+        object.__setattr__(self, name, value)
+
+    def invalidate_size(self) -> None:
+        """Drops the cached size of this record and of every record above it"""
+        node = self
+        while node is not None:
+            if node._size is not None:
+                object.__setattr__(node, "_size", None)
+            node = node._parent
+
+
+def adopt_value(owner: CachedSize, value):
+    """Links a record or list assigned to a field of `owner` to it. Plain
+    lists become NodeLists."""
+    if value.__class__ is list:
+        return NodeList(value, owner)
+    if value.__class__ is NodeList:
+        value.owner = owner
+        value.adopt(value)
+    elif isinstance(value, CachedSize):
+        object.__setattr__(value, "_parent", owner)
+    return value
+
+
+def memoize_size(cls: type) -> None:
+    """Replaces `cls.size` by a version returning the cached value while the
+    record is unchanged. Sizes that depend on arguments are left alone."""
+    size = cls.__dict__.get("size")
+    if size is None or getattr(size, "memoized", False):
+        return
+    if size.__code__.co_argcount != 1:
+        return
+
+    def cached_size(self) -> int:
+        value = self._size
+        if value is None:
+            value = size(self)
+            object.__setattr__(self, "_size", value)
+        return value
+
+    cached_size.memoized = True
+    cached_size.__doc__ = size.__doc__
+    cls.size = cached_size
+
+
+class NodeList(list):
+    """List of child records that invalidates its owner's size when it changes"""
+
+    __slots__ = ("owner",)
+
+    def __init__(self, items: Iterable = (), owner: CachedSize = None):
+        list.__init__(self, items)
+        self.owner = owner
+        if self:
+            self.adopt(self)
+
+    def adopt(self, items: Iterable) -> None:
+        for item in items:
+            if not isinstance(item, CachedSize):
+                # Lists hold either records or plain values
+                return
+            object.__setattr__(item, "_parent", self.owner)
+
+    def changed(self) -> None:
+        if self.owner is not None:
+            self.owner.invalidate_size()
+
+    def __setitem__(self, index, value) -> None:
+        super().__setitem__(index, value)
+        self.adopt(value if isinstance(index, slice) else (value,))
+        self.changed()
+
+    def __delitem__(self, index) -> None:
+        super().__delitem__(index)
+        self.changed()
+
+    def __iadd__(self, items: Iterable) -> "NodeList":
+        self.extend(items)
+        return self
+
+    def __imul__(self, count: int) -> "NodeList":
+        super().__imul__(count)
+        self.changed()
+        return self
+
+    def append(self, item) -> None:
+        super().append(item)
+        self.adopt((item,))
+        self.changed()
+
+    def extend(self, items: Iterable) -> None:
+        items = list(items)
+        super().extend(items)
+        self.adopt(items)
+        self.changed()
+
+    def insert(self, index: int, item) -> None:
+        super().insert(index, item)
+        self.adopt((item,))
+        self.changed()
+
+    def pop(self, index: int = -1):
+        item = super().pop(index)
+        self.changed()
+        return item
+
+    def remove(self, item) -> None:
+        super().remove(item)
+        self.changed()
+
+    def clear(self) -> None:
+        super().clear()
+        self.changed()
@@ -1,7 +1,10 @@
-from dataclasses import dataclass, field
+from collections.abc import Sequence
+from dataclasses import InitVar, dataclass, field
 from struct import calcsize, pack, unpack
 from typing import List, Union, BinaryIO, Optional
 
+import numpy as np
+
 try:
     from mathutils import Vector, Matrix, Quaternion
 except ImportError:
@@ -11,7 +14,9 @@ except ImportError:
 # Ensure file_io can be found. If drs_definitions and file_io are in the same package (data_structures)
 # and data_structures has an __init__.py, this relative import should work when
 # data_structures is treated as part of the drs_editor package.
-from .file_io import FileReader, FileWriter
+from .binary_schema import Array, If, Records, Set, String, Tagged, Value, binary_schema
+from .cached_size import CachedSize
+from .file_io import BufferWriter, FileReader, read_array
 
 
 def unpack_data(file: BinaryIO, *formats: str) -> List[List[Union[float, int]]]:
@@ -21,6 +26,35 @@ def unpack_data(file: BinaryIO, *formats: str) -> List[List[Union[float, int]]]:
     return result
 
 
+# Vertex layout of every MeshData revision
+VertexFormats = {
+    133121: [("position", "<f4", (3,)), ("normal", "<f4", (3,)), ("texture", "<f4", (2,))],
+    12288: [("tangent", "<f4", (3,)), ("bitangent", "<f4", (3,))],
+    2049: [("tangent", "<f4", (3,)), ("bitangent", "<f4", (3,))],
+    12: [("raw_weights", "u1", (4,)), ("bone_indices", "u1", (4,))],
+    163841: [("position", "<f4", (3,)), ("texture", "<f4", (2,)), ("unknown", "u1", (4,))],
+}
+
+
+def vertex_dtype(revision: int, vertex_size: int) -> np.dtype:
+    """Returns the structured dtype of one vertex, padded to vertex_size"""
+    fields = VertexFormats.get(revision)
+    if fields is None:
+        # Unknown revision: keep the raw bytes so they survive a round trip
+        return np.dtype([("raw", f"V{vertex_size}")])
+    dtype = np.dtype(fields)
+    if vertex_size > dtype.itemsize:
+        dtype = np.dtype(
+            {
+                "names": dtype.names,
+                "formats": [dtype.fields[name][0] for name in dtype.names],
+                "offsets": [dtype.fields[name][1] for name in dtype.names],
+                "itemsize": vertex_size,
+            }
+        )
+    return dtype
+
+
 MagicValues = {
     "CDspJointMap": -1340635850,
     "CGeoMesh": 100449016,
@@ -171,6 +205,24 @@ WriteOrder = {
     ],
 }
 
+NodeAttributes = {
+    "AnimationSet": "animation_set_node",
+    "CDspMeshFile": "cdsp_mesh_file_node",
+    "CGeoMesh": "cgeo_mesh_node",
+    "CSkSkinInfo": "csk_skin_info_node",
+    "CSkSkeleton": "csk_skeleton_node",
+    "AnimationTimings": "animation_timings_node",
+    "CDspJointMap": "cdsp_joint_map_node",
+    "CGeoOBBTree": "cgeo_obb_tree_node",
+    "DrwResourceMeta": "drw_resource_meta_node",
+    "CGeoPrimitiveContainer": "cgeo_primitive_container_node",
+    "collisionShape": "collision_shape_node",
+    "EffectSet": "effect_set_node",
+    "CDrwLocatorList": "cdrw_locator_list_node",
+    "CGdLocatorList": "gd_locator_list_node",  # Not yet implemented
+    "FxMaster": "fx_master_node",  # Not yet implemented
+}
+
 
 @dataclass(eq=False, repr=False)
 class RootNode:
@@ -327,55 +379,55 @@ class Vertex:
         return self
 
     def write(self, file: BinaryIO) -> None:
-        if self.position:
+        if len(self.position):
             file.write(pack("f", self.position[0]))
             file.write(pack("f", self.position[1]))
             file.write(pack("f", self.position[2]))
-        if self.normal:
+        if len(self.normal):
             file.write(pack("f", self.normal[0]))
             file.write(pack("f", self.normal[1]))
             file.write(pack("f", self.normal[2]))
-        if self.texture:
+        if len(self.texture):
             file.write(pack("f", self.texture[0]))
             file.write(pack("f", self.texture[1]))
-        if self.tangent:
+        if len(self.tangent):
             file.write(pack("f", self.tangent[0]))
             file.write(pack("f", self.tangent[1]))
             file.write(pack("f", self.tangent[2]))
-        if self.bitangent:
+        if len(self.bitangent):
             file.write(pack("f", self.bitangent[0]))
             file.write(pack("f", self.bitangent[1]))
             file.write(pack("f", self.bitangent[2]))
-        if self.raw_weights:
+        if len(self.raw_weights):
             file.write(pack("B", self.raw_weights[0]))
             file.write(pack("B", self.raw_weights[1]))
             file.write(pack("B", self.raw_weights[2]))
             file.write(pack("B", self.raw_weights[3]))
-        if self.bone_indices:
+        if len(self.bone_indices):
             file.write(pack("B", self.bone_indices[0]))
             file.write(pack("B", self.bone_indices[1]))
             file.write(pack("B", self.bone_indices[2]))
             file.write(pack("B", self.bone_indices[3]))
 
     def size(self) -> int:
-        if self.position:
+        if len(self.position):
             return 12
-        if self.normal:
+        if len(self.normal):
             return 12
-        if self.texture:
+        if len(self.texture):
             return 8
-        if self.tangent:
+        if len(self.tangent):
             return 12
-        if self.bitangent:
+        if len(self.bitangent):
             return 12
-        if self.raw_weights:
+        if len(self.raw_weights):
             return 4
-        if self.bone_indices:
+        if len(self.bone_indices):
             return 4
         return 0
 
 
-@dataclass(eq=False, repr=False)
+@dataclass(eq=False, repr=False, slots=True)
 class VertexData:
     weights: List[float] = field(default_factory=lambda: [0.0] * 4)
     bone_indices: List[int] = field(default_factory=lambda: [0] * 4)
@@ -392,7 +444,7 @@ class VertexData:
         return 32
 
 
-@dataclass(eq=False, repr=False)
+@dataclass(eq=False, repr=False, slots=True)
 class Face:
     indices: List[int] = field(default_factory=lambda: [0] * 3)
 
@@ -407,17 +459,68 @@ class Face:
         return 6
 
 
-@dataclass(repr=False)
+class FaceBuffer(CachedSize, Sequence):
+    """Triangle index buffer held as one (N, 3) uint16 array.
+
+    Indexing returns a Face whose indices are a view into the buffer, so code
+    written against List[Face] keeps working.
+    """
+
+
+    def __init__(self, indices=None) -> None:
+        if indices is None:
+            indices = np.zeros((0, 3), dtype="<u2")
+        elif not isinstance(indices, np.ndarray):
+            indices = [getattr(face, "indices", face) for face in indices]
+        self.indices = np.asarray(indices, dtype="<u2").reshape(-1, 3)
+
+    def __len__(self) -> int:
+        return len(self.indices)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return FaceBuffer(self.indices[index])
+        return Face(self.indices[index])
+
+    def __iter__(self):
+        for row in self.indices:
+            yield Face(row)
+
+    def read(self, file: BinaryIO, face_count: int) -> "FaceBuffer":
+        self.indices = read_array(file, "<u2", (face_count, 3))
+        return self
+
+    def write(self, file: BinaryIO) -> None:
+        file.write(self.indices.tobytes())
+
+    def size(self) -> int:
+        return 6 * len(self.indices)
+
+
+def face_buffer(faces) -> FaceBuffer:
+    """`faces` as a FaceBuffer: Face records, index triples or an (M, 3) array"""
+    return faces if isinstance(faces, FaceBuffer) else FaceBuffer(faces)
+
+
+@dataclass(repr=False, slots=True)
 class Vector4:
     x: float = 0.0
     y: float = 0.0
     z: float = 0.0
     w: float = 0.0
-    xyz: Vector = field(default_factory=lambda: Vector((0, 0, 0)))
+
+    @property
+    def xyz(self) -> Vector:
+        """A copy of x, y and z. Edits of the copy are not written back, assign
+        xyz or x, y and z instead."""
+        return Vector((self.x, self.y, self.z))
+
+    @xyz.setter
+    def xyz(self, value) -> None:
+        self.x, self.y, self.z = value
 
     def read(self, file: BinaryIO) -> "Vector4":
         self.x, self.y, self.z, self.w = unpack("4f", file.read(16))
-        self.xyz = Vector((self.x, self.y, self.z))
         return self
 
     def write(self, file: BinaryIO) -> None:
@@ -427,19 +530,24 @@ class Vector4:
         return 16
 
 
-@dataclass(repr=False)
+@dataclass(repr=False, slots=True)
 class Vector3:
     x: float = 0.0
     y: float = 0.0
     z: float = 0.0
-    xyz: Vector = field(default_factory=lambda: Vector((0, 0, 0)))
 
-    def __post_init__(self):
-        self.xyz = Vector((self.x, self.y, self.z))
+    @property
+    def xyz(self) -> Vector:
+        """A copy of x, y and z. Edits of the copy are not written back, assign
+        xyz or x, y and z instead."""
+        return Vector((self.x, self.y, self.z))
+
+    @xyz.setter
+    def xyz(self, value) -> None:
+        self.x, self.y, self.z = value
 
     def read(self, file: BinaryIO) -> "Vector3":
         self.x, self.y, self.z = unpack("3f", file.read(12))
-        self.xyz = Vector((self.x, self.y, self.z))
         return self
 
     def write(self, file: BinaryIO) -> None:
@@ -458,9 +566,11 @@ class Matrix4x4:
         return self
 
     def write(self, file: BinaryIO) -> None:
-        # We have 4 Tuples of 4 floats
-        for i in range(4):
-            file.write(pack("4f", *self.matrix[i]))
+        # Either 4 Tuples of 4 floats or 16 floats as read from a file
+        if len(self.matrix) == 16:
+            file.write(pack("16f", *self.matrix))
+        else:
+            file.write(pack("16f", *(value for row in self.matrix for value in row)))
 
     def size(self) -> int:
         return 64
@@ -509,80 +619,243 @@ class CMatCoordinateSystem:
         return self.matrix.size() + self.position.size()
 
 
+def vertex_array(vertices) -> np.ndarray:
+    """`vertices` as an (N, 4) float32 array: Vector4 records or 4-tuples"""
+    if isinstance(vertices, np.ndarray) and vertices.dtype == "<f4":
+        return vertices
+    vertices = [
+        (vertex.x, vertex.y, vertex.z, vertex.w)
+        if isinstance(vertex, Vector4)
+        else vertex
+        for vertex in vertices
+    ]
+    return np.array(vertices, dtype="<f4").reshape(-1, 4)
+
+
 @dataclass(eq=False, repr=False)
-class CGeoMesh:
+class CGeoMesh(CachedSize):
+    """Collision mesh. vertices is an (N, 4) float32 array, faces a FaceBuffer
+    over an (M, 3) uint16 index array. Vector4 lists assigned to vertices are
+    packed into one, and vertex_count follows the vertices."""
+
     magic: int = 1
     index_count: int = 0
-    faces: List[Face] = field(default_factory=list)
+    faces: FaceBuffer = field(default_factory=FaceBuffer)
     vertex_count: int = 0
-    vertices: List[Vector4] = field(default_factory=list)
+    vertices: np.ndarray = field(default_factory=lambda: np.zeros((0, 4), dtype="<f4"))
+    _converters = {"faces": face_buffer, "vertices": vertex_array}
+
+    def __setattr__(self, name: str, value) -> None:
+        super().__setattr__(name, value)
+        if name == "vertices":
+            super().__setattr__("vertex_count", len(self.vertices))
 
     def read(self, file: BinaryIO) -> "CGeoMesh":
         self.magic, self.index_count = unpack("ii", file.read(8))
-        self.faces = [Face().read(file) for _ in range(self.index_count // 3)]
+        self.faces = FaceBuffer().read(file, self.index_count // 3)
         self.vertex_count = unpack("i", file.read(4))[0]
-        for _ in range(self.vertex_count):
-            x, y, z, w = unpack("4f", file.read(16))
-            self.vertices.append(Vector4(x, y, z, w))
+        self.vertices = read_array(file, "<f4", (self.vertex_count, 4))
         return self
 
     def write(self, file: BinaryIO) -> None:
         file.write(pack("ii", self.magic, self.index_count))
-        for face in self.faces:
-            face.write(file)
+        self.faces.write(file)
         file.write(pack("i", self.vertex_count))
-        for vertex in self.vertices:
-            vertex.write(file)
+        file.write(np.ascontiguousarray(self.vertices, dtype="<f4").tobytes())
 
     def size(self) -> int:
-        return 12 + 6 * len(self.faces) + 16 * len(self.vertices)
+        return 12 + self.faces.size() + 16 * len(self.vertices)
 
+    def bounds(self) -> Optional[np.ndarray]:
+        """(2, 3) array of the lower and upper corner around the vertices"""
+        if not len(self.vertices):
+            return None
+        positions = self.vertices[:, :3]
+        return np.stack([positions.min(axis=0), positions.max(axis=0)])
+
+
+# Layout of one CSkSkinInfo record
+SkinRecord = np.dtype([("weights", "<f4", (4,)), ("bone_indices", "<i4", (4,))])
+
+
+class SkinView(Sequence):
+    """Per-vertex view of a CSkSkinInfo.
+
+    Every VertexData it hands out holds numpy views into the weights and
+    bone_indices arrays, so edits through it land in the skin info itself.
+    """
+
+    def __init__(self, skin_info: "CSkSkinInfo") -> None:
+        self.skin_info = skin_info
+
+    def __len__(self) -> int:
+        return len(self.skin_info.weights)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        return VertexData(
+            self.skin_info.weights[index], self.skin_info.bone_indices[index]
+        )
+
+
+@dataclass(eq=False, repr=False, init=False)
+class CSkSkinInfo(CachedSize):
+    """Skin weights. weights is an (N, 4) float32 array, bone_indices an
+    (N, 4) int32 array; vertex_data gives per-vertex VertexData views."""
 
-@dataclass(eq=False, repr=False)
-class CSkSkinInfo:
     version: int = 1
     vertex_count: int = 0
-    vertex_data: List[VertexData] = field(default_factory=list)
+    weights: np.ndarray = field(default_factory=lambda: np.zeros((0, 4), dtype="<f4"))
+    bone_indices: np.ndarray = field(
+        default_factory=lambda: np.zeros((0, 4), dtype="<i4")
+    )
+
+    def __init__(
+        self,
+        version: int = 1,
+        vertex_count: int = 0,
+        vertex_data: Optional[List[VertexData]] = None,
+        weights: Optional[np.ndarray] = None,
+        bone_indices: Optional[np.ndarray] = None,
+    ) -> None:
+        """vertex_data, a list of VertexData records, fills weights and
+        bone_indices"""
+        self.version = version
+        self.vertex_count = vertex_count
+        if weights is None:
+            weights = np.zeros((0, 4), dtype="<f4")
+        if bone_indices is None:
+            bone_indices = np.zeros((0, 4), dtype="<i4")
+        self.weights = weights
+        self.bone_indices = bone_indices
+        if vertex_data is not None:
+            self.vertex_data = vertex_data
+
+    @property
+    def vertex_data(self) -> SkinView:
+        return SkinView(self)
+
+    @vertex_data.setter
+    def vertex_data(self, vertex_data: List[VertexData]) -> None:
+        self.weights = np.array(
+            [vertex.weights for vertex in vertex_data], dtype="<f4"
+        ).reshape(-1, 4)
+        self.bone_indices = np.array(
+            [vertex.bone_indices for vertex in vertex_data], dtype="<i4"
+        ).reshape(-1, 4)
 
     def read(self, file: BinaryIO) -> "CSkSkinInfo":
         self.version, self.vertex_count = unpack("ii", file.read(8))
-        self.vertex_data = [VertexData().read(file) for _ in range(self.vertex_count)]
+        records = read_array(file, SkinRecord, self.vertex_count)
+        self.weights = np.ascontiguousarray(records["weights"])
+        self.bone_indices = np.ascontiguousarray(records["bone_indices"])
         return self
 
     def write(self, file: BinaryIO) -> None:
         file.write(pack("ii", self.version, self.vertex_count))
-        for vertex in self.vertex_data:
-            vertex.write(file)
+        records = np.empty(len(self.weights), dtype=SkinRecord)
+        records["weights"] = self.weights
+        records["bone_indices"] = self.bone_indices
+        file.write(records.tobytes())
 
     def size(self) -> int:
-        return 8 + sum(vd.size() for vd in self.vertex_data)
+        return 8 + SkinRecord.itemsize * len(self.weights)
 
 
-@dataclass(eq=False, repr=False)
-class MeshData:
+class VertexView(Sequence):
+    """Per-vertex view of a MeshData stream.
+
+    Every Vertex it hands out holds numpy views into MeshData.data, so
+    edits through vertex.position[0] = ... land in the stream itself.
+    """
+
+    def __init__(self, mesh_data: "MeshData") -> None:
+        self.mesh_data = mesh_data
+
+    def __len__(self) -> int:
+        return len(self.mesh_data.data)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        data = self.mesh_data.data
+        vertex = Vertex()
+        for name in data.dtype.names:
+            if name in Vertex.__dataclass_fields__:
+                setattr(vertex, name, data[name][index])
+        if self.mesh_data.revision == 163841:
+            normals = self.mesh_data._normals
+            if normals is not None and len(normals) == len(data):
+                vertex.normal = normals[index]
+            else:
+                vertex.normal = [0.0, 0.0, 0.0]
+        return vertex
+
+
+@dataclass(eq=False, repr=False, init=False)
+class MeshData(CachedSize):
     revision: int = 0
     vertex_size: int = 0
-    vertices: List[Vertex] = field(default_factory=list)
+    data: Optional[np.ndarray] = None  # Structured array, see VertexFormats
+    # Derived normals of revisions without a normal field, never written
+    _normals = None
+
+    def __init__(
+        self,
+        revision: int = 0,
+        vertex_size: int = 0,
+        vertices: Optional[List[Vertex]] = None,
+        data: Optional[np.ndarray] = None,
+    ) -> None:
+        """vertices, a list of Vertex records, is packed into data"""
+        self.revision = revision
+        self.vertex_size = vertex_size
+        if data is None:
+            data = np.zeros(0, dtype=vertex_dtype(revision, vertex_size))
+        self.data = data
+        if vertices is not None:
+            self.vertices = vertices
+
+    @property
+    def vertices(self) -> VertexView:
+        return VertexView(self)
+
+    @vertices.setter
+    def vertices(self, vertices: List[Vertex]) -> None:
+        self.data = np.zeros(
+            len(vertices), dtype=vertex_dtype(self.revision, self.vertex_size)
+        )
+        for name in self.data.dtype.names:
+            if name in Vertex.__dataclass_fields__ and len(vertices):
+                self.data[name] = [getattr(vertex, name) for vertex in vertices]
 
     def read(self, file: BinaryIO, vertex_count: int) -> "MeshData":
         self.revision, self.vertex_size = unpack("ii", file.read(8))
-        self.vertices = [
-            Vertex().read(file, self.revision) for _ in range(vertex_count)
-        ]
+        self.data = read_array(
+            file, vertex_dtype(self.revision, self.vertex_size), vertex_count
+        )
         return self
 
     def write(self, file: BinaryIO) -> None:
         file.write(pack("ii", self.revision, self.vertex_size))
-        for vertex in self.vertices:
-            vertex.write(file)
+        file.write(self.data.tobytes())
 
     def size(self) -> int:
-        s = 8 + self.vertex_size * len(self.vertices)
-        return s
+        return 8 + self.data.nbytes
 
 
+@binary_schema(
+    Value("version", "I"),
+    Value("identifier", "i"),
+    Value("name_length", "i"),
+    String("name", "name_length"),
+    Value("child_count", "i"),
+    Array("children", "i", "child_count"),
+    direct_init=True,
+)
 @dataclass(eq=False, repr=False)
-class Bone:
+class Bone(CachedSize):
     version: int = 0  # uint
     identifier: int = 0
     name_length: int = field(default=0, init=False)
@@ -591,41 +864,18 @@ class Bone:
     children: List[int] = field(default_factory=list)
 
     def __post_init__(self):
-        self.name_length = len(self.name)
+        # A new record has no cached size to invalidate
+        self.__dict__["name_length"] = len(self.name)
 
-    def read(self, file: BinaryIO) -> "Bone":
-        self.version = unpack("I", file.read(4))[0]
-        self.identifier = unpack("i", file.read(4))[0]
-        self.name_length = unpack("i", file.read(4))[0]
-        self.name = (
-            unpack(f"{self.name_length}s", file.read(calcsize(f"{self.name_length}s")))[
-                0
-            ]
-            .decode("utf-8")
-            .strip("\x00")
-        )
+    def after_read(self) -> None:
         # Bone Name Fixes
-        self.name = self.name.replace("building_bandits_air_defense_launcher_", "")
-        self.name = self.name.replace("building_nature_versatile_tower_", "")
-        if len(self.name) > 63:
-            self.name = str(hash(self.name))
-            print(f"Hashed Bone Name: {self.name}")
-        self.child_count = unpack("i", file.read(4))[0]
-        self.children = list(
-            unpack(f"{self.child_count}i", file.read(calcsize(f"{self.child_count}i")))
-        )
-        return self
-
-    def write(self, file: BinaryIO) -> None:
-        file.write(pack("I", self.version))
-        file.write(pack("i", self.identifier))
-        file.write(pack("i", self.name_length))
-        file.write(pack(f"{self.name_length}s", self.name.encode("utf-8")))
-        file.write(pack("i", self.child_count))
-        file.write(pack(f"{self.child_count}i", *self.children))
-
-    def size(self) -> int:
-        return 12 + self.name_length + 4 + calcsize(f"{self.child_count}i")
+        name = self.name.replace("building_bandits_air_defense_launcher_", "")
+        name = name.replace("building_nature_versatile_tower_", "")
+        if len(name) > 63:
+            name = str(hash(name))
+            print(f"Hashed Bone Name: {name}")
+        if name != self.name:
+            self.name = name
 
 
 @dataclass(eq=False, repr=False)
@@ -645,7 +895,7 @@ class BoneMatrix:
         return sum(bv.size() for bv in self.bone_vertices)
 
 
-@dataclass(eq=False, repr=False)
+@dataclass(eq=False, repr=False, slots=True)
 class BoneVertex:
     position: "Vector3" = field(default_factory=Vector3)
     parent: int = 0
@@ -684,7 +934,7 @@ class BoneWeight:
 
 
 @dataclass(eq=False, repr=False)
-class CSkSkeleton:
+class CSkSkeleton(CachedSize):
     magic: int = 1558308612
     version: int = 3
     bone_matrix_count: int = 0
@@ -725,33 +975,27 @@ class CSkSkeleton:
         )
 
 
+@binary_schema(
+    Value("identifier", "i"),
+    Value("length", "i"),
+    String("name", "length"),
+    Value("spacer", "i"),
+    direct_init=True,
+)
 @dataclass(eq=False, repr=False)
-class Texture:
+class Texture(CachedSize):
     identifier: int = 0
     length: int = field(default=0, init=False)
     name: str = ""
     spacer: int = 0
 
     def __post_init__(self):
-        self.length = len(self.name)
-
-    def read(self, file: BinaryIO) -> "Texture":
-        self.identifier, self.length = unpack("ii", file.read(8))
-        self.name = file.read(self.length).decode("utf-8").strip("\x00")
-        self.spacer = unpack("i", file.read(4))[0]
-        return self
-
-    def write(self, file: BinaryIO) -> None:
-        file.write(pack("ii", self.identifier, self.length))
-        file.write(self.name.encode("utf-8"))
-        file.write(pack("i", self.spacer))
-
-    def size(self) -> int:
-        return 8 + self.length + 4
+        # A new record has no cached size to invalidate
+        self.__dict__["length"] = len(self.name)
 
 
 @dataclass(eq=False, repr=False)
-class Textures:
+class Textures(CachedSize):
     length: int = 0
     textures: List["Texture"] = field(default_factory=list)
 
@@ -770,8 +1014,27 @@ class Textures:
         return 4 + sum(texture.size() for texture in self.textures)
 
 
-@dataclass(eq=False, repr=False)
+# Material identifier -> attribute holding its value
+MaterialParameters = {
+    1668510769: "smoothness",
+    1668510770: "metalness",
+    1668510771: "reflectivity",
+    1668510772: "emissivity",
+    1668510773: "refraction_scale",
+    1668510774: "distortion_mesh_scale",
+    1935897704: "scratch",
+    1668510775: "specular_scale",
+    1668510776: "wind_response",
+    1668510777: "wind_height",
+    1935893623: "depth_write_threshold",
+    1668510785: "saturation",
+}
+
+
+@binary_schema(Tagged("identifier", "i", MaterialParameters, "f", "unknown"))
+@dataclass(eq=False, repr=False, slots=True)
 class Material:
+    index: InitVar[Optional[int]] = None
     identifier: int = 0
     smoothness: float = 0.0
     metalness: float = 0.0
@@ -787,8 +1050,8 @@ class Material:
     saturation: float = 0.0
     unknown: float = 0.0
 
-    def __init__(self, index: int = None) -> None:
-        """Material Constructor"""
+    def __post_init__(self, index: Optional[int]) -> None:
+        """Presets the parameter of the material at `index` in Materials"""
         if index is not None:
             if index == 0:
                 self.identifier = 1668510769
@@ -827,76 +1090,9 @@ class Material:
                 self.identifier = 1668510785
                 self.saturation = 1.0
 
-    def read(self, file: BinaryIO) -> "Material":
-        """Reads the Material from the buffer"""
-        self.identifier = unpack("i", file.read(4))[0]
-        if self.identifier == 1668510769:
-            self.smoothness = unpack("f", file.read(4))[0]
-        elif self.identifier == 1668510770:
-            self.metalness = unpack("f", file.read(4))[0]
-        elif self.identifier == 1668510771:
-            self.reflectivity = unpack("f", file.read(4))[0]
-        elif self.identifier == 1668510772:
-            self.emissivity = unpack("f", file.read(4))[0]
-        elif self.identifier == 1668510773:
-            self.refraction_scale = unpack("f", file.read(4))[0]
-        elif self.identifier == 1668510774:
-            self.distortion_mesh_scale = unpack("f", file.read(4))[0]
-        elif self.identifier == 1935897704:
-            self.scratch = unpack("f", file.read(4))[0]
-        elif self.identifier == 1668510775:
-            self.specular_scale = unpack("f", file.read(4))[0]
-        elif self.identifier == 1668510776:
-            self.wind_response = unpack("f", file.read(4))[0]
-        elif self.identifier == 1668510777:
-            self.wind_height = unpack("f", file.read(4))[0]
-        elif self.identifier == 1935893623:
-            self.depth_write_threshold = unpack("f", file.read(4))[0]
-        elif self.identifier == 1668510785:
-            self.saturation = unpack("f", file.read(4))[0]
-        else:
-            self.unknown = unpack("f", file.read(4))[0]
-            raise TypeError(f"Unknown Material {self.unknown}")
-        return self
-
-    def write(self, file: BinaryIO) -> None:
-        """Writes the Material to the buffer"""
-        file.write(pack("i", self.identifier))
-        if self.identifier == 1668510769:
-            file.write(pack("f", self.smoothness))
-        elif self.identifier == 1668510770:
-            file.write(pack("f", self.metalness))
-        elif self.identifier == 1668510771:
-            file.write(pack("f", self.reflectivity))
-        elif self.identifier == 1668510772:
-            file.write(pack("f", self.emissivity))
-        elif self.identifier == 1668510773:
-            file.write(pack("f", self.refraction_scale))
-        elif self.identifier == 1668510774:
-            file.write(pack("f", self.distortion_mesh_scale))
-        elif self.identifier == 1935897704:
-            file.write(pack("f", self.scratch))
-        elif self.identifier == 1668510775:
-            file.write(pack("f", self.specular_scale))
-        elif self.identifier == 1668510776:
-            file.write(pack("f", self.wind_response))
-        elif self.identifier == 1668510777:
-            file.write(pack("f", self.wind_height))
-        elif self.identifier == 1935893623:
-            file.write(pack("f", self.depth_write_threshold))
-        elif self.identifier == 1668510785:
-            file.write(pack("f", self.saturation))
-        else:
-            file.write(pack("f", self.unknown))
-            raise TypeError(f"Unknown Material {self.unknown}")
-        return self
-
-    def size(self) -> int:
-        return 4 + 4
-
 
 @dataclass(eq=False, repr=False)
-class Materials:
+class Materials(CachedSize):
     length: int = 12
     materials: List["Material"] = field(
         default_factory=lambda: [Material(index) for index in range(12)]
@@ -918,7 +1114,7 @@ class Materials:
 
 
 @dataclass(eq=False, repr=False)
-class Refraction:
+class Refraction(CachedSize):
     length: int = 0
     identifier: int = 1668510769
     rgb: List[float] = field(default_factory=lambda: [0.0, 0.0, 0.0])
@@ -949,7 +1145,7 @@ class Refraction:
 
 
 @dataclass(eq=False, repr=False)
-class LevelOfDetail:
+class LevelOfDetail(CachedSize):
     length: int = 1
     lod_level: int = 2
 
@@ -972,7 +1168,7 @@ class LevelOfDetail:
 
 
 @dataclass(eq=False, repr=False)
-class EmptyString:
+class EmptyString(CachedSize):
     length: int = 0
     unknown_string: str = ""
 
@@ -995,7 +1191,7 @@ class EmptyString:
 
 
 @dataclass(eq=False, repr=False)
-class Flow:
+class Flow(CachedSize):
     length: int = 4
     max_flow_speed_identifier: int = 1668707377
     max_flow_speed: Vector4 = field(default_factory=Vector4)
@@ -1044,11 +1240,28 @@ class Flow:
         return size
 
 
+def set_box(record, bounds: np.ndarray) -> bool:
+    """Stores the (2, 3) `bounds` as the bounding box corners of `record`.
+    Corners already holding these values are left alone, so that an
+    unchanged box does not mark the record as changed."""
+    lower, upper = bounds.astype(np.float32).tolist()
+    changed = False
+    for name, corner in (
+        ("bounding_box_lower_left_corner", lower),
+        ("bounding_box_upper_right_corner", upper),
+    ):
+        current = getattr(record, name)
+        if (current.x, current.y, current.z) != tuple(corner):
+            setattr(record, name, Vector3(*corner))
+            changed = True
+    return changed
+
+
 @dataclass(eq=False, repr=False)
-class BattleforgeMesh:
+class BattleforgeMesh(CachedSize):
     vertex_count: int = 0
     face_count: int = 0
-    faces: List[Face] = field(default_factory=list)
+    faces: FaceBuffer = field(default_factory=FaceBuffer)
     mesh_count: int = 0
     mesh_data: List[MeshData] = field(default_factory=list)
     bounding_box_lower_left_corner: Vector3 = field(default_factory=Vector3)
@@ -1063,10 +1276,28 @@ class BattleforgeMesh:
     level_of_detail: LevelOfDetail = field(default_factory=LevelOfDetail)
     empty_string: EmptyString = field(default_factory=EmptyString)
     flow: Flow = field(default_factory=Flow)
+    _converters = {"faces": face_buffer}
+
+    def bounds(self) -> Optional[np.ndarray]:
+        """(2, 3) array of the lower and upper corner around the vertex
+        positions, None without a position stream or vertices"""
+        for mesh_data in self.mesh_data:
+            if "position" in mesh_data.data.dtype.names and len(mesh_data.data):
+                positions = mesh_data.data["position"]
+                return np.stack([positions.min(axis=0), positions.max(axis=0)])
+        return None
+
+    def update_bounds(self) -> bool:
+        """Fits the bounding box to the vertex positions, returns whether it
+        changed"""
+        bounds = self.bounds()
+        if bounds is None:
+            return False
+        return set_box(self, bounds)
 
     def read(self, file: BinaryIO) -> "BattleforgeMesh":
         self.vertex_count, self.face_count = unpack("ii", file.read(8))
-        self.faces = [Face().read(file) for _ in range(self.face_count)]
+        self.faces = FaceBuffer().read(file, self.face_count)
         self.mesh_count = unpack("B", file.read(1))[0]
         self.mesh_data = [
             MeshData().read(file, self.vertex_count) for _ in range(self.mesh_count)
@@ -1117,8 +1348,7 @@ class BattleforgeMesh:
 
     def write(self, file: BinaryIO) -> None:
         file.write(pack("ii", self.vertex_count, self.face_count))
-        for face in self.faces:
-            face.write(file)
+        self.faces.write(file)
         file.write(pack("B", self.mesh_count))
         for mesh_data in self.mesh_data:
             mesh_data.write(file)
@@ -1155,7 +1385,7 @@ class BattleforgeMesh:
         size += 24  # BoundingBox1 + BoundingBox2
         size += 2  # MaterialID
         size += 4  # MaterialParameters
-        size += sum(face.size() for face in self.faces)
+        size += self.faces.size()
         size += sum(mesh_data.size() for mesh_data in self.mesh_data)
 
         if self.material_parameters == -86061050:
@@ -1183,7 +1413,7 @@ class BattleforgeMesh:
 
 
 @dataclass(eq=False, repr=False)
-class CDspMeshFile:
+class CDspMeshFile(CachedSize):
     magic: int = 1314189598
     zero: int = 0
     mesh_count: int = 0
@@ -1202,6 +1432,24 @@ class CDspMeshFile:
         ]
     )
 
+    def update_bounds(self, meshes: Optional[List[BattleforgeMesh]] = None) -> bool:
+        """Fits the box of every mesh in `meshes`, all by default, and the file
+        box around all of them. Returns whether any box changed."""
+        changed = False
+        boxes = []
+        for mesh in self.meshes:
+            bounds = mesh.bounds()
+            if bounds is None:
+                continue
+            if meshes is None or any(mesh is fitted for fitted in meshes):
+                changed |= set_box(mesh, bounds)
+            boxes.append(bounds)
+        if boxes:
+            boxes = np.array(boxes)
+            bounds = np.stack([boxes[:, 0].min(axis=0), boxes[:, 1].max(axis=0)])
+            changed |= set_box(self, bounds)
+        return changed
+
     def read(self, file: BinaryIO) -> "CDspMeshFile":
         self.magic = unpack("i", file.read(4))[0]
         if self.magic == 1314189598:
@@ -1239,7 +1487,7 @@ class CDspMeshFile:
         return size
 
 
-@dataclass(eq=False, repr=False)
+@dataclass(eq=False, repr=False, slots=True)
 class OBBNode:
     oriented_bounding_box: CMatCoordinateSystem = field(
         default_factory=CMatCoordinateSystem
@@ -1282,19 +1530,20 @@ class OBBNode:
 
 
 @dataclass(eq=False, repr=False)
-class CGeoOBBTree:
+class CGeoOBBTree(CachedSize):
     magic: int = 1845540702
     version: int = 3
     matrix_count: int = 0
     obb_nodes: List[OBBNode] = field(default_factory=list)
     triangle_count: int = 0
-    faces: List[Face] = field(default_factory=list)
+    faces: FaceBuffer = field(default_factory=FaceBuffer)
+    _converters = {"faces": face_buffer}
 
     def read(self, file: BinaryIO) -> "CGeoOBBTree":
         self.magic, self.version, self.matrix_count = unpack("iii", file.read(12))
         self.obb_nodes = [OBBNode().read(file) for _ in range(self.matrix_count)]
         self.triangle_count = unpack("i", file.read(4))[0]
-        self.faces = [Face().read(file) for _ in range(self.triangle_count)]
+        self.faces = FaceBuffer().read(file, self.triangle_count)
         return self
 
     def write(self, file: BinaryIO) -> None:
@@ -1302,19 +1551,18 @@ class CGeoOBBTree:
         for obb_node in self.obb_nodes:
             obb_node.write(file)
         file.write(pack("i", self.triangle_count))
-        for face in self.faces:
-            face.write(file)
+        self.faces.write(file)
 
     def size(self) -> int:
         return (
             16
             + sum(obb_node.size() for obb_node in self.obb_nodes)
-            + sum(face.size() for face in self.faces)
+            + self.faces.size()
         )
 
 
 @dataclass(eq=False, repr=False)
-class JointGroup:
+class JointGroup(CachedSize):
     joint_count: int = 0
     joints: List[int] = field(default_factory=list)  # short
 
@@ -1334,7 +1582,7 @@ class JointGroup:
 
 
 @dataclass(eq=False, repr=False)
-class CDspJointMap:
+class CDspJointMap(CachedSize):
     version: int = 1
     joint_group_count: int = 0
     joint_groups: List[JointGroup] = field(default_factory=list)
@@ -1357,7 +1605,7 @@ class CDspJointMap:
 
 
 @dataclass(eq=False, repr=False)
-class SLocator:
+class SLocator(CachedSize):
     cmat_coordinate_system: CMatCoordinateSystem = field(
         default_factory=CMatCoordinateSystem
     )
@@ -1409,7 +1657,7 @@ class SLocator:
 
 
 @dataclass(eq=False, repr=False)
-class CDrwLocatorList:
+class CDrwLocatorList(CachedSize):
     magic: int = 0
     version: int = 0
     length: int = 0
@@ -1541,7 +1789,7 @@ class SphereShape:
 
 
 @dataclass(eq=True, repr=False)
-class CollisionShape:
+class CollisionShape(CachedSize):
     version: int = 1
     box_count: int = 0
     boxes: List[BoxShape] = field(default_factory=list)
@@ -1587,7 +1835,7 @@ class CollisionShape:
 
 
 @dataclass(eq=False, repr=False)
-class DrwResourceMeta:
+class DrwResourceMeta(CachedSize):
     unknown: List[int] = field(default_factory=lambda: [0, 0])
     length: int = 0
     hash: str = ""
@@ -1611,7 +1859,7 @@ class DrwResourceMeta:
 
 
 @dataclass(eq=False, repr=False)
-class CGeoPrimitiveContainer:
+class CGeoPrimitiveContainer(CachedSize):
     """CGeoPrimitiveContainer class"""
 
     def read(self, _: BinaryIO) -> "CGeoPrimitiveContainer":
@@ -1629,7 +1877,7 @@ class CGeoPrimitiveContainer:
 
 
 @dataclass(eq=False, repr=False)
-class Constraint:
+class Constraint(CachedSize):
     """Constraint
     Default: <Constraint index="0" RightAngle="360.00000000" RightDampStart="360.00000000" LeftAngle="-360.00000000" LeftDampStart="-360.00000000" DampRatio="0.00000000" />
     Custom:  <Constraint index="1" RightAngle="35.00000000" RightDampStart="35.00000000" LeftAngle="-35.00000000" LeftDampStart="-35.00000000" DampRatio="0.00000000" />
@@ -1682,7 +1930,7 @@ class Constraint:
 
 
 @dataclass(eq=False, repr=False)
-class IKAtlas:
+class IKAtlas(CachedSize):
     """IKAtlas"""
 
     identifier: int = 0  # BoneID
@@ -1725,8 +1973,18 @@ class IKAtlas:
         return base
 
 
+@binary_schema(
+    Value("version", "i"),
+    Value("weight", "i"),
+    Value("length", "i"),
+    String("file", "length"),
+    If("self.version >= 4", Value("start", "f"), Value("end", "f")),
+    If("self.version >= 5", Value("allows_ik", "B")),
+    If("self.version >= 7", Value("forceNoBlend", "B")),
+    direct_init=True,
+)
 @dataclass(eq=False, repr=False)
-class AnimationSetVariant:
+class AnimationSetVariant(CachedSize):
     version: int = 7
     weight: int = 100
     length: int = 0
@@ -1736,55 +1994,40 @@ class AnimationSetVariant:
     allows_ik: int = 1
     forceNoBlend: int = 0
 
-    def read(self, file: BinaryIO) -> "AnimationSetVariant":
-        """Reads the AnimationSetVariant from the buffer"""
-        self.version = unpack("i", file.read(4))[0]
-        self.weight = unpack("i", file.read(4))[0]
-        self.length = unpack("i", file.read(4))[0]
-        self.file = (
-            unpack(f"{self.length}s", file.read(calcsize(f"{self.length}s")))[0]
-            .decode("utf-8")
-            .strip("\x00")
-        )
-
-        if self.version >= 4:
-            self.start = unpack("f", file.read(4))[0]
-            self.end = unpack("f", file.read(4))[0]
-        if self.version >= 5:
-            self.allows_ik = unpack("B", file.read(1))[0]
-        if self.version >= 7:
-            self.forceNoBlend = unpack("B", file.read(1))[0]
-
-        return self
-
-    def write(self, file: BinaryIO) -> "AnimationSetVariant":
-        """Writes the AnimationSetVariant to the buffer"""
-        file.write(pack("i", self.version))
-        file.write(pack("i", self.weight))
-        file.write(pack("i", self.length))
-        file.write(pack(f"{self.length}s", self.file.encode("utf-8")))
-        if self.version >= 4:
-            file.write(pack("ff", self.start, self.end))
-        if self.version >= 5:
-            file.write(pack("B", self.allows_ik))
-        if self.version >= 7:
-            file.write(pack("B", self.forceNoBlend))
-        return self
-
-    def size(self) -> int:
-        """Returns the size of the AnimationSetVariant"""
-        base = 12 + self.length
-        if self.version >= 4:
-            base += 8
-        if self.version >= 5:
-            base += 1
-        if self.version >= 7:
-            base += 1
-        return base
-
 
+@binary_schema(
+    # Version 2 AnimationSets (uk == 2) do not store the type
+    If("uk != 2", Value("type", "i"), orelse=[Set("type", "2")], write="True"),
+    Value("length", "i"),
+    String("file", "length"),
+    Value("unknown", "i"),
+    If(
+        "self.type == 1",
+        Value("unknown2", "24B"),
+        orelse=[
+            If(
+                "self.type <= 5",
+                Value("unknown2", "i"),
+                Value("unknown4", "h"),
+                orelse=[
+                    If(
+                        "self.type == 6",
+                        Value("unknown2", "i"),
+                        Value("vis_job", "h"),
+                        Value("unknown3", "i"),
+                        Value("unknown4", "h"),
+                    )
+                ],
+            )
+        ],
+    ),
+    Value("variant_count", "i"),
+    Records("animation_set_variants", AnimationSetVariant, "variant_count"),
+    args=("uk",),
+    direct_init=True,
+)
 @dataclass(eq=False, repr=False)
-class ModeAnimationKey:
+class ModeAnimationKey(CachedSize):
     """ModeAnimationKey"""
 
     type: int = 6
@@ -1798,73 +2041,9 @@ class ModeAnimationKey:
     variant_count: int = 1
     animation_set_variants: List[AnimationSetVariant] = field(default_factory=list)
 
-    def read(self, file: BinaryIO, uk: int) -> "ModeAnimationKey":
-        """Reads the ModeAnimationKey from the buffer"""
-        if uk != 2:
-            self.type = unpack("i", file.read(4))[0]
-        else:
-            self.type = 2
-        self.length = unpack("i", file.read(4))[0]
-        self.file = (
-            unpack(f"{self.length}s", file.read(calcsize(f"{self.length}s")))[0]
-            .decode("utf-8")
-            .strip("\x00")
-        )
-        self.unknown = unpack("i", file.read(4))[0]
-        if self.type == 1:
-            self.unknown2 = list(unpack("24B", file.read(24)))
-        elif self.type <= 5:
-            self.unknown2 = unpack("i", file.read(4))[0]
-            self.unknown4 = unpack("h", file.read(2))[0]
-        elif self.type == 6:
-            self.unknown2 = unpack("i", file.read(4))[0]
-            self.vis_job = unpack("h", file.read(2))[0]
-            self.unknown3 = unpack("i", file.read(4))[0]
-            self.unknown4 = unpack("h", file.read(2))[0]
-        self.variant_count = unpack("i", file.read(4))[0]
-        self.animation_set_variants = [
-            AnimationSetVariant().read(file) for _ in range(self.variant_count)
-        ]
-        return self
-
-    def write(self, file: BinaryIO) -> "ModeAnimationKey":
-        """Writes the ModeAnimationKey to the buffer"""
-        file.write(pack("i", self.type))
-        file.write(pack("i", self.length))
-        file.write(pack(f"{self.length}s", self.file.encode("utf-8")))
-        file.write(pack("i", self.unknown))
-        if self.type == 1:
-            file.write(pack("24B", *self.unknown2))
-        elif self.type <= 5:
-            file.write(pack("i", self.unknown2))
-            file.write(pack("h", self.unknown4))
-        elif self.type == 6:
-            file.write(pack("i", self.unknown2))
-            file.write(pack("h", self.vis_job))
-            file.write(pack("i", self.unknown3))
-            file.write(pack("h", self.unknown4))
-        file.write(pack("i", self.variant_count))
-        for animation_set_variant in self.animation_set_variants:
-            animation_set_variant.write(file)
-        return self
-
-    def size(self) -> int:
-        """Returns the size of the ModeAnimationKey"""
-        base = 12 + self.length
-        if self.type == 1:
-            base += 24
-        elif self.type <= 5:
-            base += 6
-        elif self.type == 6:
-            base += 12
-        base += 4
-        for animation_set_variant in self.animation_set_variants:
-            base += animation_set_variant.size()
-        return base
-
 
 @dataclass(eq=False, repr=False)
-class AnimationMarker:
+class AnimationMarker(CachedSize):
     """AnimationMarker"""
 
     some_class: int = 0
@@ -1893,7 +2072,7 @@ class AnimationMarker:
 
 
 @dataclass(eq=False, repr=False)
-class AnimationMarkerSet:
+class AnimationMarkerSet(CachedSize):
     """AnimationMarkerSet"""
 
     anim_id: int = 0
@@ -1940,7 +2119,7 @@ class AnimationMarkerSet:
 
 
 @dataclass(eq=False, repr=False)
-class UnknownStruct2:
+class UnknownStruct2(CachedSize):
     """UnknownStruct2"""
 
     unknown_ints: List[int] = field(default_factory=list)
@@ -1962,7 +2141,7 @@ class UnknownStruct2:
 
 
 @dataclass(eq=False, repr=False)
-class UnknownStruct:
+class UnknownStruct(CachedSize):
     """UnknownStruct"""
 
     unknown: int = 0
@@ -2007,7 +2186,7 @@ class UnknownStruct:
 
 
 @dataclass(eq=False, repr=False)
-class AnimationSet:
+class AnimationSet(CachedSize):
     """AnimationSet"""
 
     length: int = 11
@@ -2209,7 +2388,15 @@ class AnimationSet:
         return base
 
 
-@dataclass(eq=False, repr=False)
+@binary_schema(
+    Value("cast_ms", "i"),
+    Value("resolve_ms", "i"),
+    Value("uk_1", "f"),
+    Value("uk_2", "f"),
+    Value("uk_3", "f"),
+    Value("animation_marker_id", "i"),
+)
+@dataclass(eq=False, repr=False, slots=True)
 class Timing:
     cast_ms: int = 0  # Int
     resolve_ms: int = 0  # Int
@@ -2218,33 +2405,9 @@ class Timing:
     uk_3: float = 0  # Float
     animation_marker_id: int = 0  # Int
 
-    def read(self, file: BinaryIO) -> "Timing":
-        """Reads the Timing from the buffer"""
-        self.cast_ms = unpack("i", file.read(4))[0]
-        self.resolve_ms = unpack("i", file.read(4))[0]
-        self.uk_1 = unpack("f", file.read(4))[0]
-        self.uk_2 = unpack("f", file.read(4))[0]
-        self.uk_3 = unpack("f", file.read(4))[0]
-        self.animation_marker_id = unpack("i", file.read(4))[0]
-        return self
-
-    def write(self, file: BinaryIO) -> "Timing":
-        """Writes the Timing to the buffer"""
-        file.write(pack("i", self.cast_ms))
-        file.write(pack("i", self.resolve_ms))
-        file.write(pack("f", self.uk_1))
-        file.write(pack("f", self.uk_2))
-        file.write(pack("f", self.uk_3))
-        file.write(pack("i", self.animation_marker_id))
-        return self
-
-    def size(self) -> int:
-        """Returns the size of the Timing"""
-        return calcsize("iifffi")
-
 
 @dataclass(eq=False, repr=False)
-class TimingVariant:
+class TimingVariant(CachedSize):
     # Byte. The weight of this variant. The higher the weight, the more likely it is to be chosen.
     weight: int = 0
     variant_index: int = 0  # Byte.
@@ -2279,7 +2442,7 @@ class TimingVariant:
 
 
 @dataclass(eq=False, repr=False)
-class AnimationTiming:
+class AnimationTiming(CachedSize):
     animation_type: int = AnimationType["CastResolve"]  # int
     animation_tag_id: int = 0
     is_enter_mode_animation: int = 0  # Short. This is 1 most of the time.
@@ -2345,7 +2508,7 @@ class StructV3:
 
 
 @dataclass(eq=False, repr=False)
-class AnimationTimings:
+class AnimationTimings(CachedSize):
     magic: int = 1650881127  # int
     version: int = 3  # Short. 3 or 4
     # Short. Only used if there are multiple Animations.
@@ -2386,29 +2549,37 @@ class AnimationTimings:
         )
 
 
+@binary_schema(
+    Value("weight", "B"),
+    Value("length", "i"),
+    String("name", "length"),
+    direct_init=True,
+)
 @dataclass(eq=False, repr=False)
-class Variant:
+class Variant(CachedSize):
     weight: int = 0  # Byte
     length: int = 0  # Int
     name: str = ""  # CString split into length and name
 
-    def read(self, file: BinaryIO) -> "Variant":
-        self.weight = unpack("B", file.read(1))[0]
-        self.length = unpack("i", file.read(4))[0]
-        self.name = file.read(self.length).decode("utf-8").strip("\x00")
-        return self
-
-    def write(self, file: BinaryIO) -> None:
-        file.write(pack("B", self.weight))
-        file.write(pack("i", self.length))
-        file.write(self.name.encode("utf-8"))
-
-    def size(self) -> int:
-        return 5 + self.length
-
 
+@binary_schema(
+    Value("time", "f"),
+    Value("keyframe_type", "i"),
+    Value("min_falloff", "f"),
+    Value("max_falloff", "f"),
+    Value("volume", "f"),
+    Value("pitch_shift_min", "f"),
+    Value("pitch_shift_max", "f"),
+    Value("offset", "3f"),
+    Value("interruptable", "B"),
+    If("_type not in (10, 11)", Value("uk", "B"), write="self.uk is not None"),
+    Value("variant_count", "i"),
+    Records("variants", Variant, "variant_count"),
+    args=("_type",),
+    direct_init=True,
+)
 @dataclass(eq=False, repr=False)
-class Keyframe:
+class Keyframe(CachedSize):
     time: float = 0.0
     keyframe_type: int = 0
     min_falloff: float = 0.0
@@ -2422,61 +2593,9 @@ class Keyframe:
     variant_count: int = 0
     variants: List[Variant] = field(default_factory=list)
 
-    def read(self, file: BinaryIO, _type: int) -> "Keyframe":
-        (
-            self.time,
-            self.keyframe_type,
-            self.min_falloff,
-            self.max_falloff,
-            self.volume,
-            self.pitch_shift_min,
-            self.pitch_shift_max,
-        ) = unpack("fifffff", file.read(28))
-        self.offset = list(unpack("3f", file.read(12)))
-        self.interruptable = unpack("B", file.read(1))[0]
-
-        if _type not in [10, 11]:
-            self.uk = unpack("B", file.read(1))[0]
-
-        self.variant_count = unpack("i", file.read(4))[0]
-        self.variants = [Variant().read(file) for _ in range(self.variant_count)]
-        return self
-
-    def write(self, file: BinaryIO) -> None:
-        file.write(
-            pack(
-                "fifffff",
-                self.time,
-                self.keyframe_type,
-                self.min_falloff,
-                self.max_falloff,
-                self.volume,
-                self.pitch_shift_min,
-                self.pitch_shift_max,
-            )
-        )
-        file.write(pack("3f", *self.offset))
-        file.write(pack("B", self.interruptable))
-
-        if self.uk is not None:
-            file.write(pack("B", self.uk))
-
-        file.write(pack("i", self.variant_count))
-        for variant in self.variants:
-            variant.write(file)
-
-    def size(self) -> int:
-        size = 28 + 12 + 1
-        if self.uk is not None:
-            size += 1
-        size += 4
-        for variant in self.variants:
-            size += variant.size()
-        return size
-
 
 @dataclass(eq=False, repr=False)
-class SkelEff:
+class SkelEff(CachedSize):
     length: int = 0  # Int
     name: str = ""  # CString split into length and name
     keyframe_count: int = 0
@@ -2506,7 +2625,7 @@ class SkelEff:
 
 
 @dataclass
-class SthSound:
+class SthSound(CachedSize):
     sth_sound_file: int = 0  # byte
     unknown: int = 0  # short
     unknown_list: List[int] = field(
@@ -2535,7 +2654,7 @@ class SthSound:
 
 
 @dataclass(eq=False, repr=False)
-class UKS2:
+class UKS2(CachedSize):
     unknown: int = 0  # short
     unknown_list: List[int] = field(
         default_factory=list, metadata={"size": 5}
@@ -2565,7 +2684,7 @@ class UKS2:
 
 
 @dataclass(eq=False, repr=False)
-class UKS1:
+class UKS1(CachedSize):
     unknown: int = 0  # short
     unknown_list: List[int] = field(
         default_factory=list, metadata={"size": 5}
@@ -2597,7 +2716,7 @@ class UKS1:
 
 
 @dataclass(eq=False, repr=False)
-class UKS3:
+class UKS3(CachedSize):
     unknown: int = 0  # short
     unknown_list: List[int] = field(
         default_factory=list, metadata={"size": 5}
@@ -2627,7 +2746,7 @@ class UKS3:
 
 
 @dataclass(eq=False, repr=False)
-class EffectSet:
+class EffectSet(CachedSize):
     type: int = 0  # Short
     checksum_length: int = 0  # Int
     checksum: str = ""  # CString split into length and name
@@ -2881,6 +3000,79 @@ class MeshSetGrid:
         pass
 
 
+@dataclass(eq=False, repr=False)
+class RawNode(CachedSize):
+    """Payload of a node type without an implementation, kept as its bytes"""
+
+    data: bytes = b""
+
+    def read(self, file: BinaryIO, size: int) -> "RawNode":
+        self.data = file.read(size)
+        return self
+
+    def write(self, file: BinaryIO) -> None:
+        file.write(self.data)
+
+    def size(self) -> int:
+        return len(self.data)
+
+
+def geometry(record) -> object:
+    """What the derived bounds of `record` depend on: the bounds of a
+    BattleforgeMesh, the vertex positions and faces of a CGeoMesh"""
+    if isinstance(record, BattleforgeMesh):
+        return record.bounds()
+    return record.vertices[:, :3].copy(), record.faces.indices.copy()
+
+
+def remember_geometry(payload) -> None:
+    """Remembers the geometry the bounds below `payload` were fitted to"""
+    if isinstance(payload, CDspMeshFile):
+        for mesh in payload.meshes:
+            object.__setattr__(mesh, "_fitted", geometry(mesh))
+    elif isinstance(payload, CGeoMesh):
+        object.__setattr__(payload, "_fitted", geometry(payload))
+
+
+def geometry_moved(record) -> bool:
+    """Whether the geometry of `record` differs from the remembered one. New
+    records have none remembered."""
+    if "_fitted" not in record.__dict__:
+        return True
+    fitted, current = record._fitted, geometry(record)
+    if isinstance(record, BattleforgeMesh):
+        if fitted is None or current is None:
+            return fitted is not current
+        return not np.array_equal(fitted, current)
+    return not all(map(np.array_equal, fitted, current))
+
+
+class LazyPayload:
+    """Node payload attribute of DRS.
+
+    Behaves like a plain attribute defaulting to None. After DRS.read(...,
+    lazy=True) the payload is decoded from its offset on first access.
+    """
+
+    def __set_name__(self, owner, name: str) -> None:
+        self.name = name
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            # Class access, used by dataclass as the field default
+            return None
+        value = instance.__dict__.get(self.name)
+        if value is None and self.name in instance.__dict__.get("_pending_payloads", ()):
+            value = instance.decode_payload(self.name)
+        return value
+
+    def __set__(self, instance, value) -> None:
+        instance.__dict__[self.name] = value
+        pending = instance.__dict__.get("_pending_payloads")
+        if pending and self.name in pending:
+            pending.pop(self.name)
+
+
 @dataclass(eq=False, repr=False)
 class DRS:
     operator: object = None
@@ -2909,19 +3101,19 @@ class DRS:
     collision_shape_node: Node = None
     effect_set_node: Node = None
     cdrw_locator_list_node: Node = None
-    animation_set: AnimationSet = None
-    cdsp_mesh_file: CDspMeshFile = None
-    cgeo_mesh: CGeoMesh = None
-    csk_skin_info: CSkSkinInfo = None
-    csk_skeleton: CSkSkeleton = None
-    cdsp_joint_map: CDspJointMap = None
-    cgeo_obb_tree: CGeoOBBTree = None
-    drw_resource_meta: DrwResourceMeta = None
-    cgeo_primitive_container: CGeoPrimitiveContainer = None
-    collision_shape: CollisionShape = None
-    cdrw_locator_list: CDrwLocatorList = None
-    effect_set: EffectSet = None
-    animation_timings: AnimationTimings = None
+    animation_set: AnimationSet = LazyPayload()
+    cdsp_mesh_file: CDspMeshFile = LazyPayload()
+    cgeo_mesh: CGeoMesh = LazyPayload()
+    csk_skin_info: CSkSkinInfo = LazyPayload()
+    csk_skeleton: CSkSkeleton = LazyPayload()
+    cdsp_joint_map: CDspJointMap = LazyPayload()
+    cgeo_obb_tree: CGeoOBBTree = LazyPayload()
+    drw_resource_meta: DrwResourceMeta = LazyPayload()
+    cgeo_primitive_container: CGeoPrimitiveContainer = LazyPayload()
+    collision_shape: CollisionShape = LazyPayload()
+    cdrw_locator_list: CDrwLocatorList = LazyPayload()
+    effect_set: EffectSet = LazyPayload()
+    animation_timings: AnimationTimings = LazyPayload()
     model_type: str = None
 
     def __post_init__(self):
@@ -2967,7 +3159,19 @@ class DRS:
             node_information.offset = self.data_offset
             self.data_offset += node_information.node_size
 
-    def read(self, file_name: str) -> "DRS":
+    def read(
+        self, file_name: str, lazy: bool = False, fill_normals: bool = False
+    ) -> "DRS":
+        """Reads the DRS file.
+
+        With lazy=True only the header, node_informations and nodes are
+        parsed. Each payload (cdsp_mesh_file, csk_skeleton, ...) is decoded on
+        first access and the file stays open until all of them are decoded or
+        close() is called. A save copies the payloads still pending from the
+        file as they are and encodes the decoded ones again.
+        With fill_normals=True the normals missing from revision 163841 mesh
+        streams are derived from the faces, decoding cdsp_mesh_file.
+        """
         reader = FileReader(file_name)
         (
             self.magic,
@@ -3009,31 +3213,14 @@ class DRS:
             # Check if the node_info is in the node_information_map
             if node_info.magic in node_information_map:
                 setattr(self, node_information_map[node_info.magic], node_info)
-                self.node_informations.append(node_info)
-            else:
-                raise TypeError(f"Unknown Node: {node_info.magic}")
+            # Unknown nodes are carried through as RawNode
+            self.node_informations.append(node_info)
 
         # Read Node Hierarchy
         reader.seek(self.node_hierarchy_offset)
         self.nodes[0] = RootNode().read(reader)
 
-        node_map = {
-            "AnimationSet": "animation_set_node",
-            "CDspMeshFile": "cdsp_mesh_file_node",
-            "CGeoMesh": "cgeo_mesh_node",
-            "CSkSkinInfo": "csk_skin_info_node",
-            "CSkSkeleton": "csk_skeleton_node",
-            "AnimationTimings": "animation_timings_node",
-            "CDspJointMap": "cdsp_joint_map_node",
-            "CGeoOBBTree": "cgeo_obb_tree_node",
-            "DrwResourceMeta": "drw_resource_meta_node",
-            "CGeoPrimitiveContainer": "cgeo_primitive_container_node",
-            "collisionShape": "collision_shape_node",
-            "EffectSet": "effect_set_node",
-            "CDrwLocatorList": "cdrw_locator_list_node",
-            "CGdLocatorList": "gd_locator_list_node",  # Not yet implemented
-            "FxMaster": "fx_master_node",  # Not yet implemented
-        }
+        node_map = NodeAttributes
 
         for _ in range(self.node_count - 1):
             node = Node().read(reader)
@@ -3044,10 +3231,9 @@ class DRS:
                 if val == "collisionShape":
                     val = "CollisionShape"
                 setattr(self, val, node)
-                self.nodes.append(node)
-            else:
-                raise TypeError(f"Unknown Node: {node.name}")
+            self.nodes.append(node)
 
+        pending_payloads = {}
         for node in self.nodes:
             if not hasattr(node, "info_index"):
                 # Root Node has no info_index
@@ -3057,53 +3243,161 @@ class DRS:
             if node_info is None:
                 raise TypeError(f"Node {node.name} not found")
 
-            reader.seek(node_info.offset)
-            node_name = node_map.get(node.name, None).replace("_node", "")
-            if node_map is None:
-                raise TypeError(f"Node {node.name} not found in node_map")
+            node_info.node_name = node.name
             # CollisionShape is a special case, as its first letter is lowercase
             val = node.name
             if val == "collisionShape":
                 val = "CollisionShape"
+            payload_class = globals().get(val)
+            if node.name not in node_map or payload_class is None:
+                # Unknown or not yet implemented (CGdLocatorList, FxMaster)
+                reader.seek(node_info.offset)
+                node_info.data_object = RawNode().read(reader, node_info.node_size)
+                continue
 
-            setattr(self, node_name, globals()[val]().read(reader))
-
-        reader.close()
-        return self
-
-    def save(self, file_name: str):
-        writer = FileWriter(file_name)
+            node_name = node_map[node.name].replace("_node", "")
+            if lazy:
+                # Decoded from the mapping later, saved as a copy of this span
+                span = (node_info.offset, node_info.node_size)
+                pending_payloads[node_name] = (payload_class, node_info, span)
+            else:
+                reader.seek(node_info.offset)
+                node_info.data_object = payload_class().read(reader)
+                setattr(self, node_name, node_info.data_object)
 
+        if pending_payloads:
+            self._reader = reader
+            self._pending_payloads = pending_payloads
+        else:
+            reader.close()
+        self.mark_clean()
+        if fill_normals and self.cdsp_mesh_file is not None:
+            # The geometry package builds on this module
+            from ..geometry.normals import fill_missing_normals
+
+            for mesh in self.cdsp_mesh_file.meshes:
+                fill_missing_normals(mesh)
+        return self
+
+    def decode_payload(self, node_name: str) -> object:
+        """Decodes a payload left pending by a lazy read"""
+        payload_class, _, (offset, _) = self._pending_payloads.pop(node_name)
+        self._reader.seek(offset)
+        payload = payload_class().read(self._reader)
+        self.__dict__[node_name] = payload
+        remember_geometry(payload)
+        if not self._pending_payloads:
+            self.close()
+        return payload
+
+    def close(self) -> None:
+        """Releases the file kept open by a lazy read. Undecoded payloads stay None."""
+        reader = self.__dict__.pop("_reader", None)
+        if reader is not None:
+            reader.close()
+        self.__dict__.pop("_pending_payloads", None)
+
+    def payload(self, node_name: str) -> object:
+        """Returns the data object stored for the node `node_name` (e.g. "CGeoMesh")"""
+        attribute = NodeAttributes.get(node_name, "").replace("_node", "")
+        if self.__dict__.get(attribute) is not None:
+            return self.__dict__[attribute]
         for node_info in self.node_informations:
-            self.node_information_offset += node_info.node_size
-        self.node_hierarchy_offset = (
-            self.node_information_offset + 32 + (self.node_count - 1) * 32
-        )
-        writer.write(
-            pack(
-                "iiiiI",
-                self.magic,
-                self.number_of_models,
-                self.node_information_offset,
-                self.node_hierarchy_offset,
-                self.node_count,
-            )
+            if node_info.node_name == node_name:
+                if getattr(node_info, "data_object", None) is not None:
+                    return node_info.data_object
+                break
+        return getattr(self, attribute, None)
+
+    def pending_span(self, node_info: "NodeInformation") -> Optional[tuple]:
+        """Returns (offset, size) of a node in the open file while its payload
+        is still pending from a lazy read. Decoded payloads may have been
+        edited in ways no flag sees (nested records, arrays in place), they
+        are always encoded again."""
+        attribute = NodeAttributes.get(node_info.node_name, "").replace("_node", "")
+        pending = self.__dict__.get("_pending_payloads", {}).get(attribute)
+        return None if pending is None else pending[2]
+
+    def decoded_payloads(self):
+        """Yields (node_information, payload) for every payload in memory,
+        leaving payloads still pending from a lazy read untouched"""
+        for node_info in self.node_informations[1:]:
+            attribute = NodeAttributes.get(node_info.node_name, "").replace("_node", "")
+            payload = self.__dict__.get(attribute)
+            if payload is None:
+                payload = getattr(node_info, "data_object", None)
+            if payload is not None:
+                yield node_info, payload
+
+    def mark_clean(self) -> None:
+        """Takes the payloads in memory as matching the file read or saved last"""
+        for _, payload in self.decoded_payloads():
+            remember_geometry(payload)
+
+    def layout(self) -> int:
+        """Assigns offset and node_size of every NodeInformation and the header
+        offsets for the layout header | data | node informations | nodes.
+        Returns the total file size."""
+        node_names = {node_info.node_name for node_info in self.node_informations[1:]}
+        if self.model_type is not None and set(WriteOrder[self.model_type]) == node_names:
+            write_order = WriteOrder[self.model_type]
+        else:
+            # Keep the order of the file we were read from
+            write_order = [
+                node_info.node_name
+                for node_info in sorted(
+                    self.node_informations[1:], key=lambda node_info: node_info.offset
+                )
+            ]
+        node_informations = {
+            node_info.node_name: node_info for node_info in self.node_informations[1:]
+        }
+        offset = 20
+        for node_name in write_order:
+            node_information = node_informations[node_name]
+            node_information.offset = offset
+            span = self.pending_span(node_information)
+            # CGeoPrimitiveContainer has no payload
+            if span is not None:
+                node_information.node_size = span[1]
+            elif node_name != "CGeoPrimitiveContainer":
+                node_information.node_size = self.payload(node_name).size()
+            else:
+                node_information.node_size = 0
+            offset += node_information.node_size
+        self.write_order = write_order
+        self.data_offset = offset
+        self.node_information_offset = offset
+        for node_info in self.node_informations:
+            offset += node_info.size()
+        self.node_hierarchy_offset = offset
+        for node in self.nodes:
+            offset += node.size()
+        return offset
+
+    def serialize(self) -> BufferWriter:
+        """Lays out the file and writes it into a single preallocated buffer"""
+        writer = BufferWriter(self.layout())
+        writer.pack_into(
+            "iiiiI",
+            self.magic,
+            self.number_of_models,
+            self.node_information_offset,
+            self.node_hierarchy_offset,
+            self.node_count,
         )
 
-        # Write Data Packets (in correct Order)
-        for node_name in WriteOrder[self.model_type]:
-            # get the right node from self.node_informations
-            node_information = next(
-                (
-                    node_info
-                    for node_info in self.node_informations
-                    if node_info.node_name == node_name
-                ),
-                None,
-            )
-
-            if node_name != "CGeoPrimitiveContainer":
-                node_information.data_object.write(writer)
+        # Write Data Packets (in correct Order), pending ones copied from the file
+        node_informations = {
+            node_info.node_name: node_info for node_info in self.node_informations[1:]
+        }
+        for node_name in self.write_order:
+            span = self.pending_span(node_informations[node_name])
+            if span is not None:
+                with self._reader.buffer[span[0] : span[0] + span[1]] as data:
+                    writer.write(data)
+            elif node_name != "CGeoPrimitiveContainer":
+                self.payload(node_name).write(writer)
 
         # Write Node Informations
         for node_info in self.node_informations:
@@ -3113,7 +3407,64 @@ class DRS:
         for node in self.nodes:
             node.write(writer)
 
-        writer.close()
+        if writer.tell() != writer.length:
+            raise TypeError(
+                f"Serialized {writer.tell()} bytes, but the layout expected {writer.length}"
+            )
+        return writer
+
+    def update_bounds(self) -> None:
+        """Refits the bounds derived from geometry moved since the last read
+        or save: the boxes of the meshes whose vertex positions span other
+        bounds and the file box of CDspMeshFile, and the node boxes of
+        CGeoOBBTree after any vertex or face change of CGeoMesh. Other edits,
+        e.g. recomputed normals, keep the authored bounds."""
+        pending = self.__dict__.get("_pending_payloads", ())
+        mesh_file = None
+        if "cdsp_mesh_file" not in pending:
+            mesh_file = self.payload("CDspMeshFile")
+        if mesh_file is not None:
+            moved = [mesh for mesh in mesh_file.meshes if geometry_moved(mesh)]
+            if moved:
+                mesh_file.update_bounds(moved)
+        if "cgeo_mesh" in pending:
+            return
+        mesh = self.payload("CGeoMesh")
+        if mesh is None or not geometry_moved(mesh):
+            return
+        obb_tree = self.payload("CGeoOBBTree")
+        if obb_tree is not None:
+            # The geometry package builds on this module
+            from ..geometry.obb_builder import refit_obb_tree
+
+            refit_obb_tree(obb_tree, mesh)
+
+    def save(
+        self,
+        file_name: str,
+        use_mmap: bool = False,
+        update_bounds: bool = True,
+    ):
+        """Saves the DRS with one write, or through a memory map with use_mmap=True.
+
+        Bounding boxes of changed geometry are refitted first, unless
+        update_bounds is False.
+        """
+        if update_bounds:
+            self.update_bounds()
+        writer = self.serialize()
+        # The buffer holds everything now, the source file may be overwritten
+        reader = self.__dict__.pop("_reader", None)
+        if reader is not None:
+            reader.close()
+        writer.save(file_name, use_mmap)
+        pending = self.__dict__.get("_pending_payloads")
+        if pending:
+            self._reader = FileReader(file_name)
+            for node_name, (payload_class, node_info, _) in pending.items():
+                span = (node_info.offset, node_info.node_size)
+                pending[node_name] = (payload_class, node_info, span)
+        self.mark_clean()
 
 
 @dataclass(eq=False, repr=False)
@@ -1,18 +1,102 @@
+import io
+import mmap
+import os
+from struct import Struct, calcsize, unpack_from
+from typing import BinaryIO, Tuple, Union
+
+import numpy as np
+
+StructFormat = Union[str, Struct]
+
+
 class FileReader:
+    """Cursor over a read-only memory map of a file.
+
+    `read` keeps the `BinaryIO` contract (it returns `bytes`), so every `read`
+    method in the definitions works unchanged. `view`, `unpack` and
+    `unpack_from` work directly on the mapping and do not copy anything until
+    a value is decoded.
+    """
+
     def __init__(self, file_name: str):
         self.file = open(file_name, 'rb')
+        self.length = os.fstat(self.file.fileno()).st_size
+        # Empty files cannot be mapped
+        if self.length:
+            self._map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+            self.buffer = memoryview(self._map)
+        else:
+            self._map = None
+            self.buffer = memoryview(b"")
+        self.position = 0
+
+    def __enter__(self) -> "FileReader":
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.close()
+
+    def read(self, size: int = -1) -> bytes:
+        return bytes(self.view(size))
+
+    def view(self, size: int = -1) -> memoryview:
+        """Returns the next `size` bytes as a zero-copy view and advances the cursor."""
+        start = self.position
+        end = self.length if size < 0 else min(start + size, self.length)
+        self.position = end
+        return self.buffer[start:end]
+
+    def readinto(self, target) -> int:
+        target = memoryview(target).cast("B")
+        data = self.view(target.nbytes)
+        target[: len(data)] = data
+        return len(data)
 
-    def read(self, size: int):
-        return self.file.read(size)
+    def unpack(self, fmt: StructFormat) -> Tuple:
+        """Unpacks `fmt` at the cursor and advances past it."""
+        if isinstance(fmt, Struct):
+            values = fmt.unpack_from(self.buffer, self.position)
+            self.position += fmt.size
+        else:
+            values = unpack_from(fmt, self.buffer, self.position)
+            self.position += calcsize(fmt)
+        return values
 
-    def seek(self, offset: int):
-        self.file.seek(offset)
+    def unpack_from(self, fmt: StructFormat, offset: int) -> Tuple:
+        """Unpacks `fmt` at an absolute `offset` without moving the cursor."""
+        if isinstance(fmt, Struct):
+            return fmt.unpack_from(self.buffer, offset)
+        return unpack_from(fmt, self.buffer, offset)
+
+    def seek(self, offset: int, whence: int = os.SEEK_SET) -> int:
+        if whence == os.SEEK_CUR:
+            offset += self.position
+        elif whence == os.SEEK_END:
+            offset += self.length
+        self.position = max(0, offset)
+        return self.position
 
     def close(self):
-        self.file.close()
+        self.buffer.release()
+        try:
+            if self._map is not None:
+                # Raises BufferError while a view into the mapping is alive
+                self._map.close()
+                self._map = None
+        finally:
+            self.file.close()
 
     def tell(self):
-        return self.file.tell()
+        return self.position
+
+
+def read_array(file: BinaryIO, dtype, shape) -> np.ndarray:
+    """Reads a whole block of records into a writable array with a single read"""
+    array = np.empty(shape, dtype=dtype)
+    expected = array.nbytes
+    if expected and file.readinto(array) != expected:
+        raise TypeError(f"Unexpected end of file while reading {expected} bytes")
+    return array
 
 
 class FileWriter:
@@ -27,3 +111,36 @@ class FileWriter:
 
     def tell(self):
         return self.file.tell()
+
+
+class BufferWriter(io.BytesIO):
+    """Writer over a preallocated buffer of the final file size.
+
+    `write`, `seek` and `tell` are the ones of `io.BytesIO`, so every `write`
+    method in the definitions can target it at C speed, and writes overwrite
+    the preallocated bytes instead of growing the buffer. Nothing touches the
+    disk until `save` emits the whole buffer at once.
+    """
+
+    def __init__(self, length: int):
+        super().__init__(bytes(length))
+        self.length = length
+
+    def pack_into(self, fmt: StructFormat, *values) -> None:
+        """Packs `values` at the cursor and advances past them."""
+        fmt = fmt if isinstance(fmt, Struct) else Struct(fmt)
+        position = self.tell()
+        with self.getbuffer() as buffer:
+            fmt.pack_into(buffer, position, *values)
+        self.seek(position + fmt.size)
+
+    def save(self, file_name: str, use_mmap: bool = False) -> None:
+        """Writes the buffer to `file_name`, either with a single `write` or by
+        copying it into a memory map of the preallocated file."""
+        with self.getbuffer() as buffer, open(file_name, "w+b" if use_mmap else "wb") as file:
+            if not use_mmap or not buffer.nbytes:
+                file.write(buffer)
+                return
+            file.truncate(buffer.nbytes)
+            with mmap.mmap(file.fileno(), buffer.nbytes) as target:
+                target[:] = buffer
@@ -1,7 +1,14 @@
-from typing import BinaryIO
+from typing import BinaryIO, List
 from struct import calcsize, unpack, pack
 from dataclasses import dataclass, field
-from .file_io import FileReader
+
+import numpy as np
+
+from .file_io import FileReader, read_array
+
+# Columns of SKA.headers and SKA.keyframes
+HEADER_COLUMNS = ("tick", "interval", "type", "bone_id")
+KEYFRAME_COLUMNS = ("x", "y", "z", "w", "tan_x", "tan_y", "tan_z", "tan_w")
 
 
 @dataclass(eq=False, repr=False)
@@ -68,13 +75,19 @@ class SKAKeyframe:
 
 @dataclass(eq=False, repr=False)
 class SKA:
+    """Skeletal animation. headers is an (H, 4) uint32 array of tick,
+    interval, type and bone_id, times a (T,) float32 array and keyframes a
+    (T, 8) float32 array of value and tangent, see HEADER_COLUMNS and
+    KEYFRAME_COLUMNS. header_records and keyframe_records convert from and
+    to SKAHeader and SKAKeyframe lists."""
+
     magic: int = -1491828473
     type: int = 0  # uint
     header_count: int = 0
-    headers: list[SKAHeader] = field(default_factory=list)
+    headers: np.ndarray = field(default_factory=lambda: np.zeros((0, 4), dtype="<u4"))
     time_count: int = 0
-    times: list[float] = field(default_factory=list)
-    keyframes: list[SKAKeyframe] = field(default_factory=list)
+    times: np.ndarray = field(default_factory=lambda: np.zeros(0, dtype="<f4"))
+    keyframes: np.ndarray = field(default_factory=lambda: np.zeros((0, 8), dtype="<f4"))
     duration: float = 0.0
     repeat: int = 0
     stutter_mode: int = (
@@ -92,95 +105,107 @@ class SKA:
     unused6: list[int] = field(default_factory=list)
     zeroes: list[int] = field(default_factory=list)
 
+    @property
+    def header_records(self) -> List[SKAHeader]:
+        return [SKAHeader(*row) for row in self.headers.tolist()]
+
+    @header_records.setter
+    def header_records(self, headers: List[SKAHeader]) -> None:
+        self.headers = np.array(
+            [[getattr(header, name) for name in HEADER_COLUMNS] for header in headers],
+            dtype="<u4",
+        ).reshape(-1, 4)
+
+    @property
+    def keyframe_records(self) -> List[SKAKeyframe]:
+        return [SKAKeyframe(*row) for row in self.keyframes.tolist()]
+
+    @keyframe_records.setter
+    def keyframe_records(self, keyframes: List[SKAKeyframe]) -> None:
+        self.keyframes = np.array(
+            [[getattr(key, name) for name in KEYFRAME_COLUMNS] for key in keyframes],
+            dtype="<f4",
+        ).reshape(-1, 8)
+
     def read(self, file_name: str) -> "SKA":
         reader = FileReader(file_name)
-        self.magic = unpack("i", reader.read(calcsize("i")))[0]
-        self.type = unpack("I", reader.read(calcsize("I")))[0]
+        self.magic, self.type = unpack("iI", reader.read(8))
         if self.type == 2:
-            # pylint: disable=unused-variable
-            unused1 = unpack("i", reader.read(calcsize("i")))[0]
+            self.unused1 = unpack("i", reader.read(4))[0]
         elif self.type == 3:
-            unused1 = unpack("i", reader.read(calcsize("i")))[0]
-            # pylint: disable=unused-variable
-            unused2 = unpack("i", reader.read(calcsize("i")))[0]
+            self.unused1, self.unused2 = unpack("2i", reader.read(8))
         elif self.type == 4:
-            unused1 = unpack("i", reader.read(calcsize("i")))[0]
-            unused2 = unpack("i", reader.read(calcsize("i")))[0]
-            # pylint: disable=unused-variable
-            unused3 = unpack("i", reader.read(calcsize("i")))[0]
-            # pylint: disable=unused-variable
-            unsued4 = unpack("i", reader.read(calcsize("i")))[0]
+            self.unused1, self.unused2, self.unused3, self.unused4 = unpack(
+                "4i", reader.read(16)
+            )
         elif self.type == 5:
-            unused1 = unpack("i", reader.read(calcsize("i")))[0]
-            unused2 = unpack("i", reader.read(calcsize("i")))[0]
-            unused3 = unpack("i", reader.read(calcsize("i")))[0]
-            unsued4 = unpack("i", reader.read(calcsize("i")))[0]
-            # pylint: disable=unused-variable
-            unused5 = unpack("i", reader.read(calcsize("i")))[0]
-            # pylint: disable=unused-variable
-            unused6 = [
-                unpack("i", reader.read(calcsize("i")))[0] for _ in range(unused5)
-            ]
+            (
+                self.unused1,
+                self.unused2,
+                self.unused3,
+                self.unused4,
+                self.unused5,
+            ) = unpack("5i", reader.read(20))
+            self.unused6 = list(
+                unpack(f"{self.unused5}i", reader.read(4 * self.unused5))
+            )
         elif self.type == 6 or self.type == 7:
-            self.header_count = unpack("i", reader.read(calcsize("i")))[0]
-            self.headers = [SKAHeader().read(reader) for _ in range(self.header_count)]
-            self.time_count = unpack("i", reader.read(calcsize("i")))[0]
-            self.times = [
-                unpack("f", reader.read(calcsize("f")))[0]
-                for _ in range(self.time_count)
-            ]
-            self.keyframes = [
-                SKAKeyframe().read(reader) for _ in range(self.time_count)
-            ]
-            self.duration = unpack("f", reader.read(calcsize("f")))[0]
-            self.repeat = unpack("i", reader.read(calcsize("i")))[0]
-            self.stutter_mode = unpack("i", reader.read(calcsize("i")))[0]
-            self.unused1 = unpack("i", reader.read(calcsize("i")))[0]
+            self.header_count = unpack("i", reader.read(4))[0]
+            self.headers = read_array(reader, "<u4", (self.header_count, 4))
+            self.time_count = unpack("i", reader.read(4))[0]
+            self.times = read_array(reader, "<f4", self.time_count)
+            self.keyframes = read_array(reader, "<f4", (self.time_count, 8))
+            (
+                self.duration,
+                self.repeat,
+                self.stutter_mode,
+                self.unused1,
+            ) = unpack("fiii", reader.read(16))
             if self.type == 7:
-                self.unused2 = unpack("i", reader.read(calcsize("i")))[0]
-            self.zeroes = [unpack("i", reader.read(calcsize("i")))[0] for _ in range(3)]
+                self.unused2 = unpack("i", reader.read(4))[0]
+            self.zeroes = list(unpack("3i", reader.read(12)))
         else:
             print(f"Unknown SKA type: {self.type}.")
+        reader.close()
         return self
 
     def write(self, file_name: str) -> None:
+        parts = [pack("iI", self.magic, self.type)]
+        if self.type == 2:
+            parts.append(pack("i", self.unused1))
+        elif self.type == 3:
+            parts.append(pack("2i", self.unused1, self.unused2))
+        elif self.type == 4:
+            parts.append(
+                pack("4i", self.unused1, self.unused2, self.unused3, self.unused4)
+            )
+        elif self.type == 5:
+            parts.append(
+                pack(
+                    f"5i{len(self.unused6)}i",
+                    self.unused1,
+                    self.unused2,
+                    self.unused3,
+                    self.unused4,
+                    len(self.unused6),
+                    *self.unused6,
+                )
+            )
+        elif self.type == 6 or self.type == 7:
+            parts.append(pack("i", self.header_count))
+            parts.append(np.ascontiguousarray(self.headers, dtype="<u4").tobytes())
+            parts.append(pack("i", self.time_count))
+            parts.append(np.ascontiguousarray(self.times, dtype="<f4").tobytes())
+            parts.append(np.ascontiguousarray(self.keyframes, dtype="<f4").tobytes())
+            parts.append(
+                pack(
+                    "fiii", self.duration, self.repeat, self.stutter_mode, self.unused1
+                )
+            )
+            if self.type == 7:
+                parts.append(pack("i", self.unused2))
+            parts.append(pack(f"{len(self.zeroes)}i", *self.zeroes))
+        else:
+            print(f"Unknown SKA type: {self.type}.")
         with open(file_name, "wb") as file:
-            file.write(pack("i", self.magic))
-            file.write(pack("I", self.type))
-            if self.type == 2:
-                file.write(pack("i", self.unused1))
-            elif self.type == 3:
-                file.write(pack("i", self.unused1))
-                file.write(pack("i", self.unused2))
-            elif self.type == 4:
-                file.write(pack("i", self.unused1))
-                file.write(pack("i", self.unused2))
-                file.write(pack("i", self.unused3))
-                file.write(pack("i", self.unused4))
-            elif self.type == 5:
-                file.write(pack("i", self.unused1))
-                file.write(pack("i", self.unused2))
-                file.write(pack("i", self.unused3))
-                file.write(pack("i", self.unused4))
-                file.write(pack("i", len(self.unused6)))
-                for unused in self.unused6:
-                    file.write(pack("i", unused))
-            elif self.type == 6 or self.type == 7:
-                file.write(pack("i", self.header_count))
-                for header in self.headers:
-                    header.write(file)
-                file.write(pack("i", self.time_count))
-                for time in self.times:
-                    file.write(pack("f", time))
-                for keyframe in self.keyframes:
-                    keyframe.write(file)
-                file.write(pack("f", self.duration))
-                file.write(pack("i", self.repeat))
-                file.write(pack("i", self.stutter_mode))
-                file.write(pack("i", self.unused1))
-                if self.type == 7:
-                    file.write(pack("i", self.unused2))
-                for zero in self.zeroes:
-                    file.write(pack("i", zero))
-            else:
-                print(f"Unknown SKA type: {self.type}.")
+            file.write(b"".join(parts))
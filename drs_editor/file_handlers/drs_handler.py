@@ -1,4 +1,5 @@
 # drs_editor/file_handlers/drs_handler.py
+from drs_editor.data_structures.cached_size import CachedSize
 from drs_editor.data_structures.drs_definitions import DRS
 
 
@@ -98,96 +99,8 @@ class DRSHandler:
                 return False, "Model type of DRS object is unknown. Cannot save."
 
         try:
-            # Ensure offsets are updated before saving
-            # The DRS.save() method in the provided code *calculates* offsets based on node_size.
-            # The DRS.update_offsets() method updates self.data_offset based on node_size.
-            # It seems save() internally manages this, but a call to update_offsets might be intended.
-            # Let's assume DRS.save() handles it or it's part of its internal logic.
-            # The provided `DRS.save` re-calculates node_information_offset and node_hierarchy_offset,
-            # then writes data packets, then node_informations, then nodes.
-            # The `DRS.update_offsets()` method seems to be for calculating the `data_offset`
-            # for each `NodeInformation` *before* they are written, which is what `save` should do.
-
-            # The provided `DRS.save` method does not call `update_offsets`.
-            # The `NodeInformation.offset` is set by `update_offset` which is called by `DRS.update_offsets`.
-            # The `DRS.read` method reads these offsets.
-            # When saving, we need to ensure these offsets are correct for the *new* data sizes.
-
-            # Rebuild node_informations and nodes based on current data objects to ensure consistency
-            # This is complex because __post_init__ sets up a structure.
-            # The simplest way for now is to trust that `read` populated everything correctly
-            # and that modifications updated `node_size` where needed.
-
-            # A simplified view: if drs_object was populated by `read()`, its structure is as per the file.
-            # If we modify (e.g., a mesh), the size of that component might change.
-            # `NodeInformation.node_size` must be updated.
-            # `NodeInformation.offset` must be recalculated for all subsequent nodes.
-            # The `DRS` class's `update_offsets` method is designed for this.
-
-            # Before saving, ensure all NodeInformation.node_size fields are correct
-            for node_info in self.drs_object.node_informations:
-                if (
-                    hasattr(node_info, "data_object")
-                    and node_info.data_object is not None
-                ):  # RootNodeInformation has data_object=None
-                    if hasattr(node_info.data_object, "size"):
-                        actual_size = node_info.data_object.size()
-                        if (
-                            node_info.node_name == "CGeoPrimitiveContainer"
-                        ):  # Special case from drs_definitions
-                            actual_size = 0
-                        node_info.node_size = actual_size
-
-            # Recalculate initial offsets. The first data packet starts after the main header and all node_info and node structures.
-            header_size = (
-                20  # magic, num_models, node_info_offset, node_hier_offset, node_count
-            )
-
-            # Size of all NodeInformation entries
-            # RootNodeInformation is 32 bytes. Other NodeInformation entries are also 32 bytes.
-            node_info_total_size = 0
-            for ni in self.drs_object.node_informations:
-                node_info_total_size += (
-                    ni.size()
-                )  # size() method in NodeInformation and RootNodeInformation
-
-            # Size of all Node entries
-            # RootNode size depends on its name length. Other Node sizes depend on their name lengths.
-            node_hierarchy_total_size = 0
-            for n in self.drs_object.nodes:
-                node_hierarchy_total_size += (
-                    n.size()
-                )  # size() method in Node and RootNode
-
-            self.drs_object.node_information_offset = (
-                header_size  # Node Infos start right after header
-            )
-            self.drs_object.node_hierarchy_offset = (
-                self.drs_object.node_information_offset + node_info_total_size
-            )  # Node Hierarchy after Node Infos
-
-            current_data_offset = (
-                self.drs_object.node_hierarchy_offset + node_hierarchy_total_size
-            )  # Data starts after Node Hierarchy
-
-            # Update offsets for each data node based on the write order
-            from drs_editor.data_structures.drs_definitions import WriteOrder  #
-
-            for node_name_to_write in WriteOrder[self.drs_object.model_type]:  #
-                # Find the NodeInformation corresponding to this node_name
-                found_node_info = None
-                for ni in self.drs_object.node_informations:
-                    if (
-                        hasattr(ni, "node_name") and ni.node_name == node_name_to_write
-                    ):  #
-                        found_node_info = ni
-                        break
-
-                if found_node_info:
-                    found_node_info.offset = current_data_offset  #
-                    current_data_offset += found_node_info.node_size
-                # Else: Node specified in WriteOrder but not found in node_informations. This would be an error.
-
+            # DRS.save lays the file out itself: it recomputes every node_size
+            # and offset from the current data objects before writing.
             self.drs_object.save(filepath)  #
             return True, f"Successfully saved DRS file: {filepath}"
         except Exception as e:
@@ -211,12 +124,17 @@ class DRSHandler:
 
     def update_node_size(self, data_object_instance):
         """
-        Finds the NodeInformation associated with data_object_instance and updates its node_size.
-        This should be called after a data object (e.g., BattleforgeMesh) is modified.
+        Drops the cached sizes of data_object_instance (e.g. a BattleforgeMesh) and
+        of the records above it. This should be called after a data object is
+        modified in place in a way it cannot notice itself.
         """
         if not self.drs_object:
             return
 
+        if isinstance(data_object_instance, CachedSize):
+            data_object_instance.invalidate_size()
+            return
+
         for node_info in self.drs_object.node_informations:
             if (
                 hasattr(node_info, "data_object")
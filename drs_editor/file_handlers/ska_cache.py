@@ -0,0 +1,277 @@
+# drs_editor/file_handlers/ska_cache.py
+"""Process-wide cache of parsed SKA files.
+
+Entries are keyed by absolute path and remember the (mtime, size) of the
+file they were read from; a file that changed on disk is read again. The
+least recently used entries are dropped once their estimated memory exceeds
+the byte budget. The cache is safe to use from several threads, files are
+parsed outside of its lock. Every SKA it hands out is a copy of its own, so
+edits never reach the cache or other users of the same file.
+
+SKAPrefetcher fills a cache on worker threads ahead of use; load_ska waits
+for a file the shared prefetcher is reading instead of reading it again.
+"""
+import copy
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from drs_editor.data_structures.ska_definitions import SKA
+
+# Default byte budget of the shared cache
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+# Charged per entry on top of its arrays for the SKA object itself
+ENTRY_OVERHEAD = 1024
+
+
+def ska_bytes(ska: SKA) -> int:
+    """Estimated memory of a parsed SKA"""
+    arrays = (ska.headers, ska.times, ska.keyframes)
+    return ENTRY_OVERHEAD + sum(
+        array.nbytes for array in arrays if isinstance(array, np.ndarray)
+    )
+
+
+def copy_ska(ska: SKA) -> SKA:
+    """A copy of `ska` sharing no arrays or lists with it"""
+    return copy.deepcopy(ska)
+
+
+def file_signature(path: str) -> Tuple[int, int]:
+    """(mtime in nanoseconds, size) of a file"""
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+@dataclass(eq=False)
+class SKACacheEntry:
+    ska: SKA
+    signature: Tuple[int, int]
+    size: int
+
+
+class SKACache:
+    """LRU cache of parsed SKA files bounded by an estimated byte budget.
+
+    An SKA larger than the whole budget is returned but not kept. The cache
+    keeps copies of the SKA objects put into it and returns copies of those.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES) -> None:
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.current_bytes = 0
+        self._entries: "OrderedDict[str, SKACacheEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, path: str) -> bool:
+        return self._current(path) is not None
+
+    @staticmethod
+    def key(path: str) -> str:
+        return os.path.normcase(os.path.abspath(path))
+
+    def peek(self, path: str) -> Optional[SKA]:
+        """The cached SKA of `path` if it is current, without reading the file
+        or counting a hit or miss"""
+        ska = self._current(path)
+        return None if ska is None else copy_ska(ska)
+
+    def get(self, path: str, force_reload: bool = False) -> SKA:
+        """The parsed SKA of `path`, read from disk if it is not cached, has
+        changed since, or force_reload is set. Errors of reading propagate."""
+        key = self.key(path)
+        signature = file_signature(key)
+        with self._lock:
+            entry = self._entries.get(key)
+            if force_reload or entry is None or entry.signature != signature:
+                entry = None
+                self.misses += 1
+            else:
+                self._entries.move_to_end(key)
+                self.hits += 1
+        if entry is not None:
+            # Cached SKA objects are never edited, copied outside of the lock
+            return copy_ska(entry.ska)
+        ska = SKA().read(key)
+        self.put(key, ska, signature)
+        return ska
+
+    def put(
+        self, path: str, ska: SKA, signature: Optional[Tuple[int, int]] = None
+    ) -> None:
+        """Stores a copy of `ska` as the content of `path` as it is on disk now"""
+        key = self.key(path)
+        if signature is None:
+            signature = file_signature(key)
+        size = ska_bytes(ska)
+        if size > self.max_bytes:
+            self.invalidate(key)
+            return
+        entry = SKACacheEntry(copy_ska(ska), signature, size)
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = entry
+            self.current_bytes += entry.size
+            while self.current_bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate(self, path: str) -> None:
+        """Drops the entry of `path`"""
+        with self._lock:
+            self._remove(self.key(path))
+
+    def clear(self) -> None:
+        """Drops all entries, the counters are kept"""
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self) -> dict:
+        """Counters and fill of the cache"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self.current_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+    def _current(self, path: str) -> Optional[SKA]:
+        """The cached SKA object of `path` itself if it is current"""
+        key = self.key(path)
+        try:
+            signature = file_signature(key)
+        except OSError:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.signature != signature:
+                return None
+            return entry.ska
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.current_bytes -= entry.size
+
+
+# Called as progress(done, total, path, error) after each prefetched file
+PrefetchProgress = Callable[[int, int, str, Optional[BaseException]], None]
+
+
+class SKAPrefetcher:
+    """Reads SKA files into a cache on a pool of worker threads.
+
+    The thread pool is started with the first prefetch. Files already cached
+    or being read are skipped.
+    """
+
+    def __init__(self, cache: SKACache, max_workers: Optional[int] = None) -> None:
+        self.cache = cache
+        self.max_workers = max_workers or min(4, os.cpu_count() or 1)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._pending: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    def prefetch(
+        self, paths: Iterable[str], progress: Optional[PrefetchProgress] = None
+    ) -> List[Future]:
+        """Queues the files of `paths` that are not cached. `progress` is
+        called from the worker threads once per queued file, read, failed or
+        cancelled, with the count done so far and the number queued."""
+        keys = [
+            key
+            for key in dict.fromkeys(self.cache.key(path) for path in paths)
+            if key not in self.cache
+        ]
+        counter = {"done": 0}
+        counter_lock = threading.Lock()
+
+        def report(key: str, future: Future) -> None:
+            with counter_lock:
+                counter["done"] += 1
+                done = counter["done"]
+            error = None if future.cancelled() else future.exception()
+            if progress is not None:
+                progress(done, len(keys), key, error)
+
+        futures = []
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    self.max_workers, thread_name_prefix="ska-prefetch"
+                )
+            for key in keys:
+                future = self._pending.get(key)
+                if future is None:
+                    future = self._executor.submit(self._read, key)
+                    self._pending[key] = future
+                futures.append(future)
+        for key, future in zip(keys, futures):
+            future.add_done_callback(lambda future, key=key: report(key, future))
+        return futures
+
+    def _read(self, key: str) -> None:
+        try:
+            self.cache.get(key)
+        finally:
+            with self._lock:
+                self._pending.pop(key, None)
+
+    def pending(self, path: str) -> Optional[Future]:
+        """The future of `path` if it is queued or being read"""
+        with self._lock:
+            return self._pending.get(self.cache.key(path))
+
+    def cancel(self) -> None:
+        """Drops the queued files, files being read are finished"""
+        with self._lock:
+            for key, future in list(self._pending.items()):
+                if future.cancel():
+                    del self._pending[key]
+
+    def shutdown(self) -> None:
+        """Cancels the queued files and stops the worker threads"""
+        self.cancel()
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False)
+
+
+# Shared by the editors and headless scripts of this process
+ska_cache = SKACache()
+ska_prefetcher = SKAPrefetcher(ska_cache)
+
+
+def load_ska(path: str, force_reload: bool = False) -> SKA:
+    """A copy of the parsed SKA of `path` through the shared cache, waiting
+    for the shared prefetcher if it is reading the file"""
+    if not force_reload:
+        future = ska_prefetcher.pending(path)
+        if future is not None:
+            try:
+                future.result()
+            except Exception:  # pylint: disable=broad-except
+                pass  # read again below, raising the error to the caller
+    return ska_cache.get(path, force_reload)
@@ -0,0 +1,23 @@
+"""Vectorized array helpers shared by the geometry modules."""
+import numpy as np
+
+
+def scatter_add(values: np.ndarray, targets: np.ndarray, count: int) -> np.ndarray:
+    """Sums each row of `values` into every vertex of the matching row of
+    `targets`"""
+    result = np.zeros((count, values.shape[1]))
+    weights = np.repeat(values, targets.shape[1], axis=0)
+    corners = targets.ravel()
+    for column in range(values.shape[1]):
+        result[:, column] = np.bincount(corners, weights[:, column], minlength=count)
+    return result
+
+
+def expand_ranges(owners: np.ndarray, starts: np.ndarray, counts: np.ndarray):
+    """Pairs every owner with each index of its range [start, start + count)"""
+    total = int(counts.sum())
+    if not total:
+        return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp)
+    firsts = np.cumsum(counts) - counts
+    indices = np.arange(total) + np.repeat(starts - firsts, counts)
+    return np.repeat(owners, counts), indices
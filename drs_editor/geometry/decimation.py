@@ -0,0 +1,427 @@
+"""Quadric error mesh decimation for LevelOfDetail variants of a BattleforgeMesh.
+
+Garland and Heckbert quadrics are accumulated for all faces at once and
+every edge starts out in one heap of collapse candidates. Collapses are
+half-edge collapses: a vertex u moves onto its neighbor v and disappears, v
+keeps its position and its record in every MeshData stream. Normals, UVs,
+tangents and skin weights of the surviving vertices are therefore the
+originals, nothing is interpolated.
+
+Vertices that share their position with another vertex sit on a UV, normal
+or smoothing seam and never move, so both sides of a seam stay welded.
+Open borders may only collapse along themselves and are held in place by
+border planes in their quadrics. Collapses between vertices with different
+skin weights pay a penalty, so bone regions keep their outlines.
+
+The heap is processed lazily: an entry is discarded when one of its
+vertices changed after it was pushed.
+"""
+import copy
+import heapq
+from dataclasses import dataclass
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from ..data_structures.drs_definitions import BattleforgeMesh, CSkSkinInfo, FaceBuffer
+from .arrays import scatter_add
+
+# Weight of the planes through open borders, relative to the face planes
+BORDER_WEIGHT = 100.0
+# Minimum cosine between a face normal before and after a collapse
+FLIP_COSINE = 0.2
+
+
+@dataclass(eq=False, repr=False)
+class Decimation:
+    """A reduced copy of a mesh, `kept[i]` is the original index of its
+    vertex i, for data kept outside the mesh such as CSkSkinInfo"""
+
+    mesh: BattleforgeMesh
+    kept: np.ndarray
+    error: float = 0.0
+
+
+def mesh_skin(
+    mesh: BattleforgeMesh, skin_info: Optional[CSkSkinInfo] = None, offset: int = 0
+) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+    """Weights and bone indices (N, 4) of the mesh vertices, from the slice of
+    `skin_info` starting at `offset` or else from a revision 12 stream"""
+    if skin_info is not None and len(skin_info.weights) >= offset + mesh.vertex_count:
+        end = offset + mesh.vertex_count
+        return skin_info.weights[offset:end], skin_info.bone_indices[offset:end]
+    for mesh_data in mesh.mesh_data:
+        if mesh_data.revision == 12:
+            data = mesh_data.data
+            return data["raw_weights"] / 255.0, data["bone_indices"]
+    return None
+
+
+def face_quadrics(positions: np.ndarray, faces: np.ndarray) -> np.ndarray:
+    """Area weighted plane quadrics summed per vertex, as the 10 distinct
+    coefficients a2 ab ac ad b2 bc bd c2 cd d2 of each symmetric 4x4"""
+    a, b, c = (positions[faces[:, corner]] for corner in range(3))
+    normals = np.cross(b - a, c - a)
+    doubled_area = np.linalg.norm(normals, axis=1)
+    normals /= np.maximum(doubled_area, 1e-30)[:, None]
+    planes = np.column_stack([normals, -np.einsum("ij,ij->i", normals, a)])
+    coefficients = plane_coefficients(planes) * (doubled_area / 2)[:, None]
+    return scatter_add(coefficients, faces, len(positions))
+
+
+def plane_coefficients(planes: np.ndarray) -> np.ndarray:
+    rows, columns = np.triu_indices(4)
+    return planes[:, rows] * planes[:, columns]
+
+
+def face_edges(faces: np.ndarray) -> np.ndarray:
+    """The three edges of every face, (3M, 2) with the lower vertex first"""
+    return np.sort(faces[:, [0, 1, 1, 2, 2, 0]].reshape(-1, 2), axis=1)
+
+
+def border_quadrics(positions, faces, on_border) -> np.ndarray:
+    """Quadrics of planes through the open border edges, perpendicular to
+    their face. on_border flags the rows of face_edges(faces)."""
+    edges = face_edges(faces)[on_border]
+    owners = np.repeat(np.arange(len(faces)), 3)[on_border]
+    a, b = positions[edges[:, 0]], positions[edges[:, 1]]
+    face = faces[owners]
+    normals = np.cross(
+        positions[face[:, 1]] - positions[face[:, 0]],
+        positions[face[:, 2]] - positions[face[:, 0]],
+    )
+    direction = b - a
+    length = np.linalg.norm(direction, axis=1)
+    planes = np.cross(direction, normals)
+    planes /= np.maximum(np.linalg.norm(planes, axis=1), 1e-30)[:, None]
+    planes = np.column_stack([planes, -np.einsum("ij,ij->i", planes, a)])
+    coefficients = plane_coefficients(planes) * (BORDER_WEIGHT * length**2)[:, None]
+    return scatter_add(coefficients, edges, len(positions))
+
+
+def quadric_error(q, point) -> float:
+    x, y, z = point
+    return (
+        q[0] * x * x
+        + 2 * (q[1] * x * y + q[2] * x * z + q[3] * x)
+        + q[4] * y * y
+        + 2 * (q[5] * y * z + q[6] * y)
+        + q[7] * z * z
+        + 2 * q[8] * z
+        + q[9]
+    )
+
+
+def quadric_errors(q: np.ndarray, points: np.ndarray) -> np.ndarray:
+    """quadric_error for rows of coefficients and points"""
+    x, y, z = points.T
+    return (
+        q[:, 0] * x * x
+        + 2 * (q[:, 1] * x * y + q[:, 2] * x * z + q[:, 3] * x)
+        + q[:, 4] * y * y
+        + 2 * (q[:, 5] * y * z + q[:, 6] * y)
+        + q[:, 7] * z * z
+        + 2 * q[:, 8] * z
+        + q[:, 9]
+    )
+
+
+def skin_distances(weights, bones, sources, targets) -> np.ndarray:
+    """skin_distance between the vertices of every (source, target) pair"""
+    first, second = weights[sources], weights[targets]
+    same_bone = bones[sources][:, :, None] == bones[targets][:, None, :]
+    overlap = (same_bone * np.minimum(first[:, :, None], second[:, None, :])).sum(
+        axis=(1, 2)
+    )
+    return np.maximum(first.sum(axis=1) + second.sum(axis=1) - 2 * overlap, 0.0)
+
+
+def skin_distance(first, second) -> float:
+    """L1 distance of two {bone: weight} influences, 0 to 2"""
+    distance = 0.0
+    for bone, weight in first.items():
+        distance += abs(weight - second.get(bone, 0.0))
+    for bone, weight in second.items():
+        if bone not in first:
+            distance += weight
+    return distance
+
+
+class QuadricDecimator:
+    """Collapse state of one mesh, reduced in steps by `reduce_to`"""
+
+    def __init__(
+        self,
+        positions: np.ndarray,
+        faces: np.ndarray,
+        skin: Optional[Tuple[np.ndarray, np.ndarray]] = None,
+        skin_weight: float = 1.0,
+    ) -> None:
+        positions = np.asarray(positions, dtype=np.float64)
+        faces = np.asarray(faces, dtype=np.intp)
+        count = len(positions)
+        edges, inverse, uses = np.unique(
+            face_edges(faces), axis=0, return_inverse=True, return_counts=True
+        )
+        on_border = uses[inverse.ravel()] == 1
+        # Degenerate faces repeat a vertex, such an edge never collapses
+        proper = edges[:, 0] != edges[:, 1]
+        edges, uses = edges[proper], uses[proper]
+        quadrics = face_quadrics(positions, faces)
+        if on_border.any():
+            quadrics += border_quadrics(positions, faces, on_border)
+
+        # Seam vertices share their position with another vertex
+        _, welded, group_sizes = np.unique(
+            positions, axis=0, return_inverse=True, return_counts=True
+        )
+        locked = group_sizes[welded.ravel()] > 1
+        self.locked = locked.tolist()
+        # Neighbors along open borders, a border vertex may only slide
+        # along them
+        self.border_links = [set() for _ in range(count)]
+        for first, second in edges[uses == 1].tolist():
+            self.border_links[first].add(second)
+            self.border_links[second].add(first)
+
+        self.positions = [tuple(point) for point in positions.tolist()]
+        self.quadrics = quadrics.tolist()
+        self.faces = faces.tolist()
+        self.face_alive = [True] * len(faces)
+        self.alive_faces = len(faces)
+        self.vertex_faces = [set() for _ in range(count)]
+        for face, corners in enumerate(self.faces):
+            for vertex in corners:
+                self.vertex_faces[vertex].add(face)
+        self.version = [0] * count
+        self.removed = [False] * count
+        self.error = 0.0
+
+        self.skin = None
+        self.skin_penalty = 0.0
+        if skin is not None and skin_weight > 0:
+            weights, bones = (np.asarray(part) for part in skin)
+            self.skin = [
+                {bone: weight for bone, weight in zip(row_bones, row_weights) if weight}
+                for row_bones, row_weights in zip(bones.tolist(), weights.tolist())
+            ]
+            # In units of the quadric error: area times squared length
+            lengths = np.linalg.norm(
+                positions[edges[:, 0]] - positions[edges[:, 1]], axis=1
+            )
+            area = mean_face_area(positions, faces)
+            self.skin_penalty = skin_weight * area * float(np.mean(lengths)) ** 2
+
+        # Every allowed collapse in both directions, priced in one pass
+        sources = np.concatenate([edges[:, 0], edges[:, 1]])
+        targets = np.concatenate([edges[:, 1], edges[:, 0]])
+        border_edge = np.tile(uses == 1, 2)
+        border_vertex = np.zeros(count, bool)
+        border_vertex[edges[uses == 1].ravel()] = True
+        allowed = ~locked[sources] & (~border_vertex[sources] | border_edge)
+        sources, targets = sources[allowed], targets[allowed]
+        costs = np.maximum(
+            quadric_errors(quadrics[sources] + quadrics[targets], positions[targets]),
+            0.0,
+        )
+        if self.skin is not None:
+            costs += self.skin_penalty * skin_distances(
+                weights, bones, sources, targets
+            )
+        zeros = [0] * len(sources)
+        self.heap = list(
+            zip(costs.tolist(), sources.tolist(), targets.tolist(), zeros, zeros)
+        )
+        heapq.heapify(self.heap)
+
+    def cost(self, source: int, target: int) -> float:
+        point = self.positions[target]
+        cost = quadric_error(self.quadrics[source], point) + quadric_error(
+            self.quadrics[target], point
+        )
+        cost = max(cost, 0.0)
+        if self.skin is not None:
+            cost += self.skin_penalty * skin_distance(
+                self.skin[source], self.skin[target]
+            )
+        return cost
+
+    def push(self, source: int, target: int, heap_push=None) -> None:
+        """Queues the collapse of `source` onto `target` where allowed"""
+        if self.locked[source]:
+            return
+        links = self.border_links[source]
+        if links and target not in links:
+            return
+        entry = (
+            self.cost(source, target),
+            source,
+            target,
+            self.version[source],
+            self.version[target],
+        )
+        if heap_push is None:
+            self.heap.append(entry)
+        else:
+            heap_push(self.heap, entry)
+
+    def neighbors(self, vertex: int) -> set:
+        result = set()
+        for face in self.vertex_faces[vertex]:
+            result.update(self.faces[face])
+        result.discard(vertex)
+        return result
+
+    def can_collapse(self, source: int, target: int) -> bool:
+        shared = self.vertex_faces[source] & self.vertex_faces[target]
+        if not shared:
+            return False
+        # Link condition: the only common neighbors are the opposite corners
+        # of the faces on the edge, otherwise the surface pinches
+        opposite = set()
+        for face in shared:
+            opposite.update(self.faces[face])
+        opposite -= {source, target}
+        if (self.neighbors(source) & self.neighbors(target)) - opposite:
+            return False
+        # Faces that move with the source must not flip or collapse
+        moved = self.positions[target]
+        for face in self.vertex_faces[source] - shared:
+            corners = self.faces[face]
+            points = [self.positions[vertex] for vertex in corners]
+            before = triangle_normal(*points)
+            points[corners.index(source)] = moved
+            after = triangle_normal(*points)
+            length = dot(before, before) ** 0.5 * dot(after, after) ** 0.5
+            if length <= 0 or dot(before, after) < FLIP_COSINE * length:
+                return False
+        return True
+
+    def collapse(self, source: int, target: int) -> None:
+        for face in list(self.vertex_faces[source]):
+            corners = self.faces[face]
+            if target in corners:
+                self.face_alive[face] = False
+                self.alive_faces -= 1
+                for vertex in corners:
+                    self.vertex_faces[vertex].discard(face)
+            else:
+                corners[corners.index(source)] = target
+                self.vertex_faces[target].add(face)
+        self.vertex_faces[source] = set()
+        self.removed[source] = True
+        self.quadrics[target] = [
+            a + b for a, b in zip(self.quadrics[target], self.quadrics[source])
+        ]
+        links, self.border_links[source] = self.border_links[source], set()
+        for vertex in links - {source}:
+            self.border_links[vertex].discard(source)
+            if vertex != target:
+                self.border_links[vertex].add(target)
+                self.border_links[target].add(vertex)
+        # Only collapses onto or from the target changed their cost
+        self.version[target] += 1
+        for vertex in self.neighbors(target):
+            self.push(vertex, target, heapq.heappush)
+            self.push(target, vertex, heapq.heappush)
+
+    def reduce_to(self, face_count: int) -> None:
+        """Collapses the cheapest edges until at most `face_count` faces are
+        left or no allowed collapse remains"""
+        heap = self.heap
+        while self.alive_faces > face_count and heap:
+            cost, source, target, source_version, target_version = heapq.heappop(heap)
+            if self.removed[source] or self.removed[target]:
+                continue
+            if (
+                self.version[source] != source_version
+                or self.version[target] != target_version
+            ):
+                continue
+            if not self.can_collapse(source, target):
+                continue
+            self.collapse(source, target)
+            self.error = max(self.error, cost)
+
+    def result(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Faces renumbered over the kept vertices, and the kept vertices"""
+        faces = np.array(
+            [
+                corners
+                for corners, alive in zip(self.faces, self.face_alive)
+                if alive
+            ],
+            dtype=np.intp,
+        ).reshape(-1, 3)
+        kept = np.unique(faces)
+        renumber = np.full(len(self.positions), -1, dtype=np.intp)
+        renumber[kept] = np.arange(len(kept))
+        return renumber[faces], kept
+
+
+def triangle_normal(a, b, c):
+    u = (b[0] - a[0], b[1] - a[1], b[2] - a[2])
+    v = (c[0] - a[0], c[1] - a[1], c[2] - a[2])
+    return (
+        u[1] * v[2] - u[2] * v[1],
+        u[2] * v[0] - u[0] * v[2],
+        u[0] * v[1] - u[1] * v[0],
+    )
+
+
+def dot(u, v) -> float:
+    return u[0] * v[0] + u[1] * v[1] + u[2] * v[2]
+
+
+def mean_face_area(positions: np.ndarray, faces: np.ndarray) -> float:
+    a, b, c = (positions[faces[:, corner]] for corner in range(3))
+    return float(np.linalg.norm(np.cross(b - a, c - a), axis=1).mean()) / 2
+
+
+def mesh_positions(mesh: BattleforgeMesh) -> np.ndarray:
+    for mesh_data in mesh.mesh_data:
+        if "position" in mesh_data.data.dtype.names:
+            return mesh_data.data["position"]
+    raise TypeError("The mesh has no position stream to decimate")
+
+
+def reduced_copy(
+    mesh: BattleforgeMesh, faces: np.ndarray, kept: np.ndarray, lod_level: int
+) -> BattleforgeMesh:
+    """Copy of `mesh` with only the kept vertices and the given faces"""
+    # Leave the owner of the original out of the copy
+    reduced = copy.deepcopy(mesh, {id(mesh._parent): None})
+    reduced.faces = FaceBuffer(faces)
+    reduced.face_count = len(faces)
+    reduced.vertex_count = len(kept)
+    for mesh_data in reduced.mesh_data:
+        mesh_data.data = mesh_data.data[kept]
+    reduced.level_of_detail.lod_level = lod_level
+    reduced.update_bounds()
+    return reduced
+
+
+def decimate_mesh(
+    mesh: BattleforgeMesh,
+    ratios: Sequence[float] = (0.5, 0.25),
+    skin: Optional[Tuple[np.ndarray, np.ndarray]] = None,
+    skin_weight: float = 1.0,
+    first_lod_level: int = 1,
+) -> List[Decimation]:
+    """Reduced copies of `mesh` keeping about `ratio` of its triangles, one
+    per ratio, all from a single collapse sequence.
+
+    `skin` holds the weights and bone indices (N, 4) of the vertices, see
+    mesh_skin. The copies get successive LevelOfDetail levels starting at
+    first_lod_level. A copy keeps more triangles than asked for when
+    seams, borders or flips leave no allowed collapse.
+    """
+    faces = np.asarray(mesh.faces.indices, dtype=np.intp)
+    decimator = QuadricDecimator(mesh_positions(mesh), faces, skin, skin_weight)
+    result = []
+    for level, ratio in enumerate(sorted(ratios, reverse=True)):
+        decimator.reduce_to(int(np.ceil(ratio * len(faces))))
+        reduced_faces, kept = decimator.result()
+        reduced = reduced_copy(mesh, reduced_faces, kept, first_lod_level + level)
+        result.append(Decimation(reduced, kept, decimator.error))
+    return result
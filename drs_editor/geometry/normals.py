@@ -0,0 +1,154 @@
+"""Vertex normals recomputed from the faces of a BattleforgeMesh.
+
+Face normals are summed into their corners weighted by the face area or by
+the angle of the face at that corner, which keeps the result independent of
+how a surface happens to be triangulated.
+
+Vertices that share a position, split for UV or smoothing seams, are
+smoothed together. A vertex only takes the faces of the other vertices at
+its position whose normals lie within the crease angle (60 degrees unless
+given) of its own faces, so hard edges modeled as split vertices stay hard.
+
+Revision 163841 streams have no normal field and read as zero normals.
+fill_missing_normals derives them and keeps them on the stream, outside of
+the serialized data.
+"""
+from typing import Optional, Tuple
+
+import numpy as np
+
+from ..data_structures.drs_definitions import BattleforgeMesh
+from .arrays import expand_ranges, scatter_add
+
+# Revision of the MeshData streams that hold no normals
+NORMALLESS_REVISION = 163841
+# Faces meeting at a sharper angle keep a hard edge between them
+DEFAULT_CREASE_ANGLE = 60.0
+
+
+def normalized(vectors: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Unit rows of `vectors` and their original lengths, zero rows stay zero"""
+    lengths = np.sqrt(np.einsum("ij,ij->i", vectors, vectors))
+    return vectors / np.maximum(lengths, 1e-30)[:, None], lengths
+
+
+def stream_field(mesh: BattleforgeMesh, name: str) -> Optional[np.ndarray]:
+    """The `name` field of the first MeshData stream holding one"""
+    for mesh_data in mesh.mesh_data:
+        if name in mesh_data.data.dtype.names:
+            return mesh_data.data[name]
+    return None
+
+
+def corner_weights(positions: np.ndarray, faces: np.ndarray, weighting: str):
+    """Unit face normals (M, 3) and the weight of every face corner (M, 3)"""
+    p0, p1, p2 = (positions[faces[:, corner]] for corner in range(3))
+    normals, lengths = normalized(np.cross(p1 - p0, p2 - p0))
+    if weighting == "area":
+        return normals, np.repeat(lengths[:, None] / 2, 3, axis=1)
+    if weighting != "angle":
+        raise TypeError(f"Unknown normal weighting {weighting!r}")
+    angles = []
+    for corner, first, second in ((p0, p1, p2), (p1, p2, p0), (p2, p0, p1)):
+        u, v = first - corner, second - corner
+        sines = normalized(np.cross(u, v))[1]
+        angles.append(np.arctan2(sines, np.einsum("ij,ij->i", u, v)))
+    # Degenerate faces have no direction to contribute
+    return normals, np.column_stack(angles) * (lengths > 0)[:, None]
+
+
+def vertex_normals(
+    positions: np.ndarray,
+    faces: np.ndarray,
+    weighting: str = "angle",
+    crease_angle: Optional[float] = DEFAULT_CREASE_ANGLE,
+    weld: bool = True,
+) -> np.ndarray:
+    """Unit normals (N, 3) of the vertices, zero for vertices without faces.
+
+    weighting is "angle" or "area". With weld, vertices at the same position
+    are smoothed together, limited to faces within crease_angle degrees of
+    the vertex's own faces. crease_angle None smooths over every edge.
+    """
+    positions = np.asarray(positions, dtype=np.float64)
+    faces = np.asarray(faces, dtype=np.intp)
+    count = len(positions)
+    face_normals, weights = corner_weights(positions, faces, weighting)
+    contributions = np.repeat(face_normals, 3, axis=0) * weights.reshape(-1, 1)
+    corners = faces.ravel()
+    if not weld:
+        return normalized(scatter_add(contributions, corners[:, None], count))[0]
+
+    _, groups = np.unique(positions, axis=0, return_inverse=True)
+    groups = groups.ravel()
+    group_count = int(groups.max()) + 1 if count else 0
+    if crease_angle is None:
+        sums = scatter_add(contributions, groups[corners][:, None], group_count)
+        return normalized(sums[groups])[0]
+
+    # Every vertex paired with each corner at its position
+    own = normalized(scatter_add(contributions, corners[:, None], count))[0]
+    order = np.argsort(groups[corners], kind="stable")
+    offsets = np.searchsorted(groups[corners][order], np.arange(group_count + 1))
+    starts = offsets[groups]
+    vertices, indices = expand_ranges(
+        np.arange(count), starts, offsets[groups + 1] - starts
+    )
+    partners = order[indices]
+    alignment = np.einsum("ij,ij->i", face_normals[partners // 3], own[vertices])
+    kept = (corners[partners] == vertices) | (
+        alignment >= np.cos(np.radians(crease_angle))
+    )
+    sums = scatter_add(contributions[partners[kept]], vertices[kept][:, None], count)
+    return normalized(sums)[0]
+
+
+def recompute_normals(
+    mesh: BattleforgeMesh,
+    weighting: str = "angle",
+    crease_angle: Optional[float] = DEFAULT_CREASE_ANGLE,
+) -> None:
+    """Rewrites the normal field of `mesh` from its faces. Vertices without
+    faces keep their normal."""
+    positions = stream_field(mesh, "position")
+    if positions is None:
+        raise TypeError("Normals need a mesh with a position stream")
+    normals = vertex_normals(positions, mesh.faces.indices, weighting, crease_angle)
+    unused = ~normals.any(axis=1)
+    for mesh_data in mesh.mesh_data:
+        if "normal" in mesh_data.data.dtype.names:
+            data = mesh_data.data
+            data["normal"] = np.where(unused[:, None], data["normal"], normals)
+        elif mesh_data.revision == NORMALLESS_REVISION:
+            mesh_data._normals = normals.astype(np.float32)
+
+
+def fill_missing_normals(
+    mesh: BattleforgeMesh,
+    weighting: str = "angle",
+    crease_angle: Optional[float] = DEFAULT_CREASE_ANGLE,
+) -> None:
+    """Derives the normals of the revision 163841 streams of `mesh`. They are
+    handed out by MeshData.vertices and never written."""
+    streams = [
+        mesh_data
+        for mesh_data in mesh.mesh_data
+        if mesh_data.revision == NORMALLESS_REVISION
+    ]
+    if not streams:
+        return
+    positions = stream_field(mesh, "position")
+    normals = vertex_normals(positions, mesh.faces.indices, weighting, crease_angle)
+    for mesh_data in streams:
+        mesh_data._normals = normals.astype(np.float32)
+
+
+def recompute_drs_normals(
+    drs,
+    weighting: str = "angle",
+    crease_angle: Optional[float] = DEFAULT_CREASE_ANGLE,
+) -> None:
+    """Recomputes the normals of every mesh of a DRS"""
+    if drs.cdsp_mesh_file is not None:
+        for mesh in drs.cdsp_mesh_file.meshes:
+            recompute_normals(mesh, weighting, crease_angle)
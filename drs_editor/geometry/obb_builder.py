@@ -0,0 +1,246 @@
+"""Rebuilds the CGeoOBBTree of a unit from its collision mesh.
+
+The tree is built top-down one level at a time. Every node of a level gets
+an oriented box from the principal axes of its triangle corners, then has its
+triangles sorted along the longest box axis and cut at the median. All nodes
+of a level go through each of these steps together as segments of one
+triangle permutation, so the tree grows in a handful of array passes per level.
+
+Nodes are stored in depth-first order. A node covers the faces
+[triangle_offset, triangle_offset + total_triangles) of the rebuilt
+CGeoOBBTree.faces, its children follow it, and skip_pointer names the node
+after its subtree, or 0 at the end of the tree. The box matrix holds the
+axes scaled by the half extents as columns, as read by OBBTreeQuery.
+"""
+from typing import Optional
+
+import numpy as np
+
+try:
+    from mathutils import Matrix
+except ImportError:
+    from ..utils.dummy_mathutils import Matrix
+
+from ..data_structures.drs_definitions import (
+    CGeoMesh,
+    CGeoOBBTree,
+    CMatCoordinateSystem,
+    FaceBuffer,
+    Matrix3x3,
+    OBBNode,
+    Vector3,
+)
+from .arrays import expand_ranges
+
+# Child links, skip pointers and depths are stored as uint16
+MAX_NODES = 0xFFFF
+
+
+def fit_boxes(corners, sums, moments, firsts, counts):
+    """Principal-axis boxes around consecutive runs of triangles.
+
+    corners holds (P, 3, 3) triangle corners, sums and moments the per
+    triangle sum and sum of outer products of its corners. Run k starts at
+    firsts[k] and spans counts[k] triangles. Returns the axes (K, 3, 3) as
+    columns, the centers (K, 3) and the half extents (K, 3) of the runs.
+    """
+    samples = 3 * counts[:, None]
+    mean = np.add.reduceat(sums, firsts) / samples
+    covariance = np.add.reduceat(moments, firsts) / samples[:, :, None]
+    covariance -= mean[:, :, None] * mean[:, None, :]
+    _, axes = np.linalg.eigh(covariance)
+    # Keep the frames right-handed, the box matrix is a scaled rotation
+    axes[np.linalg.det(axes) < 0, :, 0] *= -1
+
+    owners = np.repeat(np.arange(len(counts)), counts)
+    local = corners @ axes[owners]
+    a, b, c = local[:, 0], local[:, 1], local[:, 2]
+    lower = np.minimum.reduceat(np.minimum(np.minimum(a, b), c), firsts)
+    upper = np.maximum.reduceat(np.maximum(np.maximum(a, b), c), firsts)
+    centers = (axes @ ((lower + upper) / 2)[:, :, None])[:, :, 0]
+    return axes, centers, (upper - lower) / 2
+
+
+def build_levels(corners: np.ndarray, leaf_triangles: int):
+    """Splits the triangles level by level.
+
+    Returns the triangle permutation and, per node in breadth-first order,
+    its first triangle, triangle count, depth, children (0 for none), axes,
+    center and half extents.
+    """
+    count = len(corners)
+    sums = corners.sum(axis=1)
+    moments = np.einsum("pvi,pvj->pij", corners, corners)
+    centroids = sums / 3
+    permutation = np.arange(count)
+    starts = np.zeros(1, dtype=np.intp)
+    counts = np.array([count], dtype=np.intp)
+    levels = []
+    created = 1
+    while len(starts):
+        owners, positions = expand_ranges(np.arange(len(starts)), starts, counts)
+        triangles = permutation[positions]
+        firsts = np.cumsum(counts) - counts
+        axes, centers, extents = fit_boxes(
+            corners[triangles], sums[triangles], moments[triangles], firsts, counts
+        )
+
+        # Median cut along the longest axis of every box that is split
+        longest = axes[np.arange(len(starts)), :, extents.argmax(axis=1)]
+        keys = np.einsum("pi,pi->p", centroids[triangles], longest[owners])
+        # One sort for all nodes, the keys scaled into [owner, owner + 1)
+        low = np.minimum.reduceat(keys, firsts)
+        span = np.maximum.reduceat(keys, firsts) - low
+        keys = (keys - low[owners]) / (span[owners] * (1 + 1e-9) + 1e-300)
+        order = np.argsort(owners + keys)
+        permutation[positions] = triangles[order]
+
+        split = counts > leaf_triangles
+        children = np.zeros((len(starts), 2), dtype=np.intp)
+        children[split] = created + 2 * np.arange(split.sum())[:, None] + [0, 1]
+        created += 2 * int(split.sum())
+        levels.append((starts, counts, children, axes, centers, extents))
+
+        halves = counts[split] // 2
+        starts = np.column_stack([starts[split], starts[split] + halves]).ravel()
+        counts = np.column_stack([halves, counts[split] - halves]).ravel()
+    columns = [np.concatenate(column) for column in zip(*levels)]
+    depths = np.concatenate(
+        [np.full(len(level[0]), depth) for depth, level in enumerate(levels)]
+    )
+    return permutation, columns, depths
+
+
+def depth_first_order(children: np.ndarray, depths: np.ndarray):
+    """Depth-first index and subtree size of every breadth-first node"""
+    sizes = np.ones(len(children), dtype=np.intp)
+    order = np.zeros(len(children), dtype=np.intp)
+    parents = [
+        np.flatnonzero((depths == depth) & (children[:, 0] != 0))
+        for depth in range(int(depths.max()) + 1)
+    ]
+    for nodes in reversed(parents):
+        first, second = children[nodes].T
+        sizes[nodes] += sizes[first] + sizes[second]
+    for nodes in parents:
+        first, second = children[nodes].T
+        order[first] = order[nodes] + 1
+        order[second] = order[nodes] + 1 + sizes[first]
+    return order, sizes
+
+
+def node_boxes(axes, centers, extents):
+    """CMatCoordinateSystem per node, the axes scaled by the half extents"""
+    rows = (axes * extents[:, None, :]).tolist()
+    boxes = []
+    for matrix, center in zip(rows, centers.tolist()):
+        boxes.append(
+            CMatCoordinateSystem(
+                Matrix3x3((*matrix[0], *matrix[1], *matrix[2]), Matrix(matrix)),
+                Vector3(*center),
+            )
+        )
+    return boxes
+
+
+def build_obb_tree(
+    mesh: CGeoMesh,
+    obb_tree: Optional[CGeoOBBTree] = None,
+    leaf_triangles: int = 8,
+) -> CGeoOBBTree:
+    """Builds the OBB tree over the faces of `mesh`.
+
+    The result is written into `obb_tree` when given, otherwise into a new
+    CGeoOBBTree. Trees that would exceed the uint16 node links are rebuilt
+    with larger leaves.
+    """
+    if obb_tree is None:
+        obb_tree = CGeoOBBTree()
+    faces = np.asarray(mesh.faces.indices, dtype=np.intp)
+    if not len(faces):
+        obb_tree.obb_nodes = []
+        obb_tree.matrix_count = 0
+        obb_tree.faces = FaceBuffer()
+        obb_tree.triangle_count = 0
+        return obb_tree
+    corners = np.asarray(mesh.vertices, dtype=np.float64)[:, :3][faces]
+
+    leaf_triangles = max(1, leaf_triangles)
+    while True:
+        permutation, columns, depths = build_levels(corners, leaf_triangles)
+        if len(depths) <= MAX_NODES:
+            break
+        leaf_triangles *= 2
+    starts, counts, children, axes, centers, extents = columns
+    order, sizes = depth_first_order(children, depths)
+    total = len(order)
+
+    boxes = node_boxes(axes, centers, extents)
+    links = np.where(children != 0, order[children], 0).tolist()
+    skips = order + sizes
+    skips = np.where(skips < total, skips, 0).tolist()
+    depths, starts, counts = depths.tolist(), starts.tolist(), counts.tolist()
+    nodes = [None] * total
+    for node, index in enumerate(order.tolist()):
+        nodes[index] = OBBNode(
+            boxes[node],
+            *links[node],
+            skips[node],
+            depths[node],
+            starts[node],
+            counts[node],
+        )
+    obb_tree.obb_nodes = nodes
+    obb_tree.matrix_count = total
+    obb_tree.faces = FaceBuffer(faces[permutation])
+    obb_tree.triangle_count = len(permutation)
+    return obb_tree
+
+
+def rebuild_obb_tree(drs, leaf_triangles: int = 8) -> CGeoOBBTree:
+    """Regenerates the CGeoOBBTree of a DRS in place from its CGeoMesh"""
+    return build_obb_tree(drs.cgeo_mesh, drs.cgeo_obb_tree, leaf_triangles)
+
+
+def covers_mesh(obb_tree: CGeoOBBTree, mesh: CGeoMesh) -> bool:
+    """Whether the tree faces are the mesh faces, in any order"""
+    tree_faces = np.ascontiguousarray(obb_tree.faces.indices, dtype="<u2")
+    mesh_faces = np.ascontiguousarray(mesh.faces.indices, dtype="<u2")
+    if tree_faces.shape != mesh_faces.shape:
+        return False
+    rows = np.dtype((np.void, 6))
+    return np.array_equal(
+        np.sort(tree_faces.view(rows).ravel()), np.sort(mesh_faces.view(rows).ravel())
+    )
+
+
+def refit_obb_tree(obb_tree: CGeoOBBTree, mesh: CGeoMesh) -> CGeoOBBTree:
+    """Refits the node boxes of a tree to moved vertices, keeping its
+    topology, or rebuilds it when its faces are no longer the mesh faces"""
+    if not obb_tree.obb_nodes or not covers_mesh(obb_tree, mesh):
+        return build_obb_tree(mesh, obb_tree)
+    faces = np.asarray(obb_tree.faces.indices, dtype=np.intp)
+    corners = np.asarray(mesh.vertices, dtype=np.float64)[:, :3][faces]
+    nodes = obb_tree.obb_nodes
+    starts = np.array([node.triangle_offset for node in nodes], dtype=np.intp)
+    counts = np.array([node.total_triangles for node in nodes], dtype=np.intp)
+    counts = np.minimum(counts, len(faces) - np.minimum(starts, len(faces)))
+    # Nodes without triangles keep their box
+    fitted = np.flatnonzero(counts > 0)
+    if not len(fitted):
+        return obb_tree
+    _, triangles = expand_ranges(fitted, starts[fitted], counts[fitted])
+    firsts = np.cumsum(counts[fitted]) - counts[fitted]
+    selected = corners[triangles]
+    axes, centers, extents = fit_boxes(
+        selected,
+        selected.sum(axis=1),
+        np.einsum("pvi,pvj->pij", selected, selected),
+        firsts,
+        counts[fitted],
+    )
+    for index, box in zip(fitted.tolist(), node_boxes(axes, centers, extents)):
+        nodes[index].oriented_bounding_box = box
+    # The nodes are plain records, reassigning the list marks the tree changed
+    obb_tree.obb_nodes = nodes
+    return obb_tree
@@ -0,0 +1,469 @@
+"""Spatial queries against the collision mesh of a unit.
+
+CGeoOBBTree stores a bounding volume hierarchy over the CGeoMesh triangles.
+Each OBBNode holds an oriented box, its two children and the range of
+CGeoOBBTree.faces below it. `OBBTreeQuery` copies that hierarchy into flat
+arrays once and then answers ray, closest point, sphere and box queries for
+whole batches. It descends one tree level per step for all queries together,
+then tests the triangles that survive in one go.
+
+The box of a node maps the cube [-1, 1]^3 into the mesh: a point is
+`position + matrix @ u`, with the nine floats of its Matrix3x3 in row order.
+"""
+from dataclasses import dataclass
+from typing import List, Tuple
+
+import numpy as np
+
+from ..data_structures.drs_definitions import CGeoMesh, CGeoOBBTree
+from .arrays import expand_ranges
+
+# Queries answered per pass, lowered for trees with large leaves so that the
+# (query, triangle) pairs of a pass stay around PAIR_BUDGET
+QUERY_CHUNK = 4096
+PAIR_BUDGET = 1 << 21
+
+
+def box_frames(obb_tree: CGeoOBBTree) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Centers (K, 3), orthonormal axes (K, 3, 3) as columns and half
+    extents (K, 3) of the node boxes.
+
+    A box matrix is split as Q @ R. The unit cube maps into the box spanned by
+    the columns of Q with half extents sum(|R|, axis=2), which is exact for the
+    usual scaled rotations and still encloses the box for skewed or flat ones.
+    """
+    count = len(obb_tree.obb_nodes)
+    matrices = np.empty((count, 3, 3))
+    centers = np.empty((count, 3))
+    for index, node in enumerate(obb_tree.obb_nodes):
+        box = node.oriented_bounding_box
+        matrices[index] = np.reshape(box.matrix.matrix, (3, 3))
+        centers[index] = (box.position.x, box.position.y, box.position.z)
+    axes, upper = np.linalg.qr(matrices)
+    return centers, axes, np.abs(upper).sum(axis=2)
+
+
+def closest_points_on_triangles(points, a, b, c) -> np.ndarray:
+    """Closest point to each row of `points` on the triangle (a, b, c) of the
+    same row, from the Voronoi regions of the triangle"""
+    ab = b - a
+    ac = c - a
+    ap = points - a
+    bp = points - b
+    cp = points - c
+    d1 = np.einsum("ij,ij->i", ab, ap)
+    d2 = np.einsum("ij,ij->i", ac, ap)
+    d3 = np.einsum("ij,ij->i", ab, bp)
+    d4 = np.einsum("ij,ij->i", ac, bp)
+    d5 = np.einsum("ij,ij->i", ab, cp)
+    d6 = np.einsum("ij,ij->i", ac, cp)
+    va = d3 * d6 - d5 * d4
+    vb = d5 * d2 - d1 * d6
+    vc = d1 * d4 - d3 * d2
+    with np.errstate(divide="ignore", invalid="ignore"):
+        t_ab = (d1 / (d1 - d3))[:, None]
+        t_ac = (d2 / (d2 - d6))[:, None]
+        t_bc = ((d4 - d3) / ((d4 - d3) + (d5 - d6)))[:, None]
+        denominator = va + vb + vc
+        v = (vb / denominator)[:, None]
+        w = (vc / denominator)[:, None]
+        regions = [
+            ((d1 <= 0) & (d2 <= 0), a),
+            ((d3 >= 0) & (d4 <= d3), b),
+            ((vc <= 0) & (d1 >= 0) & (d3 <= 0), a + t_ab * ab),
+            ((d6 >= 0) & (d5 <= d6), c),
+            ((vb <= 0) & (d2 >= 0) & (d6 <= 0), a + t_ac * ac),
+            ((va <= 0) & (d4 >= d3) & (d5 >= d6), b + t_bc * (c - b)),
+        ]
+        result = a + v * ab + w * ac
+        for condition, region in reversed(regions):
+            result = np.where(condition[:, None], region, result)
+    # Degenerate triangles that fell through to the interior formula
+    return np.where(np.isnan(result), a, result)
+
+
+@dataclass(eq=False, repr=False)
+class RayHits:
+    """Nearest hit per ray. Misses have distance inf and triangle -1."""
+
+    distance: np.ndarray
+    triangle: np.ndarray
+    point: np.ndarray
+
+
+@dataclass(eq=False, repr=False)
+class ClosestPoints:
+    """Closest mesh point per query point. Queries with nothing in range have
+    distance inf, triangle -1 and a NaN point."""
+
+    distance: np.ndarray
+    triangle: np.ndarray
+    point: np.ndarray
+
+
+class OBBTreeQuery:
+    """Ray casts, closest points and overlap tests over a collision mesh.
+
+    Triangle indices refer to rows of `faces`, the CGeoOBBTree faces (or the
+    CGeoMesh faces for a tree without any). Every query takes either a single
+    point or vector or an (N, 3) batch.
+    """
+
+    def __init__(
+        self, obb_tree: CGeoOBBTree, mesh: CGeoMesh, leaf_triangles: int = 16
+    ) -> None:
+        faces = obb_tree.faces.indices if len(obb_tree.faces) else mesh.faces.indices
+        self.faces = np.asarray(faces, dtype=np.intp)
+        self.vertices = np.asarray(mesh.vertices, dtype=np.float64)[:, :3]
+        corners = self.vertices[self.faces]
+        self.a = corners[:, 0]
+        self.ab = corners[:, 1] - self.a
+        self.ac = corners[:, 2] - self.a
+
+        nodes = obb_tree.obb_nodes
+        if nodes:
+            self.centers, self.axes, self.extents = box_frames(obb_tree)
+            self.children = np.array(
+                [(node.first_child_index, node.second_child_index) for node in nodes],
+                dtype=np.intp,
+            ).reshape(-1, 2)
+            self.triangle_offset = np.array(
+                [node.triangle_offset for node in nodes], dtype=np.intp
+            )
+            self.triangle_count = np.array(
+                [node.total_triangles for node in nodes], dtype=np.intp
+            )
+            # Links and ranges past the end of the tables are treated as absent
+            self.children[self.children >= len(nodes)] = 0
+            np.minimum(self.triangle_offset, len(self.faces), out=self.triangle_offset)
+            np.minimum(
+                self.triangle_count,
+                len(self.faces) - self.triangle_offset,
+                out=self.triangle_count,
+            )
+        else:
+            # No hierarchy, a single box around the whole mesh
+            lower = self.vertices.min(axis=0) if len(self.vertices) else np.zeros(3)
+            upper = self.vertices.max(axis=0) if len(self.vertices) else np.zeros(3)
+            self.centers = ((lower + upper) / 2)[None]
+            self.axes = np.eye(3)[None]
+            self.extents = ((upper - lower) / 2)[None]
+            self.children = np.zeros((1, 2), dtype=np.intp)
+            self.triangle_offset = np.zeros(1, dtype=np.intp)
+            self.triangle_count = np.array([len(self.faces)], dtype=np.intp)
+        # Slack for float32 boxes that sit exactly on their triangles
+        scale = max(1.0, float(np.abs(self.centers).max(initial=0.0)))
+        self.extents = self.extents + 1e-5 * scale
+        # Nodes whose triangles are tested directly instead of descending
+        self.leaf = (self.children == 0).all(axis=1) | (
+            self.triangle_count <= leaf_triangles
+        )
+        largest = int(self.triangle_count[self.leaf].max(initial=1))
+        self.chunk = max(1, min(QUERY_CHUNK, PAIR_BUDGET // max(largest, 1)))
+
+    @classmethod
+    def from_drs(cls, drs, leaf_triangles: int = 16) -> "OBBTreeQuery":
+        return cls(drs.cgeo_obb_tree, drs.cgeo_mesh, leaf_triangles)
+
+    def _local(self, nodes: np.ndarray, vectors: np.ndarray) -> np.ndarray:
+        """Rows of `vectors` in the frame of the matching node box"""
+        return np.einsum("kji,kj->ki", self.axes[nodes], vectors)
+
+    def _box_distance(self, queries, nodes, points) -> Tuple[np.ndarray, np.ndarray]:
+        """Nearest and farthest distance from the query points to the boxes"""
+        local = np.abs(self._local(nodes, points[queries] - self.centers[nodes]))
+        extents = self.extents[nodes]
+        near = np.linalg.norm(np.maximum(local - extents, 0.0), axis=1)
+        far = np.linalg.norm(local + extents, axis=1)
+        return near, far
+
+    def _candidates(self, count: int, box_test) -> Tuple[np.ndarray, np.ndarray]:
+        """(query, triangle) pairs below every node that passes `box_test`.
+
+        `box_test(queries, nodes)` returns which of the pairs to keep; it sees
+        one tree level of every query per call.
+        """
+        queries = np.arange(count)
+        nodes = np.zeros(count, dtype=np.intp)
+        found_queries = []
+        found_triangles = []
+        while len(queries):
+            keep = box_test(queries, nodes)
+            queries, nodes = queries[keep], nodes[keep]
+            leaf = self.leaf[nodes]
+            pairs = expand_ranges(
+                queries[leaf],
+                self.triangle_offset[nodes[leaf]],
+                self.triangle_count[nodes[leaf]],
+            )
+            found_queries.append(pairs[0])
+            found_triangles.append(pairs[1])
+            queries, nodes = queries[~leaf], nodes[~leaf]
+            queries = np.repeat(queries, 2)
+            nodes = self.children[nodes].ravel()
+            inner = nodes != 0
+            queries, nodes = queries[inner], nodes[inner]
+        if not found_queries:
+            return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp)
+        return np.concatenate(found_queries), np.concatenate(found_triangles)
+
+    def _chunks(self, count: int):
+        for start in range(0, count, self.chunk):
+            yield slice(start, min(start + self.chunk, count))
+
+    def ray_cast(
+        self, origins, directions, max_distance=np.inf, both_sides: bool = True
+    ) -> RayHits:
+        """Nearest triangle hit along each ray.
+
+        Distances are in multiples of the direction, so they are mesh units for
+        normalized directions. With both_sides False, triangles facing away
+        from the ray (by their winding) are ignored.
+        """
+        origins = np.atleast_2d(np.asarray(origins, dtype=np.float64))
+        directions = np.atleast_2d(np.asarray(directions, dtype=np.float64))
+        origins, directions = np.broadcast_arrays(origins, directions)
+        limits = np.broadcast_to(
+            np.asarray(max_distance, dtype=np.float64), len(origins)
+        )
+        count = len(origins)
+        distance = np.full(count, np.inf)
+        triangle = np.full(count, -1, dtype=np.intp)
+        for chunk in self._chunks(count):
+            self._ray_cast(
+                origins[chunk],
+                directions[chunk],
+                limits[chunk],
+                both_sides,
+                distance[chunk],
+                triangle[chunk],
+            )
+        point = origins + directions * np.where(np.isinf(distance), np.nan, distance)[
+            :, None
+        ]
+        return RayHits(distance, triangle, point)
+
+    def _ray_cast(self, origins, directions, limits, both_sides, distance, triangle):
+        def box_test(queries, nodes):
+            centers = self.centers[nodes]
+            local_origin = self._local(nodes, origins[queries] - centers)
+            local_direction = self._local(nodes, directions[queries])
+            extents = self.extents[nodes]
+            parallel = local_direction == 0
+            step = np.where(parallel, 1.0, local_direction)
+            first = (-extents - local_origin) / step
+            second = (extents - local_origin) / step
+            near = np.where(parallel, -np.inf, np.minimum(first, second)).max(axis=1)
+            far = np.where(parallel, np.inf, np.maximum(first, second)).min(axis=1)
+            outside = (parallel & (np.abs(local_origin) > extents)).any(axis=1)
+            return ~outside & (near <= far) & (far >= 0) & (near <= limits[queries])
+
+        queries, triangles = self._candidates(len(origins), box_test)
+        if not len(queries):
+            return
+        # Moeller-Trumbore over every surviving (ray, triangle) pair
+        ray = directions[queries]
+        ab = self.ab[triangles]
+        ac = self.ac[triangles]
+        normal = np.cross(ray, ac)
+        determinant = np.einsum("ij,ij->i", ab, normal)
+        valid = np.abs(determinant) > 1e-12
+        if not both_sides:
+            valid &= determinant > 0
+        inverse = 1.0 / np.where(valid, determinant, 1.0)
+        offset = origins[queries] - self.a[triangles]
+        u = np.einsum("ij,ij->i", offset, normal) * inverse
+        cross = np.cross(offset, ab)
+        v = np.einsum("ij,ij->i", ray, cross) * inverse
+        t = np.einsum("ij,ij->i", ac, cross) * inverse
+        hit = (
+            valid
+            & (u >= 0)
+            & (v >= 0)
+            & (u + v <= 1)
+            & (t >= 0)
+            & (t <= limits[queries])
+        )
+        queries, triangles, t = queries[hit], triangles[hit], t[hit]
+        order = np.lexsort((t, queries))
+        queries, first = np.unique(queries[order], return_index=True)
+        distance[queries] = t[order][first]
+        triangle[queries] = triangles[order][first]
+
+    def line_of_sight(self, starts, ends) -> np.ndarray:
+        """Whether the segment between each start and end misses the mesh"""
+        starts = np.atleast_2d(np.asarray(starts, dtype=np.float64))
+        ends = np.atleast_2d(np.asarray(ends, dtype=np.float64))
+        return self.ray_cast(starts, ends - starts, 1.0).triangle < 0
+
+    def closest_point(self, points, max_distance=np.inf) -> ClosestPoints:
+        """Closest point on the mesh to each query point, searched up to
+        max_distance away"""
+        points = np.atleast_2d(np.asarray(points, dtype=np.float64))
+        limits = np.broadcast_to(
+            np.asarray(max_distance, dtype=np.float64), len(points)
+        )
+        count = len(points)
+        distance = np.full(count, np.inf)
+        triangle = np.full(count, -1, dtype=np.intp)
+        closest = np.full((count, 3), np.nan)
+        for chunk in self._chunks(count):
+            self._closest_point(
+                points[chunk],
+                limits[chunk],
+                distance[chunk],
+                triangle[chunk],
+                closest[chunk],
+            )
+        return ClosestPoints(distance, triangle, closest)
+
+    def _nearest_leaf_distance(self, points) -> np.ndarray:
+        """Distance from each point to the triangles of the leaf reached by
+        always stepping into the nearer child, an upper bound for the search"""
+        count = len(points)
+        queries = np.arange(count)
+        nodes = np.zeros(count, dtype=np.intp)
+        inner = ~self.leaf[nodes]
+        while inner.any():
+            children = self.children[nodes[inner]]
+            walkers = np.repeat(queries[inner], 2)
+            near, _ = self._box_distance(walkers, children.ravel(), points)
+            near = near.reshape(-1, 2)
+            near[(children == 0) | (self.triangle_count[children] == 0)] = np.inf
+            nodes[inner] = children[np.arange(len(children)), near.argmin(axis=1)]
+            inner = ~self.leaf[nodes]
+        queries, triangles = expand_ranges(
+            queries, self.triangle_offset[nodes], self.triangle_count[nodes]
+        )
+        bound = np.full(count, np.inf)
+        a = self.a[triangles]
+        on_mesh = closest_points_on_triangles(
+            points[queries], a, a + self.ab[triangles], a + self.ac[triangles]
+        )
+        np.minimum.at(bound, queries, np.linalg.norm(on_mesh - points[queries], axis=1))
+        return bound
+
+    def _closest_point(self, points, limits, distance, triangle, closest):
+        bound = np.minimum(limits, self._nearest_leaf_distance(points))
+
+        def box_test(queries, nodes):
+            near, far = self._box_distance(queries, nodes, points)
+            # Any box with triangles holds a point no farther than its far
+            # corner, which bounds the answer for the deeper levels
+            occupied = self.triangle_count[nodes] > 0
+            np.minimum.at(bound, queries[occupied], far[occupied])
+            return near <= bound[queries]
+
+        queries, triangles = self._candidates(len(points), box_test)
+        if not len(queries):
+            return
+        a = self.a[triangles]
+        on_mesh = closest_points_on_triangles(
+            points[queries], a, a + self.ab[triangles], a + self.ac[triangles]
+        )
+        gap = np.linalg.norm(on_mesh - points[queries], axis=1)
+        within = gap <= limits[queries]
+        queries, triangles, gap, on_mesh = (
+            queries[within],
+            triangles[within],
+            gap[within],
+            on_mesh[within],
+        )
+        order = np.lexsort((gap, queries))
+        queries, first = np.unique(queries[order], return_index=True)
+        nearest = order[first]
+        distance[queries] = gap[nearest]
+        triangle[queries] = triangles[nearest]
+        closest[queries] = on_mesh[nearest]
+
+    def sphere_overlap(self, centers, radii) -> List[np.ndarray]:
+        """Triangles touching each sphere"""
+        centers = np.atleast_2d(np.asarray(centers, dtype=np.float64))
+        radii = np.broadcast_to(np.asarray(radii, dtype=np.float64), len(centers))
+        result = []
+        for chunk in self._chunks(len(centers)):
+            points, limits = centers[chunk], radii[chunk]
+
+            def box_test(queries, nodes, points=points, limits=limits):
+                near, _ = self._box_distance(queries, nodes, points)
+                return near <= limits[queries]
+
+            queries, triangles = self._candidates(len(points), box_test)
+            a = self.a[triangles]
+            on_mesh = closest_points_on_triangles(
+                points[queries], a, a + self.ab[triangles], a + self.ac[triangles]
+            )
+            gap = np.linalg.norm(on_mesh - points[queries], axis=1)
+            touching = gap <= limits[queries]
+            result.extend(self._group(len(points), queries, triangles, touching))
+        return result
+
+    def aabb_overlap(self, lower, upper) -> List[np.ndarray]:
+        """Triangles touching each axis-aligned box [lower, upper]"""
+        lower = np.atleast_2d(np.asarray(lower, dtype=np.float64))
+        upper = np.atleast_2d(np.asarray(upper, dtype=np.float64))
+        lower, upper = np.broadcast_arrays(lower, upper)
+        result = []
+        for chunk in self._chunks(len(lower)):
+            middle = (lower[chunk] + upper[chunk]) / 2
+            half = (upper[chunk] - lower[chunk]) / 2
+
+            def box_test(queries, nodes, middle=middle, half=half):
+                return self._obb_overlaps_aabb(nodes, middle[queries], half[queries])
+
+            queries, triangles = self._candidates(len(middle), box_test)
+            touching = self._triangle_overlaps_aabb(
+                triangles, middle[queries], half[queries]
+            )
+            result.extend(self._group(len(middle), queries, triangles, touching))
+        return result
+
+    def _obb_overlaps_aabb(self, nodes, middle, half) -> np.ndarray:
+        """Separating axis test of node boxes against axis-aligned boxes, on
+        the face axes of both. Edge axes are left out, so a few pairs pass
+        that a full test would separate; the triangle test settles them."""
+        axes = self.axes[nodes]
+        extents = self.extents[nodes]
+        offset = self.centers[nodes] - middle
+        reach = half + (np.abs(axes) * extents[:, None, :]).sum(axis=2)
+        touching = (np.abs(offset) <= reach).all(axis=1)
+        local = np.einsum("kji,kj->ki", axes, offset)
+        reach = extents + (np.abs(axes) * half[:, :, None]).sum(axis=1)
+        return touching & (np.abs(local) <= reach).all(axis=1)
+
+    def _triangle_overlaps_aabb(self, triangles, middle, half) -> np.ndarray:
+        """Separating axis test of triangles against axis-aligned boxes"""
+        a = self.a[triangles] - middle
+        b = a + self.ab[triangles]
+        c = a + self.ac[triangles]
+        # Box face axes, the bounds of the triangle against the box
+        touching = (
+            (np.minimum(np.minimum(a, b), c) <= half)
+            & (np.maximum(np.maximum(a, b), c) >= -half)
+        ).all(axis=1)
+        survivors = np.flatnonzero(touching)
+        a, b, c, half = a[survivors], b[survivors], c[survivors], half[survivors]
+        corners = np.stack([a, b, c], axis=1)
+        edges = np.stack([b - a, c - b, a - c], axis=1)
+        # Triangle normal, then the cross products of the box axes and edges
+        world = np.broadcast_to(np.eye(3), edges.shape)
+        crossed = np.cross(world[:, :, None, :], edges[:, None, :, :]).reshape(-1, 9, 3)
+        tests = np.concatenate([np.cross(b - a, c - a)[:, None, :], crossed], axis=1)
+        projected = tests @ np.swapaxes(corners, 1, 2)
+        reach = (np.abs(tests) * half[:, None, :]).sum(axis=2)
+        touching[survivors] = (
+            (projected.min(axis=2) <= reach) & (projected.max(axis=2) >= -reach)
+        ).all(axis=1)
+        return touching
+
+    @staticmethod
+    def _group(count: int, queries, triangles, keep) -> List[np.ndarray]:
+        """Sorted, unique triangles per query"""
+        queries, triangles = queries[keep], triangles[keep]
+        order = np.lexsort((triangles, queries))
+        queries, triangles = queries[order], triangles[order]
+        unique = np.ones(len(queries), dtype=bool)
+        unique[1:] = (queries[1:] != queries[:-1]) | (triangles[1:] != triangles[:-1])
+        queries, triangles = queries[unique], triangles[unique]
+        bounds = np.searchsorted(queries, np.arange(count + 1))
+        return [triangles[bounds[i] : bounds[i + 1]] for i in range(count)]
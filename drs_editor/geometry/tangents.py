@@ -0,0 +1,190 @@
+"""Tangent frames for the revision 12288 and 2049 MeshData streams.
+
+Every face gets a tangent and bitangent from its positions and UVs, the
+directions in which u and v grow across it. They are normalized, weighted by
+the face area and summed into the face corners, then made orthogonal to the
+vertex normal. The stored bitangent is the cross product of normal and
+tangent, flipped where the UVs are mirrored, so every frame is orthonormal.
+
+A vertex shared by faces with mirrored and with regular UVs would average
+opposite bitangents into nothing. With split_seams those vertices are
+duplicated, the mirrored faces moving to the copy, and every MeshData
+stream and the skin weights follow.
+"""
+from typing import Optional, Tuple
+
+import numpy as np
+
+from ..data_structures.drs_definitions import BattleforgeMesh, CSkSkinInfo, FaceBuffer
+from .arrays import scatter_add
+from .normals import normalized, stream_field, vertex_normals
+
+# Revisions of the MeshData streams holding tangent frames
+TANGENT_REVISIONS = (12288, 2049)
+# UV areas below this are treated as degenerate and contribute nothing
+UV_EPSILON = 1e-12
+
+
+def face_frames(positions: np.ndarray, uvs: np.ndarray, faces: np.ndarray):
+    """Area weighted unit tangents and bitangents (M, 3) of the faces and the
+    sign of their UV winding, -1 where the UVs are mirrored and 0 where they
+    are degenerate"""
+    p0, p1, p2 = (positions[faces[:, corner]] for corner in range(3))
+    t0, t1, t2 = (uvs[faces[:, corner]] for corner in range(3))
+    e1, e2 = p1 - p0, p2 - p0
+    d1, d2 = t1 - t0, t2 - t0
+    determinant = d1[:, 0] * d2[:, 1] - d2[:, 0] * d1[:, 1]
+    signs = np.where(np.abs(determinant) > UV_EPSILON, np.sign(determinant), 0.0)
+    # Both scaled by the determinant, only their directions are kept
+    tangents = e1 * d2[:, 1:2] - e2 * d1[:, 1:2]
+    bitangents = e2 * d1[:, 0:1] - e1 * d2[:, 0:1]
+    areas = normalized(np.cross(e1, e2))[1] / 2
+    weights = (areas * signs)[:, None]
+    return (
+        normalized(tangents)[0] * weights,
+        normalized(bitangents)[0] * weights,
+        signs,
+    )
+
+
+def perpendiculars(normals: np.ndarray) -> np.ndarray:
+    """Some unit vector perpendicular to each normal"""
+    # Crossed with the axis the normal is least aligned with
+    axes = np.eye(3)[np.abs(normals).argmin(axis=1)]
+    return normalized(np.cross(normals, axes))[0]
+
+
+def vertex_tangents(
+    positions: np.ndarray,
+    normals: Optional[np.ndarray],
+    uvs: np.ndarray,
+    faces: np.ndarray,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Unit tangents and bitangents (N, 3) of the vertices.
+
+    Vertices without a usable normal get one from their faces, vertices
+    without a usable UV gradient an arbitrary frame around their normal.
+    """
+    positions = np.asarray(positions, dtype=np.float64)
+    uvs = np.asarray(uvs, dtype=np.float64)
+    faces = np.asarray(faces, dtype=np.intp)
+    count = len(positions)
+    if normals is None:
+        normals = np.zeros((count, 3))
+    normals, lengths = normalized(np.asarray(normals, dtype=np.float64))
+    missing = lengths < 1e-6
+    if missing.any():
+        normals[missing] = vertex_normals(positions, faces)[missing]
+
+    face_tangents, face_bitangents, _ = face_frames(positions, uvs, faces)
+    tangents = scatter_add(face_tangents, faces, count)
+    bitangents = scatter_add(face_bitangents, faces, count)
+
+    # Gram-Schmidt against the normal
+    tangents -= normals * np.einsum("ij,ij->i", normals, tangents)[:, None]
+    tangents, lengths = normalized(tangents)
+    flat = lengths < 1e-12
+    if flat.any():
+        tangents[flat] = perpendiculars(normals[flat])
+    crossed = np.cross(normals, tangents)
+    handedness = np.where(np.einsum("ij,ij->i", crossed, bitangents) < 0, -1.0, 1.0)
+    return tangents, crossed * handedness[:, None]
+
+
+def split_mirrored(
+    positions: np.ndarray, uvs: np.ndarray, faces: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Duplicates the vertices used by both mirrored and regular faces.
+
+    Returns the new faces and the source of every new vertex, where new
+    vertex i is a copy of old vertex source[i]. The mirrored faces use the
+    copies.
+    """
+    faces = np.asarray(faces, dtype=np.intp)
+    count = len(positions)
+    positions = np.asarray(positions, dtype=np.float64)
+    _, _, signs = face_frames(positions, np.asarray(uvs, dtype=np.float64), faces)
+    corner_signs = np.repeat(signs, 3)
+    corners = faces.ravel()
+    mirrored = np.bincount(corners[corner_signs < 0], minlength=count)
+    regular = np.bincount(corners[corner_signs > 0], minlength=count)
+    split = np.flatnonzero((mirrored > 0) & (regular > 0))
+    if not len(split):
+        return faces, np.arange(count)
+    copies = np.full(count, -1, dtype=np.intp)
+    copies[split] = count + np.arange(len(split))
+    moved = (corner_signs < 0) & (copies[corners] >= 0)
+    corners = corners.copy()
+    corners[moved] = copies[corners[moved]]
+    return corners.reshape(-1, 3), np.concatenate([np.arange(count), split])
+
+
+def generate_tangents(mesh: BattleforgeMesh, split_seams: bool = False) -> np.ndarray:
+    """Recomputes the tangent streams of `mesh` in place.
+
+    Returns the vertex source indices, new vertex i being old vertex
+    source[i], for data kept outside the mesh. Without split_seams this is
+    the identity.
+    """
+    positions = stream_field(mesh, "position")
+    uvs = stream_field(mesh, "texture")
+    if positions is None or uvs is None:
+        raise TypeError("Tangents need a mesh with positions and texture coordinates")
+    faces = np.asarray(mesh.faces.indices, dtype=np.intp)
+    source = np.arange(mesh.vertex_count)
+    if split_seams:
+        faces, source = split_mirrored(positions, uvs, faces)
+        if len(source) > 0x10000:
+            raise TypeError(
+                f"Splitting mirrored UVs needs {len(source)} vertices, "
+                "uint16 faces address at most 65536"
+            )
+        if len(source) != mesh.vertex_count:
+            mesh.faces = FaceBuffer(faces)
+            mesh.vertex_count = len(source)
+            for mesh_data in mesh.mesh_data:
+                mesh_data.data = mesh_data.data[source]
+            positions = stream_field(mesh, "position")
+            uvs = stream_field(mesh, "texture")
+
+    tangents, bitangents = vertex_tangents(
+        positions, stream_field(mesh, "normal"), uvs, faces
+    )
+    for mesh_data in mesh.mesh_data:
+        if mesh_data.revision in TANGENT_REVISIONS:
+            mesh_data.data["tangent"] = tangents
+            mesh_data.data["bitangent"] = bitangents
+    return source
+
+
+def generate_mesh_tangents(
+    meshes, skin_info: Optional[CSkSkinInfo] = None, split_seams: bool = False
+) -> None:
+    """Recomputes the tangent streams of every mesh of a CDspMeshFile that has
+    one, keeping `skin_info`, which holds the vertices of all meshes in order,
+    attached to split vertices"""
+    offsets = np.cumsum([0] + [mesh.vertex_count for mesh in meshes])
+    if skin_info is not None and len(skin_info.weights) != offsets[-1]:
+        raise TypeError(
+            f"CSkSkinInfo holds {len(skin_info.weights)} vertices, "
+            f"the meshes {offsets[-1]}"
+        )
+    sources = []
+    for mesh, offset in zip(meshes, offsets):
+        if any(data.revision in TANGENT_REVISIONS for data in mesh.mesh_data):
+            sources.append(offset + generate_tangents(mesh, split_seams))
+        else:
+            sources.append(offset + np.arange(mesh.vertex_count))
+    if skin_info is not None and split_seams:
+        source = np.concatenate(sources) if sources else np.zeros(0, dtype=np.intp)
+        if len(source) != offsets[-1]:
+            skin_info.weights = skin_info.weights[source]
+            skin_info.bone_indices = skin_info.bone_indices[source]
+            skin_info.vertex_count = len(source)
+
+
+def generate_drs_tangents(drs, split_seams: bool = False) -> None:
+    """Recomputes the tangent streams of a DRS together with its skin info"""
+    if drs.cdsp_mesh_file is not None:
+        meshes = drs.cdsp_mesh_file.meshes
+        generate_mesh_tangents(meshes, drs.csk_skin_info, split_seams)
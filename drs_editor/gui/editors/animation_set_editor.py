@@ -22,7 +22,7 @@ from PyQt6.QtWidgets import (
     QListWidget,
     QListWidgetItem,
 )
-from PyQt6.QtCore import Qt
+from PyQt6.QtCore import QObject, Qt, pyqtSignal
 from drs_editor.data_structures.ska_definitions import SKA
 from drs_editor.data_structures.drs_definitions import (
     AnimationSet,
@@ -30,6 +30,7 @@ from drs_editor.data_structures.drs_definitions import (
     AnimationSetVariant,
 )
 from drs_editor.file_handlers.drs_handler import DRSHandler
+from drs_editor.file_handlers.ska_cache import load_ska, ska_cache, ska_prefetcher
 from drs_editor.gui.log_widget import LogWidget
 from drs_editor.gui.vis_job_data import (
     VIS_JOB_MAP,
@@ -48,6 +49,25 @@ def signal_blocker(*widgets: QWidget):
             widget.blockSignals(original_states[widget])
 
 
+def find_ska_file(drs_path: str | None, ska_file: str) -> str | None:
+    """Path of the SKA file a variant names, next to the DRS, None if missing"""
+    if not drs_path or not ska_file:
+        return None
+    name_to_check = ska_file
+    if not name_to_check.lower().endswith(".ska"):
+        name_to_check += ".ska"
+    path_to_try = os.path.join(os.path.dirname(drs_path), name_to_check)
+    if os.path.exists(path_to_try):
+        return path_to_try
+    return None
+
+
+class SKAPrefetchSignals(QObject):
+    # batch, done, total, path, error; emitted from the prefetch threads and
+    # delivered on the UI thread
+    progress = pyqtSignal(int, int, int, str, str)
+
+
 def create_form_row(
     layout: QFormLayout,
     label_text: str,
@@ -83,7 +103,6 @@ class AnimationSetVariantWidget(QGroupBox):
         self.drs_handler = drs_handler
         self.log_widget = log_widget
         self.loaded_ska_data: SKA | None = None
-        self.loaded_ska_datas = {}  # Cache for loaded SKA data
 
         self.outer_layout = QVBoxLayout(self)
         self.outer_layout.setContentsMargins(0, 0, 0, 0)
@@ -408,17 +427,9 @@ class AnimationSetVariantWidget(QGroupBox):
                 self.toggle_ska_edit_button.setText("Hide SKA Editor")
 
     def _get_ska_full_path(self) -> str | None:
-        if not self.drs_handler.filepath or not self.variant or not self.variant.file:
+        if not self.variant:
             return None
-        base_dir = os.path.dirname(self.drs_handler.filepath)
-        ska_filename = self.variant.file
-        name_to_check = ska_filename
-        if not name_to_check.lower().endswith(".ska"):
-            name_to_check += ".ska"
-        path_to_try = os.path.join(base_dir, name_to_check)
-        if os.path.exists(path_to_try):
-            return path_to_try
-        return None
+        return find_ska_file(self.drs_handler.filepath, self.variant.file)
 
     def load_ska_data_action(self, force_reload=False):
         if not self.variant:
@@ -432,17 +443,14 @@ class AnimationSetVariantWidget(QGroupBox):
         ska_full_path = self._get_ska_full_path()
         if ska_full_path:
             try:
-                # Check if the Data is already loaded in our loaded_ska_datas
-                if ska_full_path in self.loaded_ska_datas and not force_reload:
-                    self.loaded_ska_data = self.loaded_ska_datas[ska_full_path]
+                # Shared with every other widget, re-read when the file changed
+                cached = not force_reload and ska_full_path in ska_cache
+                self.loaded_ska_data = load_ska(ska_full_path, force_reload)
+                if cached:
                     self.log_widget.log_message(
                         f"Using cached SKA data for: {ska_full_path}"
                     )
                     return True
-                ska = SKA()
-                ska.read(ska_full_path)
-                self.loaded_ska_data = ska
-                self.loaded_ska_datas[ska_full_path] = ska
                 self.log_widget.log_message(
                     f"Successfully {'re' if force_reload else ''}loaded SKA: {ska_full_path}"
                 )
@@ -664,6 +672,15 @@ class AnimationSetEditorWidget(QWidget):
         self.animation_set_data: AnimationSet | None = None
         self.current_mode_key: ModeAnimationKey | None = None
         self.current_variant: AnimationSetVariant | None = None
+        # Progress of older prefetches is ignored once a new one starts
+        self.ska_prefetch_batch = 0
+        self.ska_prefetch_failures = 0
+        self.ska_prefetch_signals = SKAPrefetchSignals(self)
+        self.ska_prefetch_signals.progress.connect(
+            self.on_ska_prefetch_progress, Qt.ConnectionType.QueuedConnection
+        )
+        # Not a bound method, the widget is gone by the time it is emitted
+        self.destroyed.connect(lambda *_: ska_prefetcher.cancel())
 
         self.main_layout = QVBoxLayout(self)
 
@@ -805,6 +822,9 @@ class AnimationSetEditorWidget(QWidget):
 
         self.splitter.setSizes([200, 250, 350])  # Initial rough sizes
 
+        self.ska_prefetch_label = QLabel()
+        self.main_layout.addWidget(self.ska_prefetch_label)
+
         self.connect_signals()
         self.clear_data()
         self.setEnabled(False)
@@ -923,11 +943,60 @@ class AnimationSetEditorWidget(QWidget):
             self.update_conditional_visibility()
             self.populate_mode_keys_list()
             self.setEnabled(True)
+            self.prefetch_ska_files()
         else:
             self.clear_data()
             self.setEnabled(False)
 
+    def prefetch_ska_files(self):
+        """Reads the SKAs of all variants into the shared cache in the
+        background, so opening them later does not block"""
+        ska_prefetcher.cancel()
+        self.ska_prefetch_batch += 1
+        self.ska_prefetch_failures = 0
+        paths = []
+        if self.animation_set_data:
+            for mode_key in self.animation_set_data.mode_animation_keys:
+                for variant in mode_key.animation_set_variants:
+                    path = find_ska_file(self.drs_handler.filepath, variant.file)
+                    if path:
+                        paths.append(path)
+        batch = self.ska_prefetch_batch
+        signal = self.ska_prefetch_signals.progress
+
+        def report(done, total, path, error):
+            try:
+                signal.emit(batch, done, total, path, "" if error is None else str(error))
+            except RuntimeError:
+                # The signals object was deleted with the widget during the read
+                pass
+
+        queued = ska_prefetcher.prefetch(paths, report)
+        if queued:
+            self.ska_prefetch_label.setText(f"Loading SKAs: 0/{len(queued)}")
+        else:
+            self.ska_prefetch_label.setText("")
+
+    def on_ska_prefetch_progress(self, batch, done, total, path, error):
+        if batch != self.ska_prefetch_batch:
+            return
+        if error:
+            self.ska_prefetch_failures += 1
+            self.log_widget.log_message(f"Error prefetching SKA '{path}': {error}")
+        if done < total:
+            self.ska_prefetch_label.setText(f"Loading SKAs: {done}/{total}")
+            return
+        failed = self.ska_prefetch_failures
+        message = f"Prefetched {total - failed} SKA file(s)"
+        if failed:
+            message += f", {failed} failed"
+        self.ska_prefetch_label.setText(message)
+        self.log_widget.log_message(message)
+
     def clear_data(self):
+        ska_prefetcher.cancel()
+        self.ska_prefetch_batch += 1
+        self.ska_prefetch_label.setText("")
         self.animation_set_data = None
         self.current_mode_key = None
         self.current_variant = None
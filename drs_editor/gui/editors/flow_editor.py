@@ -40,7 +40,7 @@ class FlowEditorWidget(QGroupBox):
             )
 
     def _add_vector4_editor(self, label: str, vector4: Vector4):  #
-        # Vector4 in drs_definitions has x,y,z,w and also an xyz Vector field.
+        # Vector4 in drs_definitions has x,y,z,w and an xyz Vector derived from them.
         # We edit x,y,z,w.
         x_edit = QLineEdit(str(vector4.x))  #
         y_edit = QLineEdit(str(vector4.y))  #
@@ -67,15 +67,8 @@ class FlowEditorWidget(QGroupBox):
             new_val = float(value_str)
             old_val = getattr(vector4, component_name)
             if old_val != new_val:
+                # .xyz is derived from x, y and z on access
                 setattr(vector4, component_name, new_val)
-                # Also update the .xyz Vector if component is x,y or z
-                if component_name in ["x", "y", "z"] and hasattr(vector4, "xyz"):
-                    if component_name == "x":
-                        vector4.xyz.values[0] = new_val
-                    elif component_name == "y":
-                        vector4.xyz.values[1] = new_val
-                    elif component_name == "z":
-                        vector4.xyz.values[2] = new_val
 
                 self.log_widget.log_message(
                     f"Flow '{vec_label}' component '{component_name}' changed: {old_val} -> {new_val}"
@@ -12,6 +12,7 @@ from PyQt6.QtWidgets import (
 from PyQt6.QtGui import QAction, QKeySequence
 from PyQt6.QtCore import Qt, pyqtSlot
 from drs_editor.file_handlers.drs_handler import DRSHandler
+from drs_editor.file_handlers.ska_cache import ska_prefetcher
 from .mesh_editor_tab import MeshEditorTab
 from .log_widget import LogWidget
 
@@ -73,6 +74,11 @@ class MainWindow(QMainWindow):
         self._create_menus()
         self.statusBar().showMessage("Ready")
 
+    def closeEvent(self, event):
+        # Drop the queued SKA reads, the interpreter would wait for them on exit
+        ska_prefetcher.shutdown()
+        super().closeEvent(event)
+
     def _create_menus(self):  # Remains the same
         menu_bar = self.menuBar()
         file_menu = menu_bar.addMenu("&File")
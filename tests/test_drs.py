@@ -0,0 +1,133 @@
+import io
+
+import numpy as np
+import pytest
+
+from drs_editor.data_structures.drs_definitions import (
+    DRS,
+    BattleforgeMesh,
+    CDspJointMap,
+    CDspMeshFile,
+    CGeoMesh,
+    CGeoOBBTree,
+    DrwResourceMeta,
+    MeshData,
+    Vector3,
+    Vertex,
+)
+from drs_editor.geometry.normals import recompute_normals
+from drs_editor.geometry.obb_builder import build_obb_tree
+
+POSITIONS = [[0, 0, 0], [1, 0, 0], [0, 1, 0], [1, 1, 0.5]]
+FACES = [[0, 1, 2], [2, 1, 3]]
+
+
+def make_drs() -> DRS:
+    drs = DRS(model_type="StaticObjectNoCollision")
+    vertices = [
+        Vertex(position=position, normal=[0, 0, 1], texture=position[:2])
+        for position in POSITIONS
+    ]
+    mesh = BattleforgeMesh(
+        vertex_count=len(vertices),
+        face_count=len(FACES),
+        faces=FACES,
+        mesh_count=1,
+        mesh_data=[MeshData(133121, 32, vertices)],
+        material_parameters=-86061051,
+    )
+    drs.cdsp_mesh_file = CDspMeshFile(mesh_count=1, meshes=[mesh])
+    drs.cgeo_mesh = CGeoMesh(
+        index_count=3 * len(FACES),
+        faces=FACES,
+        vertices=[(*position, 1) for position in POSITIONS],
+    )
+    drs.cgeo_obb_tree = build_obb_tree(drs.cgeo_mesh, CGeoOBBTree())
+    drs.cdsp_joint_map = CDspJointMap()
+    drs.drw_resource_meta = DrwResourceMeta()
+    return drs
+
+
+@pytest.fixture
+def path(tmp_path):
+    file_name = str(tmp_path / "unit.drs")
+    make_drs().save(file_name)
+    return file_name
+
+
+def read_bytes(file_name: str) -> bytes:
+    with open(file_name, "rb") as file:
+        return file.read()
+
+
+def upper_corner(mesh) -> list:
+    corner = mesh.bounding_box_upper_right_corner
+    return [corner.x, corner.y, corner.z]
+
+
+def test_new_drs_is_fitted(path):
+    drs = DRS().read(path)
+    mesh = drs.cdsp_mesh_file.meshes[0]
+    assert upper_corner(mesh) == [1, 1, 0.5]
+    assert upper_corner(drs.cdsp_mesh_file) == [1, 1, 0.5]
+    assert drs.cgeo_mesh.vertex_count == 4
+
+
+@pytest.mark.parametrize("lazy", [False, True])
+def test_save_reproduces_the_file(tmp_path, path, lazy):
+    drs = DRS().read(path, lazy=lazy)
+    target = str(tmp_path / "copy.drs")
+    drs.save(target)
+    assert read_bytes(target) == read_bytes(path)
+    drs.close()
+
+
+def test_lazy_read_decodes_from_the_mapping(path):
+    drs = DRS().read(path, lazy=True)
+    assert "cdsp_mesh_file" in drs._pending_payloads
+    faces = drs.cdsp_mesh_file.meshes[0].faces.indices
+    assert faces.tolist() == FACES
+    drs.close()
+    assert "_reader" not in drs.__dict__
+    assert drs.cgeo_mesh is None
+
+
+def test_lazy_save_over_the_source(path):
+    source = read_bytes(path)
+    drs = DRS().read(path, lazy=True)
+    drs.cdsp_mesh_file.meshes[0].bool_parameter = 1
+    drs.save(path)
+    assert len(read_bytes(path)) == len(source)
+    # Still pending, now decoded from the saved file
+    assert drs.cgeo_mesh.faces.indices.tolist() == FACES
+    drs.close()
+    reread = DRS().read(path)
+    assert reread.cdsp_mesh_file.meshes[0].bool_parameter == 1
+
+
+def encode(record) -> bytes:
+    buffer = io.BytesIO()
+    record.write(buffer)
+    return buffer.getvalue()
+
+
+def test_in_place_position_edit_refits_bounds(tmp_path, path):
+    drs = DRS().read(path)
+    tree = encode(drs.cgeo_obb_tree)
+    drs.cdsp_mesh_file.meshes[0].mesh_data[0].data["position"] *= 2
+    drs.cgeo_mesh.vertices[:, :3] *= 2
+    drs.save(str(tmp_path / "moved.drs"))
+    assert upper_corner(drs.cdsp_mesh_file.meshes[0]) == [2, 2, 1]
+    assert upper_corner(drs.cdsp_mesh_file) == [2, 2, 1]
+    assert encode(drs.cgeo_obb_tree) != tree
+
+
+def test_authored_bounds_survive_other_edits(tmp_path, path):
+    drs = DRS().read(path)
+    mesh = drs.cdsp_mesh_file.meshes[0]
+    mesh.bounding_box_upper_right_corner = Vector3(4, 4, 4)
+    mesh.mesh_data[0].data["normal"] = [1, 0, 0]
+    recompute_normals(mesh)
+    drs.save(str(tmp_path / "normals.drs"))
+    assert upper_corner(mesh) == [4, 4, 4]
+    assert np.allclose(mesh.mesh_data[0].data["normal"][0], [0, 0, 1])
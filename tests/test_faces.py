@@ -0,0 +1,44 @@
+import io
+
+import numpy as np
+
+from drs_editor.data_structures.drs_definitions import (
+    BattleforgeMesh,
+    CGeoMesh,
+    CGeoOBBTree,
+    Face,
+    FaceBuffer,
+)
+
+FACES = [[0, 1, 2], [2, 1, 3]]
+
+
+def round_trip(record, **read_args):
+    buffer = io.BytesIO()
+    record.write(buffer)
+    assert len(buffer.getvalue()) == record.size()
+    buffer.seek(0)
+    return type(record)().read(buffer, **read_args)
+
+
+def test_mesh_built_from_faces_round_trips():
+    mesh = BattleforgeMesh(
+        face_count=2,
+        faces=[Face(indices) for indices in FACES],
+        material_parameters=-86061051,
+    )
+    assert isinstance(mesh.faces, FaceBuffer)
+    assert round_trip(mesh).faces.indices.tolist() == FACES
+
+
+def test_assigned_faces_become_a_face_buffer():
+    mesh = CGeoMesh()
+    mesh.faces = [Face(indices) for indices in FACES]
+    mesh.index_count = 3 * len(mesh.faces)
+    assert isinstance(mesh.faces, FaceBuffer)
+    assert round_trip(mesh).faces.indices.tolist() == FACES
+
+    tree = CGeoOBBTree(triangle_count=2)
+    tree.faces = np.array(FACES)
+    assert isinstance(tree.faces, FaceBuffer)
+    assert round_trip(tree).faces.indices.tolist() == FACES
@@ -0,0 +1,71 @@
+import os
+from struct import Struct, pack
+
+import numpy as np
+import pytest
+
+from drs_editor.data_structures.file_io import BufferWriter, FileReader, read_array
+
+
+@pytest.fixture
+def path(tmp_path):
+    file_name = tmp_path / "data.bin"
+    file_name.write_bytes(pack("<iif", 7, -2, 0.5) + bytes(range(16)))
+    return str(file_name)
+
+
+def test_reader_cursor(path):
+    with FileReader(path) as reader:
+        assert reader.length == 28
+        assert reader.unpack("<ii") == (7, -2)
+        assert reader.tell() == 8
+        assert reader.unpack(Struct("<f")) == (0.5,)
+        assert reader.unpack_from("<i", 0) == (7,)
+        assert reader.tell() == 12
+        assert reader.read(4) == bytes(range(4))
+        assert reader.seek(-2, os.SEEK_END) == 26
+        assert reader.read() == bytes((14, 15))
+        assert reader.read(4) == b""
+
+
+def test_view_is_zero_copy_and_blocks_close(path):
+    reader = FileReader(path)
+    reader.seek(12)
+    view = reader.view(16)
+    assert isinstance(view, memoryview)
+    assert view.obj is reader.buffer.obj
+    with pytest.raises(BufferError):
+        reader.close()
+    assert reader.file.closed
+    view.release()
+    reader._map.close()
+
+
+def test_read_array(path):
+    with FileReader(path) as reader:
+        reader.seek(12)
+        array = read_array(reader, "<u1", (4, 4))
+        assert array.flags.writeable
+        assert array[3].tolist() == [12, 13, 14, 15]
+        reader.seek(20)
+        with pytest.raises(TypeError):
+            read_array(reader, "<u1", 16)
+
+
+def test_empty_file(tmp_path):
+    file_name = tmp_path / "empty.bin"
+    file_name.write_bytes(b"")
+    with FileReader(str(file_name)) as reader:
+        assert reader.read() == b""
+
+
+@pytest.mark.parametrize("use_mmap", [False, True])
+def test_buffer_writer_saves_its_buffer(tmp_path, use_mmap):
+    writer = BufferWriter(12)
+    writer.pack_into("<i", 1)
+    writer.write(np.arange(2, dtype="<i4").tobytes())
+    assert writer.tell() == writer.length
+    file_name = str(tmp_path / "out.bin")
+    writer.save(file_name, use_mmap)
+    with open(file_name, "rb") as file:
+        assert file.read() == pack("<3i", 1, 0, 1)
@@ -0,0 +1,96 @@
+import io
+from dataclasses import dataclass
+
+import pytest
+
+from drs_editor.data_structures.binary_schema import String, Value, binary_schema
+from drs_editor.data_structures.cached_size import CachedSize
+from drs_editor.data_structures.drs_definitions import (
+    AnimationSetVariant,
+    Bone,
+    Keyframe,
+    Material,
+    ModeAnimationKey,
+    Texture,
+    Timing,
+    Variant,
+    face_buffer,
+)
+from drs_editor.data_structures.file_io import FileReader
+
+RECORDS = [
+    (Timing(cast_ms=250, resolve_ms=500, uk_1=0.5, animation_marker_id=3), {}),
+    (Texture(identifier=1684432499, name="unit_color"), {}),
+    (Bone(version=1, identifier=4, name="Bip01", child_count=2, children=[5, 6]), {}),
+    (Material(7), {}),
+    (AnimationSetVariant(weight=50, length=8, file="idle.ska"), {}),
+    (
+        ModeAnimationKey(
+            variant_count=1,
+            animation_set_variants=[AnimationSetVariant(length=5, file="a.ska")],
+        ),
+        {"uk": 3},
+    ),
+    (
+        Keyframe(
+            time=0.25,
+            uk=1,
+            variant_count=1,
+            variants=[Variant(weight=100, length=5, name="hit_1")],
+        ),
+        {"_type": 0},
+    ),
+]
+
+
+def encode(record) -> bytes:
+    buffer = io.BytesIO()
+    record.write(buffer)
+    return buffer.getvalue()
+
+
+@pytest.mark.parametrize("record, read_args", RECORDS)
+def test_schema_read_write_size_parity(tmp_path, record, read_args):
+    data = encode(record)
+    assert len(data) == record.size()
+    from_stream = type(record)().read(io.BytesIO(data), **read_args)
+    assert encode(from_stream) == data
+    file_name = tmp_path / "record.bin"
+    file_name.write_bytes(data + b"tail")
+    with FileReader(str(file_name)) as reader:
+        from_map = type(record)().read(reader, **read_args)
+        assert reader.tell() == len(data)
+    assert encode(from_map) == data
+    assert from_map.size() == len(data)
+
+
+@pytest.mark.parametrize("mapped", [False, True])
+def test_short_string_raises(tmp_path, mapped):
+    data = encode(Texture(name="unit_color"))[:-6]
+    if not mapped:
+        with pytest.raises(TypeError):
+            Texture().read(io.BytesIO(data))
+        return
+    file_name = tmp_path / "short.bin"
+    file_name.write_bytes(data)
+    with FileReader(str(file_name)) as reader, pytest.raises(TypeError):
+        Texture().read(reader)
+
+
+def test_direct_init_links_children():
+    key = ModeAnimationKey(animation_set_variants=[AnimationSetVariant()])
+    size = key.size()
+    key.animation_set_variants[0].file = "longer.ska"
+    key.animation_set_variants[0].length = 10
+    assert key.size() == size + 10
+
+
+def test_direct_init_rejects_converting_classes():
+    with pytest.raises(TypeError):
+
+        @binary_schema(Value("length", "i"), String("name", "length"), direct_init=True)
+        @dataclass(eq=False, repr=False)
+        class Converted(CachedSize):  # pylint: disable=unused-variable
+            length: int = 0
+            name: str = ""
+            _converters = {"name": face_buffer}
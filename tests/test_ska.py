@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+
+from drs_editor.data_structures.ska_definitions import SKA, SKAKeyframe
+from drs_editor.file_handlers.ska_cache import SKACache
+
+
+def make_ska(ska_type: int = 7) -> SKA:
+    ska = SKA(type=ska_type, duration=1.5, repeat=1, unused2=24, zeroes=[0, 0, 0])
+    ska.headers = np.array([[0, 2, 0, 3], [2, 1, 1, 3]], dtype="<u4")
+    ska.header_count = 2
+    ska.times = np.array([0.0, 1.0, 0.5], dtype="<f4")
+    ska.time_count = 3
+    ska.keyframe_records = [
+        SKAKeyframe(0, 0, 0, 1, 0, 0, 0, 0),
+        SKAKeyframe(1, 2, 3, 1, 0, 0, 0, 0),
+        SKAKeyframe(0, 0, 0.7071, 0.7071, 0, 0, 0, 0),
+    ]
+    return ska
+
+
+@pytest.mark.parametrize("ska_type", [6, 7])
+def test_ska_arrays_round_trip(tmp_path, ska_type):
+    file_name = str(tmp_path / "walk.ska")
+    ska = make_ska(ska_type)
+    ska.write(file_name)
+    result = SKA().read(file_name)
+    assert result.type == ska_type
+    assert result.headers.dtype == "<u4" and result.headers.shape == (2, 4)
+    assert np.array_equal(result.headers, ska.headers)
+    assert np.array_equal(result.times, ska.times)
+    assert np.array_equal(result.keyframes, ska.keyframes)
+    assert result.duration == 1.5
+    assert result.keyframe_records[1].x == 1
+    copy_name = str(tmp_path / "copy.ska")
+    result.write(copy_name)
+    with open(file_name, "rb") as source, open(copy_name, "rb") as copy:
+        assert source.read() == copy.read()
+
+
+def test_cache_hands_out_copies(tmp_path):
+    file_name = str(tmp_path / "walk.ska")
+    make_ska().write(file_name)
+    cache = SKACache()
+    first = cache.get(file_name)
+    first.keyframes[:] = 0
+    first.duration = 9.0
+    second = cache.get(file_name)
+    assert cache.hits == 1
+    assert second.duration == 1.5
+    assert second.keyframes[1, 0] == 1
+    assert cache.peek(file_name) is not cache.peek(file_name)
@@ -0,0 +1,59 @@
+import io
+
+from drs_editor.data_structures.drs_definitions import (
+    CGeoMesh,
+    CSkSkinInfo,
+    MeshData,
+    Vertex,
+    Vector4,
+    VertexData,
+)
+
+
+def test_mesh_data_built_from_vertices_round_trips():
+    vertices = [
+        Vertex(position=[1, 2, 3], normal=[0, 0, 1], texture=[0.5, 0.25]),
+        Vertex(position=[4, 5, 6], normal=[0, 1, 0], texture=[1, 0]),
+    ]
+    mesh_data = MeshData(133121, 32, vertices)
+    buffer = io.BytesIO()
+    mesh_data.write(buffer)
+    assert len(buffer.getvalue()) == mesh_data.size() == 8 + 2 * 32
+    buffer.seek(0)
+    result = MeshData().read(buffer, 2)
+    assert result.vertices[1].position.tolist() == [4, 5, 6]
+    assert result.vertices[0].texture.tolist() == [0.5, 0.25]
+
+
+def test_skin_info_built_from_vertex_data_round_trips():
+    vertex_data = [
+        VertexData([0.5, 0.5, 0, 0], [1, 2, 0, 0]),
+        VertexData([1, 0, 0, 0], [3, 0, 0, 0]),
+    ]
+    skin_info = CSkSkinInfo(vertex_count=2, vertex_data=vertex_data)
+    buffer = io.BytesIO()
+    skin_info.write(buffer)
+    assert len(buffer.getvalue()) == skin_info.size() == 8 + 2 * 32
+    buffer.seek(0)
+    result = CSkSkinInfo().read(buffer)
+    assert result.weights.tolist() == [[0.5, 0.5, 0, 0], [1, 0, 0, 0]]
+    assert list(result.vertex_data[0].bone_indices) == [1, 2, 0, 0]
+
+
+def test_collision_mesh_built_from_vector4_list_round_trips():
+    mesh = CGeoMesh(
+        index_count=3,
+        faces=[[0, 1, 2]],
+        vertices=[Vector4(0, 0, 0, 1), Vector4(1, 0, 0, 1), Vector4(0, 1, 0, 1)],
+    )
+    assert mesh.vertices.shape == (3, 4) and mesh.vertices.dtype == "<f4"
+    assert mesh.vertex_count == 3
+    buffer = io.BytesIO()
+    mesh.write(buffer)
+    assert len(buffer.getvalue()) == mesh.size() == 12 + 6 + 3 * 16
+    buffer.seek(0)
+    result = CGeoMesh().read(buffer)
+    assert result.vertex_count == 3
+    assert result.vertices[1].tolist() == [1, 0, 0, 1]
+    result.vertices = [(0, 0, 0, 1)]
+    assert result.vertex_count == 1